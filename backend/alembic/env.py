@@ -26,7 +26,8 @@ from app.models import (
     Party,
     PartyMember,
     PartyGoal,
-    AccountabilityPartnership
+    AccountabilityPartnership,
+    UserDailyStats
 )
 
 # This is the Alembic Config object
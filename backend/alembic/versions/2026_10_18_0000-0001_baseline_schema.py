@@ -0,0 +1,237 @@
+"""baseline schema
+
+The tables as they stood before migrations were tracked, written out
+in full so the revision does not depend on the current models.
+
+Databases created earlier by the app's create_all already have these
+tables; on those the revision only records its place in the history.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+user_type = sa.Enum("REGULAR", "PREMIUM", "ADMIN", name="user_type_type")
+partnership_status = sa.Enum("PENDING", "ACTIVE", "DECLINED", "ENDED", name="partnershipstatus")
+rarity_type = sa.Enum("COMMON", "RARE", "EPIC", "LEGENDARY", name="rarity_type")
+habit_frequency = sa.Enum("DAILY", "WEEKLY", "MONTHLY", "CUSTOM", name="habitfrequency")
+habit_category = sa.Enum(
+    "HEALTH", "FITNESS", "LEARNING", "PRODUCTIVITY", "SOCIAL", "FINANCIAL", "CREATIVE", "OTHER",
+    name="habitcategory"
+)
+goal_status = sa.Enum("ACTIVE", "COMPLETED", "FAILED", "CANCELLED", name="goal_status_type")
+party_role = sa.Enum("LEADER", "OFFICER", "MEMBER", name="party_role_type")
+
+ENUMS = [user_type, partnership_status, rarity_type, habit_frequency, habit_category, goal_status, party_role]
+
+
+def upgrade() -> None:
+    if "users" in sa.inspect(op.get_bind()).get_table_names():
+        # Created by create_all before this history existed
+        return
+    
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("user_type", user_type, nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("timezone", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("username"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_id", "users", ["id"])
+    
+    op.create_table(
+        "accountability_partnerships",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("requester_id", sa.Integer(), nullable=False),
+        sa.Column("partner_id", sa.Integer(), nullable=False),
+        sa.Column("status", partnership_status, nullable=False),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("can_view_all_habits", sa.Boolean(), nullable=False),
+        sa.Column("can_comment", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("accepted_at", sa.DateTime(), nullable=True),
+        sa.Column("ended_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.CheckConstraint("requester_id != partner_id", name="ck_no_self_partnership"),
+        sa.UniqueConstraint("requester_id", "partner_id", name="uq_unique_partnership_pair"),
+        sa.ForeignKeyConstraint(["requester_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["partner_id"], ["users.id"], ondelete="CASCADE"),
+    )
+    op.create_index("ix_accountability_partnerships_id", "accountability_partnerships", ["id"])
+    op.create_index("ix_accountability_partnerships_partner_id", "accountability_partnerships", ["partner_id"])
+    op.create_index("ix_accountability_partnerships_requester_id", "accountability_partnerships", ["requester_id"])
+    
+    op.create_table(
+        "achievements",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("achievement_type", sa.String(), nullable=True),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("icon", sa.String(), nullable=True),
+        sa.Column("points", sa.Integer(), nullable=True),
+        sa.Column("rarity", rarity_type, nullable=True),
+        sa.Column("earned_at", sa.DateTime(), nullable=True),
+        sa.Column("is_displayed", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+    )
+    op.create_index("ix_achievements_id", "achievements", ["id"])
+    op.create_index("ix_achievements_title", "achievements", ["title"])
+    
+    op.create_table(
+        "parties",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("creator_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("invite_code", sa.String(10), nullable=False),
+        sa.Column("is_public", sa.Boolean(), nullable=False),
+        sa.Column("max_members", sa.Integer(), nullable=False),
+        sa.Column("avatar_url", sa.String(200), nullable=True),
+        sa.Column("total_points", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.CheckConstraint("max_members > 0", name="check_max_members_positive"),
+        sa.ForeignKeyConstraint(["creator_id"], ["users.id"]),
+    )
+    op.create_index("ix_parties_name", "parties", ["name"])
+    op.create_index("ix_parties_creator_id", "parties", ["creator_id"])
+    op.create_index("ix_parties_invite_code", "parties", ["invite_code"], unique=True)
+    op.create_index("ix_parties_id", "parties", ["id"])
+    
+    op.create_table(
+        "habits",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("party_id", sa.Integer(), nullable=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("frequency", habit_frequency, nullable=False),
+        sa.Column("category", habit_category, nullable=False),
+        sa.Column("target_days", sa.Text(), nullable=True),
+        sa.Column("reminder_time", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("current_streak", sa.Integer(), nullable=False),
+        sa.Column("longest_streak", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("color", sa.String(10), nullable=True),
+        sa.Column("icon", sa.String(50), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["party_id"], ["parties.id"]),
+    )
+    op.create_index("ix_habits_id", "habits", ["id"])
+    op.create_index("ix_habits_user_id", "habits", ["user_id"])
+    op.create_index("ix_habits_party_id", "habits", ["party_id"])
+    
+    op.create_table(
+        "party_goals",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("party_id", sa.Integer(), nullable=True),
+        sa.Column("created_by_id", sa.Integer(), nullable=True),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("target_value", sa.Integer(), nullable=True),
+        sa.Column("current_value", sa.Integer(), nullable=True),
+        sa.Column("status", goal_status, nullable=True),
+        sa.Column("start_date", sa.DateTime(), nullable=True),
+        sa.Column("end_date", sa.DateTime(), nullable=True),
+        sa.Column("reward_points", sa.Integer(), nullable=True),
+        sa.Column("habit_category", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["party_id"], ["parties.id"]),
+        sa.ForeignKeyConstraint(["created_by_id"], ["users.id"]),
+    )
+    op.create_index("ix_party_goals_id", "party_goals", ["id"])
+    
+    op.create_table(
+        "party_members",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("party_id", sa.Integer(), nullable=False),
+        sa.Column("role", party_role, nullable=True),
+        sa.Column("joined_at", sa.DateTime(), nullable=True),
+        sa.Column("contribution_points", sa.Integer(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("last_active_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "party_id", name="uq_user_party"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["party_id"], ["parties.id"]),
+    )
+    op.create_index("ix_party_members_id", "party_members", ["id"])
+    
+    op.create_table(
+        "logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("habit_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("log_date", sa.Date(), nullable=False),
+        sa.Column("completed", sa.Boolean(), nullable=True),
+        sa.Column("completion_time", sa.DateTime(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("mood", sa.Integer(), nullable=True),
+        sa.Column("duration_minutes", sa.Integer(), nullable=True),
+        sa.Column("mood_label", sa.String(), nullable=True),
+        sa.Column("mood_intensity", sa.Float(), nullable=True),
+        sa.Column("mood_analyzed_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("habit_id", "log_date", name="uq_habit_log_date"),
+        sa.ForeignKeyConstraint(["habit_id"], ["habits.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+    )
+    op.create_index("ix_logs_id", "logs", ["id"])
+    
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("habit_id", sa.Integer(), nullable=False),
+        sa.Column("log_id", sa.Integer(), nullable=True),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["habit_id"], ["habits.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["log_id"], ["logs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["author_id"], ["users.id"], ondelete="CASCADE"),
+    )
+    op.create_index("ix_comments_author_id", "comments", ["author_id"])
+    op.create_index("ix_comments_habit_id", "comments", ["habit_id"])
+    op.create_index("ix_comments_log_id", "comments", ["log_id"])
+    op.create_index("ix_comments_id", "comments", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("comments", "logs", "party_members", "party_goals", "habits",
+                  "parties", "achievements", "accountability_partnerships", "users"):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for enum in ENUMS:
+        enum.drop(bind, checkfirst=True)
@@ -0,0 +1,32 @@
+"""habit last completed date
+
+Adds habits.last_completed_date, which lets streak writes, the decay
+sweeper and reminders work from the habits row instead of reading logs.
+Existing rows stay NULL until `python -m app.jobs.recompute_streaks`
+backfills them. Skipped when create_all already added the column.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("habits")}
+    if "last_completed_date" not in columns:
+        op.add_column("habits", sa.Column("last_completed_date", sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("habits") as batch_op:
+        batch_op.drop_column("last_completed_date")
@@ -0,0 +1,40 @@
+"""habit completion bitmap
+
+Adds habits.completion_bitmap and habits.bitmap_start. Both stay NULL
+on existing rows: readers fall back to logs and the first write builds
+the bitmap, or `python -m app.jobs.recompute_streaks --bitmaps` builds
+them all at once. Skipped when create_all already added the columns.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column("completion_bitmap", sa.LargeBinary(), nullable=True),
+    sa.Column("bitmap_start", sa.Date(), nullable=True),
+]
+
+
+def upgrade() -> None:
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("habits")}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("habits", column)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("habits") as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
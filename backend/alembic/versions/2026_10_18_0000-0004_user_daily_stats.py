@@ -0,0 +1,51 @@
+"""user daily stats
+
+Adds the user_daily_stats rollup table and users.daily_stats_built_at.
+Existing users start unbuilt (NULL) and are backfilled from logs on
+their first analytics read, or all at once with
+`python -m app.jobs.backfill_daily_stats`. Skipped when create_all
+already created them.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    
+    if "daily_stats_built_at" not in {column["name"] for column in inspector.get_columns("users")}:
+        op.add_column("users", sa.Column("daily_stats_built_at", sa.DateTime(), nullable=True))
+    
+    if "user_daily_stats" not in inspector.get_table_names():
+        op.create_table(
+            "user_daily_stats",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("completed_count", sa.Integer(), nullable=False),
+            sa.Column("logged_count", sa.Integer(), nullable=False),
+            sa.Column("active_habit_count", sa.Integer(), nullable=False),
+            sa.Column("mood_sum", sa.Integer(), nullable=False),
+            sa.Column("mood_count", sa.Integer(), nullable=False),
+            sa.Column("mood_intensity_sum", sa.Float(), nullable=False),
+            sa.Column("mood_intensity_count", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("user_id", "date"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("user_daily_stats")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("daily_stats_built_at")
@@ -0,0 +1,69 @@
+"""log query indexes
+
+Adds the indexes the log read paths rely on. Indexes that create_all
+already built are skipped. On PostgreSQL they are built CONCURRENTLY,
+outside the migration transaction, so writes to logs are not blocked
+while they build.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+completed = sa.column("completed", sa.Boolean())
+completion_time = sa.column("completion_time", sa.DateTime())
+
+# (table, name, columns, dialect kwargs) -- kept identical to app.models.log
+INDEXES = [
+    # Keyset pages of a habit's history
+    ("logs", "ix_logs_habit_date_id", ["habit_id", "log_date", "id"], {}),
+    # Summaries, exports and rollup backfills for a user's date range
+    ("logs", "ix_logs_user_date", ["user_id", "log_date"], {}),
+    # Streaks and bitmaps read only completed days of a habit
+    ("logs", "ix_logs_habit_completed_date", ["habit_id", "log_date"], {
+        "postgresql_where": completed == sa.true(),
+        "sqlite_where": completed == sa.true(),
+    }),
+    # Time-of-day histograms
+    ("logs", "ix_logs_user_completion_time", ["user_id", "completion_time", "habit_id"], {
+        "postgresql_where": completion_time.isnot(None),
+    }),
+]
+
+
+def _create_index(bind, table, name, columns, kwargs):
+    if bind.dialect.name == "postgresql":
+        # CONCURRENTLY cannot run inside a transaction block
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = {index["name"] for index in sa.inspect(bind).get_indexes("logs")}
+    for table, name, columns, kwargs in INDEXES:
+        if name not in existing:
+            _create_index(bind, table, name, columns, kwargs)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table, name, _, _ in reversed(INDEXES):
+        if bind.dialect.name == "postgresql":
+            with op.get_context().autocommit_block():
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        else:
+            op.drop_index(name, table_name=table, if_exists=True)
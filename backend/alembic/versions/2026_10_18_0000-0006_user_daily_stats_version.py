@@ -0,0 +1,35 @@
+"""user daily stats version
+
+Adds users.daily_stats_version, a counter bumped by every write to the
+user's rollup. Heatmap blocks and analytics ETags are tagged with it,
+so checking them is one primary-key read. Skipped when create_all
+already added the column.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    if "daily_stats_version" not in columns:
+        op.add_column(
+            "users",
+            sa.Column("daily_stats_version", sa.Integer(), server_default="0", nullable=False)
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("daily_stats_version")
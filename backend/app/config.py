@@ -26,6 +26,20 @@ class Settings(BaseSettings):
     GOOGLE_REDIRECT_URI: str
 
     DEBUG: bool = False
+
+    # Background jobs
+    STREAK_DECAY_SWEEP_ENABLED: bool = True
+    STREAK_DECAY_INTERVAL_SECONDS: int = 300
+    STREAK_REMINDER_ENABLED: bool = True
+    STREAK_REMINDER_INTERVAL_SECONDS: int = 300
+    STREAK_REMINDER_HOURS_BEFORE_MIDNIGHT: int = 4
+    
+    # Analytics result cache ("memory", or "sqlite" to share across workers)
+    ANALYTICS_CACHE_ENABLED: bool = True
+    ANALYTICS_CACHE_BACKEND: str = "memory"
+    ANALYTICS_CACHE_PATH: str = "analytics_cache.sqlite3"
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 10000
+    
     CORS_ORIGINS: Union[List[str], str] = []
     
     @field_validator("CORS_ORIGINS", mode="before")
@@ -14,6 +14,7 @@ from datetime import date, timedelta, datetime
 from app.models.habit import Habit
 from app.models.log import Log
 from app.utils.gemini_helper import GeminiHelper
+from app.utils import correlations, time_of_day
 
 # Initialize helper
 gemini = GeminiHelper()
@@ -171,12 +172,17 @@ async def analyze_habit_patterns(current_user, db: Session):
     """
     Analyze user's habit patterns with AI.
     """
-    # Simply fetching logs for now to pass to AI
-    logs = db.query(Log).filter(Log.user_id == current_user.id).limit(50).all()
-    log_data = [{"date": str(l.log_date), "completed": l.completed} for l in logs]
+    # Same aggregates as /analytics/time-of-day and /analytics/correlations
+    histogram = time_of_day.completion_histogram(db, current_user)
+    habit_stats = time_of_day.pattern_summary(histogram)
+    co_completion = await correlations.habit_correlations(db, current_user, limit=5)
+    pairs = [
+        {key: pair[key] for key in ("title_a", "title_b", "correlation", "lift", "together_days")}
+        for pair in co_completion["pairs"]
+    ]
     
     try:
-        analysis = await gemini.analyze_patterns(logs=log_data)
+        analysis = await gemini.analyze_patterns(habit_stats=habit_stats, pairs=pairs)
         return analysis
     except Exception:
         return {"patterns": ["Not enough data to analyze patterns yet."]}
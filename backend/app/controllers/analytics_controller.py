@@ -7,55 +7,68 @@ Handles statistics, streaks, and analytics data.
 """
 
 from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case, and_, cast, String
 from fastapi import HTTPException, status
 from typing import Optional
 from datetime import date, datetime, timedelta
 
+import numpy as np
+
 from app.models.achievement import Achievement
 from app.models.user import User
 from app.models.habit import Habit
 from app.models.log import Log
+from app.models.party_member import PartyMember
+from app.utils.habit_schedule import get_habit_schedule
+from app.utils import correlations, daily_stats, heatmap_blocks, time_of_day, trends
 
 
-async def get_overview_stats(current_user, db: Session):
+async def get_overview_stats(current_user, db: Session, as_of: Optional[date] = None):
     """
     Get overview statistics for dashboard.
+    
+    Two aggregate statements: conditional counts over the user's habits,
+    and conditional sums over the daily rollup. With `as_of`, completions
+    and habit totals are as of that day (habits created later are not
+    counted); active flags and streaks are always current.
     """
-    curr_user_habits = db.query(Habit).filter(Habit.user_id == current_user.id).all()
-    total_habits = len(curr_user_habits)
-    curr_user_active_habits = db.query(Habit).filter(Habit.user_id == current_user.id, Habit.is_active == True).all()
-    total_active_habits = len(curr_user_active_habits)
+    habit_query = select(
+        func.count(Habit.id).label("total"),
+        func.coalesce(func.sum(case((Habit.is_active == True, 1), else_=0)), 0).label("active"),
+        func.coalesce(func.sum(case((Habit.current_streak > 0, 1), else_=0)), 0).label("current_streaks"),
+        func.coalesce(func.sum(case((Habit.longest_streak > 0, 1), else_=0)), 0).label("longest_streaks"),
+    ).where(Habit.user_id == current_user.id)
+    if as_of:
+        habit_query = habit_query.where(
+            Habit.created_at < datetime.combine(as_of + timedelta(days=1), datetime.min.time())
+        )
+    habit_counts = db.execute(habit_query).one()
+    as_of = as_of or date.today()
+    total_active_habits = int(habit_counts.active)
+    
+    completions = daily_stats.completed_totals(db, current_user, {
+        "today": (as_of, as_of),
+        "week": (as_of - timedelta(days=7), as_of),
+        "total": (date.min, as_of),
+    })
     
     # Guard against division by zero
     if total_active_habits == 0:
         today_completion_rate = 0.0
         this_week_completion_rate = 0.0
     else:
-        today_logs = db.query(Log).filter(
-            Log.user_id == current_user.id,
-            Log.log_date == date.today(),
-            Log.completed == True
-        ).count()
-        today_completion_rate = today_logs / total_active_habits
-        
-        week_logs = db.query(Log).filter(
-            Log.user_id == current_user.id,
-            Log.log_date >= date.today() - timedelta(days=7),
-            Log.completed == True
-        ).count()
-        this_week_completion_rate = week_logs / (total_active_habits * 7)
-    
-    total_completions = db.query(Log).filter(Log.user_id == current_user.id, Log.completed == True).count()
-    current_active_streaks = db.query(Habit).filter(Habit.user_id == current_user.id, Habit.current_streak > 0).count()
-    longest_active_streaks = db.query(Habit).filter(Habit.user_id == current_user.id, Habit.longest_streak > 0).count()
+        today_completion_rate = completions["today"] / total_active_habits
+        this_week_completion_rate = completions["week"] / (total_active_habits * 7)
+    
     return {
-        "total_habits": total_habits,
+        "as_of": as_of,
+        "total_habits": int(habit_counts.total),
         "total_active_habits": total_active_habits,
         "today_completion_rate": today_completion_rate,
         "this_week_completion_rate": this_week_completion_rate,
-        "total_completions": total_completions,
-        "current_active_streaks": current_active_streaks,
-        "longest_active_streaks": longest_active_streaks
+        "total_completions": completions["total"],
+        "current_active_streaks": int(habit_counts.current_streaks),
+        "longest_active_streaks": int(habit_counts.longest_streaks)
     }
 
 
@@ -87,115 +100,183 @@ async def get_streak_data(current_user, db: Session):
     }
 
 
+async def get_data_version(current_user, db: Session) -> str:
+    """
+    Version of the user's completion data, for ETags.
+    """
+    return heatmap_blocks.data_version(db, current_user)
+
+
 async def get_completion_heatmap(current_user, db: Session,
                                   start_date: date,
-                                  end_date: date):
+                                  end_date: date,
+                                  version: Optional[str] = None):
     """
     Get completion data for heatmap calendar.
+    Returns the completion count for every day in the range, served from
+    per-year blocks of the daily rollup.
     """
-    logs = db.query(Log).filter(
-        Log.user_id == current_user.id,
-        Log.log_date >= start_date,
-        Log.log_date <= end_date,
-        Log.completed == True
-    ).all()
-    
-    # Aggregate completions count per date
-    heatmap_data = {}
-    for log in logs:
-        if log.log_date in heatmap_data:
-            heatmap_data[log.log_date] += 1
-        else:
-            heatmap_data[log.log_date] = 1
-    return heatmap_data
-
+    version = version or heatmap_blocks.data_version(db, current_user)
+    return heatmap_blocks.daily_counts(db, current_user, start_date, end_date, version).tolist()
 
 
-async def get_progress_chart_data(current_user, db: Session,
-                                   period: str = "week"):
+def progress_range(period: str):
     """
-    Get data for progress charts.
+    (start, end) dates covered by a progress chart period.
     """
     if period == "week":
-        start_date = date.today() - timedelta(days=7)
-        end_date = date.today()
+        return date.today() - timedelta(days=7), date.today()
     elif period == "month":
-        start_date = date.today().replace(day=1)
-        end_date = date.today()
+        return date.today().replace(day=1), date.today()
     elif period == "year":
-        start_date = date.today().replace(day=1, month=1)
-        end_date = date.today()
-    else:
-        raise HTTPException(status_code=400, detail="Invalid period")
-    
-    logs = db.query(Log).filter(
-        Log.user_id == current_user.id,
-        Log.log_date >= start_date,
-        Log.log_date <= end_date,
-        Log.completed == True
-    ).all()
-    
-    # Aggregate completions count per date
-    chart_data = {}
-    for log in logs:
-        if log.log_date in chart_data:
-            chart_data[log.log_date] += 1
-        else:
-            chart_data[log.log_date] = 1
-    return chart_data
+        return date.today().replace(day=1, month=1), date.today()
+    raise HTTPException(status_code=400, detail="Invalid period")
 
 
-async def get_category_breakdown(current_user, db: Session):
+async def get_progress_chart_data(current_user, db: Session,
+                                   period: str = "week",
+                                   version: Optional[str] = None):
+    """
+    Get data for progress charts.
+    Returns (start_date, daily completion counts) for the period.
+    """
+    start_date, end_date = progress_range(period)
+    counts = await get_completion_heatmap(current_user, db, start_date, end_date, version)
+    return start_date, counts
+
+
+PERIOD_DAYS = {"week": 7, "month": 30, "year": 365}
+
+
+async def get_category_breakdown(current_user, db: Session, period: str = "all",
+                                 party_id: Optional[int] = None):
     """
     Get habit statistics by category.
+    
+    One GROUP BY over habits outer-joined to their completed logs yields
+    per-habit completion counts for the period and the last two 30-day
+    windows, plus the period's completed dates; habits are then rolled up
+    by category. completion_rate keeps its original meaning (completions
+    per habit); due_completion_rate is completed due units over due units
+    from each habit's schedule, so extra logs within one week or month of
+    a weekly/monthly habit count once.
+    
+    With party_id, covers every member's habits shared with that party.
     """
-    habits = db.query(Habit).filter(Habit.user_id == current_user.id).all()
+    if party_id is not None:
+        membership = db.query(PartyMember.id).filter(
+            PartyMember.party_id == party_id,
+            PartyMember.user_id == current_user.id,
+            PartyMember.is_active == True
+        ).first()
+        if not membership:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You are not a member of this party"
+            )
     
-    # Group habits by category first
-    from collections import defaultdict
-    categories = defaultdict(list)
-    for habit in habits:
-        categories[habit.category].append(habit)
+    today = date.today()
+    period_start = today - timedelta(days=PERIOD_DAYS[period] - 1) if period in PERIOD_DAYS else None
+    trend_start = today - timedelta(days=29)
+    previous_start = today - timedelta(days=59)
     
-    category_stats = {}
-    for category, category_habits in categories.items():
-        total_habits = len(category_habits)
-        total_completions = sum(
-            db.query(Log).filter(
-                Log.habit_id == h.id,
-                Log.completed == True
-            ).count()
-            for h in category_habits
+    def completed_between(start):
+        condition = Log.id.isnot(None) if start is None else Log.log_date >= start
+        return func.count(case((condition, Log.id)))
+    
+    def dates_between(start):
+        condition = Log.id.isnot(None) if start is None else Log.log_date >= start
+        return func.aggregate_strings(case((condition, cast(Log.log_date, String))), ",")
+    
+    join_on = and_(Log.habit_id == Habit.id, Log.completed == True)
+    if period_start is not None:
+        join_on = and_(join_on, Log.log_date >= min(period_start, previous_start))
+    
+    query = select(
+        Habit.id, Habit.category, Habit.frequency, Habit.target_days, Habit.created_at,
+        completed_between(period_start).label("completions"),
+        dates_between(period_start).label("completed_dates"),
+        completed_between(trend_start).label("last_30"),
+        func.count(case((and_(Log.log_date >= previous_start, Log.log_date < trend_start), Log.id))).label("previous_30"),
+    ).select_from(Habit).outerjoin(Log, join_on).group_by(
+        Habit.id, Habit.category, Habit.frequency, Habit.target_days, Habit.created_at
+    )
+    if party_id is not None:
+        query = query.where(Habit.party_id == party_id)
+    else:
+        query = query.where(Habit.user_id == current_user.id)
+    
+    categories = {}
+    for row in db.execute(query):
+        stats = categories.setdefault(row.category, {
+            "total_habits": 0,
+            "total_completions": 0,
+            "due_units": 0,
+            "due_completions": 0,
+            "last_30_days": 0,
+            "previous_30_days": 0,
+        })
+        created = row.created_at.date() if row.created_at else today
+        completed_dates = row.completed_dates.split(",") if row.completed_dates else []
+        _, done = get_habit_schedule(row).unit_completions(
+            np.array(completed_dates, dtype="datetime64[D]"), max(created, period_start or created), today
         )
-        # Avoid division by zero
-        completion_rate = total_completions / total_habits if total_habits > 0 else 0.0
-        
+        stats["total_habits"] += 1
+        stats["total_completions"] += row.completions
+        stats["due_units"] += len(done)
+        stats["due_completions"] += int(done.sum())
+        stats["last_30_days"] += row.last_30
+        stats["previous_30_days"] += row.previous_30
+    
+    category_stats = {}
+    for category, stats in categories.items():
+        total_habits = stats["total_habits"]
         category_stats[category] = {
             "total_habits": total_habits,
-            "total_completions": total_completions,
-            "completion_rate": completion_rate
+            "total_completions": stats["total_completions"],
+            # Avoid division by zero
+            "completion_rate": stats["total_completions"] / total_habits if total_habits > 0 else 0.0,
+            "due_completion_rate": round(stats["due_completions"] / stats["due_units"] * 100, 1) if stats["due_units"] else 0.0,
+            "trend_30d": {
+                "current": stats["last_30_days"],
+                "previous": stats["previous_30_days"],
+                "change": stats["last_30_days"] - stats["previous_30_days"],
+            },
         }
     return category_stats
 
 
-async def get_trends(current_user, db: Session):
+async def get_trends(current_user, db: Session, period: str = "week", sparkline_points: int = 0):
     """
     Analyze habit tracking trends.
+    Compares the current period with the one before it; all aggregation
+    happens in the database (see app.utils.trends).
     """
-    current_week_logs = db.query(Log).filter(Log.user_id == current_user.id, Log.log_date >= date.today() - timedelta(days=7), Log.log_date <= date.today()).all()
-    previous_week_logs = db.query(Log).filter(Log.user_id == current_user.id, Log.log_date >= date.today() - timedelta(days=14), Log.log_date < date.today() - timedelta(days=7)).all()
-    current_month_logs = db.query(Log).filter(Log.user_id == current_user.id, Log.log_date >= date.today().replace(day=1), Log.log_date <= date.today()).all()
-    previous_month_logs = db.query(Log).filter(Log.user_id == current_user.id, Log.log_date >= date.today().replace(day=1) - timedelta(days=30), Log.log_date < date.today().replace(day=1)).all()
-    current_year_logs = db.query(Log).filter(Log.user_id == current_user.id, Log.log_date >= date.today().replace(day=1, month=1), Log.log_date <= date.today()).all()
-    previous_year_logs = db.query(Log).filter(Log.user_id == current_user.id, Log.log_date >= date.today().replace(day=1, month=1) - timedelta(days=365), Log.log_date < date.today().replace(day=1, month=1)).all()
-    return {
-        "current_week_logs": current_week_logs,
-        "previous_week_logs": previous_week_logs,
-        "current_month_logs": current_month_logs,
-        "previous_month_logs": previous_month_logs,
-        "current_year_logs": current_year_logs,
-        "previous_year_logs": previous_year_logs
-    }
+    return trends.compute_trends(db, current_user, period, sparkline_points)
+
+
+async def get_time_of_day(current_user, db: Session, habit_id: Optional[int] = None,
+                          start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Completion histograms by local hour and weekday.
+    """
+    if habit_id is not None:
+        habit = db.query(Habit.id).filter(
+            Habit.id == habit_id,
+            Habit.user_id == current_user.id
+        ).first()
+        if not habit:
+            raise HTTPException(status_code=404, detail="Habit not found")
+    return time_of_day.completion_histogram(db, current_user, habit_id, start_date, end_date)
+
+
+async def get_correlations(current_user, db: Session, days: int = 90, limit: int = 10,
+                           include_matrix: bool = False):
+    """
+    Which habits are completed on the same days (correlation and lift).
+    """
+    return await correlations.habit_correlations(db, current_user, days, limit, include_matrix)
+
 
 async def get_achievements_progress(current_user, db: Session):
     """
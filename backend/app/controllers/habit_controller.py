@@ -9,13 +9,17 @@ Handles CRUD operations for personal habits.
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import List, Optional
-from datetime import date
 
 from app.models.habit import Habit, HabitFrequency, HabitCategory
 from app.models.log import Log
 from app.models.party_member import PartyMember
 from app.schemas.habit import HabitCreate, HabitUpdate, HabitResponse, HabitStats
-from app.utils.streak_calculator import update_habit_streaks
+from app.utils.log_upsert import upsert_log
+from app.utils.streak_calculator import refresh_habit_streaks
+from app.utils.completion_bitmap import completed_on, with_bitmaps
+from app.utils import daily_stats
+from app.utils.analytics_cache import analytics_cache
+from app.utils.timezone_helper import local_today
 
 
 async def create_habit(habit_data: HabitCreate, current_user, db: Session):
@@ -54,7 +58,9 @@ async def create_habit(habit_data: HabitCreate, current_user, db: Session):
     )
     
     db.add(new_habit)
+    daily_stats.refresh_active_habits(db, current_user)
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     db.refresh(new_habit)
     
     return new_habit
@@ -66,7 +72,7 @@ async def get_user_habits(current_user, db: Session,
     """
     Get all habits for the current user.
     """
-    query = db.query(Habit).filter(Habit.user_id == current_user.id)
+    query = db.query(Habit).options(with_bitmaps).filter(Habit.user_id == current_user.id)
     
     # Apply optional filters
     if category:
@@ -79,14 +85,10 @@ async def get_user_habits(current_user, db: Session,
     habits = query.order_by(Habit.created_at.desc()).all()
     
     # Add today's completion status for each habit
-    today = date.today()
+    today = local_today(current_user.timezone)
     result = []
     for habit in habits:
-        completed_today = db.query(Log).filter(
-            Log.habit_id == habit.id,
-            Log.log_date == today,
-            Log.completed == True
-        ).first() is not None
+        completed_today = completed_on(habit, today, db)
         
         habit_dict = {
             "id": habit.id,
@@ -132,12 +134,8 @@ async def get_habit_by_id(habit_id: int, current_user, db: Session):
         )
     
     # Add completed_today status
-    today = date.today()
-    completed_today = db.query(Log).filter(
-        Log.habit_id == habit.id,
-        Log.log_date == today,
-        Log.completed == True
-    ).first() is not None
+    today = local_today(current_user.timezone)
+    completed_today = completed_on(habit, today, db)
     
     return {
         **habit.__dict__,
@@ -165,13 +163,22 @@ async def update_habit(habit_id: int, habit_data: HabitUpdate, current_user, db:
             detail="Not authorized to update this habit"
         )
     
+    schedule = (habit.frequency, habit.target_days)
+    
     # Update only provided fields
     update_data = habit_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if value is not None:
             setattr(habit, field, value)
     
+    # Streaks are counted in schedule units; recount them under the new schedule
+    if (habit.frequency, habit.target_days) != schedule:
+        habit.longest_streak = 0
+        refresh_habit_streaks(habit, db, local_today(current_user.timezone))
+    if "is_active" in update_data:
+        daily_stats.refresh_active_habits(db, current_user)
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     db.refresh(habit)
     
     return habit
@@ -197,7 +204,9 @@ async def delete_habit(habit_id: int, current_user, db: Session):
     
     # Soft delete - set is_active = False
     habit.is_active = False
+    daily_stats.refresh_active_habits(db, current_user)
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     
     return {"message": "Habit deleted successfully"}
 
@@ -253,7 +262,8 @@ async def complete_habit_today(habit_id: int, current_user, db: Session):
     """
     Quick complete a habit for today.
     """
-    habit = db.query(Habit).filter(Habit.id == habit_id).first()
+    # Locked until commit: set_completed rewrites the habit's bitmap
+    habit = db.query(Habit).options(with_bitmaps).filter(Habit.id == habit_id).with_for_update().first()
     
     if not habit:
         raise HTTPException(
@@ -267,32 +277,14 @@ async def complete_habit_today(habit_id: int, current_user, db: Session):
             detail="Not authorized to complete this habit"
         )
     
-    today = date.today()
-    from datetime import datetime
+    today = local_today(current_user.timezone)
     
-    # Check if already logged today
-    existing_log = db.query(Log).filter(
-        Log.habit_id == habit_id,
-        Log.log_date == today
-    ).first()
-    
-    if existing_log:
-        existing_log.completed = True
-        existing_log.completion_time = datetime.utcnow()
-    else:
-        new_log = Log(
-            habit_id=habit_id,
-            user_id=current_user.id,
-            log_date=today,
-            completed=True,
-            completion_time=datetime.utcnow()
-        )
-        db.add(new_log)
+    # One upsert, so a double tap can't trip uq_habit_log_date
+    upsert_log(db, current_user, habit, today, completed=True)
+    current_streak, longest_streak = habit.current_streak, habit.longest_streak
     
     db.commit()
-    
-    # Update streak using proper calculation (after commit so log is saved)
-    current_streak, longest_streak = update_habit_streaks(habit_id, db)
+    analytics_cache.invalidate_user(current_user.id)
     
     return {
         "message": "Habit completed for today",
@@ -6,23 +6,35 @@ Log Controller
 Handles habit completion logging and history.
 """
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import Optional, List
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
+from collections import defaultdict
 
 from app.models.log import Log
 from app.models.habit import Habit
-from app.schemas.log import LogCreate, LogUpdate, LogResponse, DailyLogSummary, WeeklyLogSummary
-from app.utils.streak_calculator import update_habit_streaks
+from app.schemas.log import (
+    LogCreate, LogUpdate, LogResponse, DailyLogSummary, WeeklyLogSummary,
+    LogBatchRequest, LogBatchItemResult, LogBatchResponse
+)
+from app.utils.streak_calculator import record_completion, record_uncompletion, refresh_habit_streaks
+from app.utils import completion_bitmap, daily_stats, log_summary
+from app.utils.analytics_cache import analytics_cache
+from app.utils.log_upsert import upsert_log
+from app.utils.timezone_helper import local_today
 
 
 async def log_habit_completion(log_data: LogCreate, current_user, db: Session):
     """
     Log a habit completion for a specific date.
     """
-    # Get the habit being logged
-    habit = db.query(Habit).filter(Habit.id == log_data.habit_id).first()
+    # Get the habit being logged (with its bitmap, which gives the day's previous
+    # state). The row stays locked, since set_completed rewrites the bitmap
+    habit = db.query(Habit).options(completion_bitmap.with_bitmaps).filter(
+        Habit.id == log_data.habit_id
+    ).with_for_update().first()
     
     if not habit:
         raise HTTPException(
@@ -38,48 +50,142 @@ async def log_habit_completion(log_data: LogCreate, current_user, db: Session):
         )
     
     # Determine the log date
-    log_date = log_data.log_date or date.today()
-    
-    # Check if log already exists for this habit + date
-    existing_log = db.query(Log).filter(
-        Log.habit_id == log_data.habit_id,
-        Log.log_date == log_date
-    ).first()
-    
-    if existing_log:
-        # Update existing log
-        existing_log.completed = log_data.completed
-        existing_log.notes = log_data.notes
-        existing_log.mood = log_data.mood
-        existing_log.duration_minutes = log_data.duration_minutes
-        if log_data.completed:
-            existing_log.completion_time = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(existing_log)
-        log_entry = existing_log
-    else:
-        # Create new log
-        log_entry = Log(
-            habit_id=log_data.habit_id,
-            user_id=current_user.id,
-            log_date=log_date,
-            completed=log_data.completed,
-            completion_time=datetime.utcnow() if log_data.completed else None,
-            notes=log_data.notes,
-            mood=log_data.mood,
-            duration_minutes=log_data.duration_minutes
-        )
-        db.add(log_entry)
+    log_date = log_data.log_date or local_today(current_user.timezone)
+    
+    # Insert or overwrite in one statement; streaks and rollup follow in the same transaction
+    log_entry, _ = upsert_log(
+        db, current_user, habit, log_date, log_data.completed,
+        notes=log_data.notes,
+        mood=log_data.mood,
+        duration_minutes=log_data.duration_minutes
+    )
+    # Serialize before commit expires the row
+    response = LogResponse.model_validate(log_entry)
     
     db.commit()
-    db.refresh(log_entry)
+    analytics_cache.invalidate_user(current_user.id)
     
-    # Update habit streaks using proper calculation (after commit so log is saved)
-    if log_data.completed:
-        update_habit_streaks(log_data.habit_id, db)
-    
-    return log_entry
+    return response
+
+
+async def submit_log_batch(batch: LogBatchRequest, current_user, db: Session) -> LogBatchResponse:
+    """
+    Upsert many logs in one transaction, e.g. completions replayed by a
+    client that was offline.
+    
+    Ownership is checked with one habit query and existing logs are loaded
+    with one more. Items for a habit/day that already has a log update it
+    (later items win). Streaks are recomputed once per habit whose
+    completions changed, and rollup deltas are applied once per day.
+    Items for unknown habits fail individually without failing the batch.
+    """
+    today = local_today(current_user.timezone)
+    habit_ids = {item.habit_id for item in batch.logs}
+    habits = {
+        habit.id: habit
+        # Locked in id order, so concurrent batches can't deadlock on them
+        for habit in db.query(Habit).options(completion_bitmap.with_bitmaps).filter(
+            Habit.id.in_(habit_ids),
+            Habit.user_id == current_user.id
+        ).order_by(Habit.id).with_for_update()
+    }
+    dates = {item.log_date or today for item in batch.logs}
+    logs = {
+        (log.habit_id, log.log_date): log
+        for log in db.query(Log).filter(
+            Log.user_id == current_user.id,
+            Log.habit_id.in_(list(habits)),
+            Log.log_date.in_(dates)
+        )
+    } if habits else {}
+    
+    # State of each touched habit/day before the batch: (contribution, completed)
+    before = {}
+    results = []
+    for index, item in enumerate(batch.logs):
+        habit = habits.get(item.habit_id)
+        if habit is None:
+            results.append((index, "error", None, "Habit not found"))
+            continue
+        
+        key = (item.habit_id, item.log_date or today)
+        log = logs.get(key)
+        if key not in before:
+            before[key] = (daily_stats.log_contribution(log), bool(log and log.completed))
+        
+        if log is None:
+            log = logs[key] = Log(
+                habit_id=item.habit_id,
+                user_id=current_user.id,
+                log_date=key[1],
+                completed=item.completed,
+                completion_time=datetime.utcnow() if item.completed else None,
+                notes=item.notes,
+                mood=item.mood,
+                duration_minutes=item.duration_minutes
+            )
+            db.add(log)
+            results.append((index, "created", log, None))
+            continue
+        
+        if item.completed and not log.completed:
+            log.completion_time = datetime.utcnow()
+        log.completed = item.completed
+        if item.notes is not None:
+            log.notes = item.notes
+        if item.mood is not None:
+            log.mood = item.mood
+        if item.duration_minutes is not None:
+            log.duration_minutes = item.duration_minutes
+        results.append((index, "updated", log, None))
+    
+    deltas = defaultdict(lambda: dict(daily_stats.NO_CONTRIBUTION))
+    changed_habits = set()
+    for key, (contribution, was_completed) in before.items():
+        log = logs[key]
+        after = daily_stats.log_contribution(log)
+        for field in daily_stats.STAT_FIELDS:
+            deltas[key[1]][field] += after[field] - contribution[field]
+        if log.completed != was_completed:
+            completion_bitmap.set_completed(habits[key[0]], key[1], log.completed, db)
+            changed_habits.add(key[0])
+    
+    if daily_stats.is_built(current_user):
+        for day, delta in deltas.items():
+            daily_stats.apply_delta(db, current_user.id, day, delta)
+        daily_stats.bump_version(db, current_user.id)
+    for habit_id in changed_habits:
+        refresh_habit_streaks(habits[habit_id], db, today)
+    
+    try:
+        db.flush()
+        # Serialize before commit expires the rows
+        response = LogBatchResponse(results=[
+            LogBatchItemResult(
+                index=index,
+                status=item_status,
+                log=LogResponse.model_validate(log) if log is not None else None,
+                error=error
+            )
+            for index, item_status, log, error in results
+        ])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A log in this batch was written concurrently. Retry the batch."
+        )
+    analytics_cache.invalidate_user(current_user.id)
+    
+    for result in response.results:
+        if result.status == "created":
+            response.created += 1
+        elif result.status == "updated":
+            response.updated += 1
+        else:
+            response.failed += 1
+    return response
 
 
 async def get_habit_logs(habit_id: int, current_user, db: Session,
@@ -144,7 +250,14 @@ async def update_log(log_id: int, log_data: LogUpdate, current_user, db: Session
     """
     Update an existing log entry.
     """
-    log = db.query(Log).filter(Log.id == log_id).first()
+    habit_id = db.query(Log.habit_id).filter(Log.id == log_id).scalar()
+    # Lock the habit before reading the log, so concurrent toggles of the
+    # same log each see the other's committed state
+    habit = db.query(Habit).options(completion_bitmap.with_bitmaps).filter(
+        Habit.id == habit_id,
+        Habit.user_id == current_user.id
+    ).with_for_update().first()
+    log = db.query(Log).populate_existing().filter(Log.id == log_id).first()
     
     if not log:
         raise HTTPException(
@@ -161,6 +274,7 @@ async def update_log(log_id: int, log_data: LogUpdate, current_user, db: Session
     
     # Track completion status change
     was_completed = log.completed
+    before = daily_stats.log_contribution(log)
     
     # Update provided fields
     if log_data.completed is not None:
@@ -177,7 +291,17 @@ async def update_log(log_id: int, log_data: LogUpdate, current_user, db: Session
     if log_data.duration_minutes is not None:
         log.duration_minutes = log_data.duration_minutes
     
+    daily_stats.record_log_change(db, current_user, log.log_date, before, daily_stats.log_contribution(log))
+    
+    # Keep habit streaks in sync with completion changes
+    if log.completed != was_completed:
+        if log.completed:
+            record_completion(habit, log.log_date, db, local_today(current_user.timezone))
+        else:
+            record_uncompletion(habit, log.log_date, db, local_today(current_user.timezone))
+    
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     db.refresh(log)
     
     return log
@@ -187,7 +311,13 @@ async def delete_log(log_id: int, current_user, db: Session):
     """
     Delete a log entry.
     """
-    log = db.query(Log).filter(Log.id == log_id).first()
+    habit_id = db.query(Log.habit_id).filter(Log.id == log_id).scalar()
+    # Lock the habit before reading the log (see update_log)
+    habit = db.query(Habit).options(completion_bitmap.with_bitmaps).filter(
+        Habit.id == habit_id,
+        Habit.user_id == current_user.id
+    ).with_for_update().first()
+    log = db.query(Log).populate_existing().filter(Log.id == log_id).first()
     
     if not log:
         raise HTTPException(
@@ -202,8 +332,20 @@ async def delete_log(log_id: int, current_user, db: Session):
             detail="Not authorized to delete this log"
         )
     
+    was_completed = log.completed
+    log_date = log.log_date
+    
+    daily_stats.record_log_change(
+        db, current_user, log_date, daily_stats.log_contribution(log), daily_stats.NO_CONTRIBUTION
+    )
     db.delete(log)
+    
+    # Removing a completed day can break a streak
+    if was_completed:
+        record_uncompletion(habit, log_date, db, local_today(current_user.timezone))
+    
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     
     return {"message": "Log deleted successfully"}
 
@@ -212,134 +354,52 @@ async def get_daily_summary(log_date: date, current_user, db: Session) -> DailyL
     """
     Get summary of all habits for a specific date.
     """
-    # Get all user's active habits
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
-    
-    total_habits = len(habits)
-    
-    # Get logs for this date
-    logs = db.query(Log).filter(
-        Log.user_id == current_user.id,
-        Log.log_date == log_date
-    ).all()
-    
-    completed_habits = sum(1 for log in logs if log.completed)
-    completion_percentage = (completed_habits / total_habits * 100) if total_habits > 0 else 0.0
-    
-    return DailyLogSummary(
-        date=log_date,
-        total_habits=total_habits,
-        completed_habits=completed_habits,
-        completion_percentage=completion_percentage,
-        logs=logs
-    )
+    return DailyLogSummary(**log_summary.daily_summary(db, current_user, log_date))
 
 
 async def get_weekly_summary(current_user, db: Session,
-                             week_start: Optional[date] = None) -> dict:
+                             week_start: Optional[date] = None,
+                             include_logs: bool = False) -> dict:
     """
-    Get summary for a week.
+    Get summary for a week (Monday to Sunday by default).
     """
-    # Determine week boundaries
-    if week_start is None:
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())  # Monday
-    
-    week_end = week_start + timedelta(days=6)  # Sunday
-    
-    # Get all user's active habits
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
-    
-    total_habits = len(habits)
-    
-    # Build daily summaries
-    daily_summaries = []
-    total_completions = 0
-    best_day = None
-    best_day_rate = 0.0
-    
-    for i in range(7):
-        day = week_start + timedelta(days=i)
-        
-        logs = db.query(Log).filter(
-            Log.user_id == current_user.id,
-            Log.log_date == day
-        ).all()
-        
-        completed = sum(1 for log in logs if log.completed)
-        total_completions += completed
-        rate = (completed / total_habits * 100) if total_habits > 0 else 0.0
-        
-        if rate > best_day_rate:
-            best_day_rate = rate
-            best_day = day
-        
-        daily_summaries.append({
-            "date": day,
-            "total_habits": total_habits,
-            "completed_habits": completed,
-            "completion_percentage": rate
-        })
-    
-    # Calculate weekly stats
-    total_possible = total_habits * 7
-    weekly_rate = (total_completions / total_possible * 100) if total_possible > 0 else 0.0
-    
-    return {
-        "week_start": week_start,
-        "week_end": week_end,
-        "daily_summaries": daily_summaries,
-        "weekly_completion_rate": weekly_rate,
-        "total_completions": total_completions,
-        "total_habits_tracked": total_habits,
-        "best_day": best_day,
-        "best_day_completion_rate": best_day_rate
-    }
+    return log_summary.weekly_summary(db, current_user, week_start, include_logs)
+
+
+async def get_range_summary(current_user, db: Session, start_date: date, end_date: date,
+                            include_logs: bool = False) -> dict:
+    """
+    Get per-day summaries for a custom date range.
+    """
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be on or after start_date"
+        )
+    if (end_date - start_date).days + 1 > log_summary.MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range cannot exceed {log_summary.MAX_RANGE_DAYS} days"
+        )
+    return log_summary.range_summary(db, current_user, start_date, end_date, include_logs)
 
 
 async def get_monthly_summary(current_user, db: Session,
                                month: int, year: int) -> dict:
     """
-    Get summary for a month.
+    Get summary for a month, with per-day and per-habit completion counts.
     """
-    from calendar import monthrange
-    
-    # Get first and last day of month
-    first_day = date(year, month, 1)
-    last_day = date(year, month, monthrange(year, month)[1])
-    
-    # Get all user's active habits
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
-    
-    total_habits = len(habits)
-    
-    # Get all logs for the month
-    logs = db.query(Log).filter(
-        Log.user_id == current_user.id,
-        Log.log_date >= first_day,
-        Log.log_date <= last_day
-    ).all()
-    
-    total_completions = sum(1 for log in logs if log.completed)
-    days_in_month = (last_day - first_day).days + 1
-    total_possible = total_habits * days_in_month
-    completion_rate = (total_completions / total_possible * 100) if total_possible > 0 else 0.0
-    
-    return {
-        "month": month,
-        "year": year,
-        "total_completions": total_completions,
-        "total_possible": total_possible,
-        "completion_rate": completion_rate,
-        "total_habits": total_habits,
-        "days_in_month": days_in_month
-    }
+    return log_summary.monthly_summaries(db, current_user, year, month)[0]
+
+
+async def get_monthly_summaries(current_user, db: Session,
+                                month: int, year: int, months: int = 1) -> List[dict]:
+    """
+    Get summaries for the `months` months ending at year/month, oldest first.
+    """
+    if not 1 <= months <= log_summary.MAX_MONTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"months must be between 1 and {log_summary.MAX_MONTHS}"
+        )
+    return log_summary.monthly_summaries(db, current_user, year, month, months)
@@ -0,0 +1,7 @@
+"""
+Jobs Package
+============
+Batch jobs and maintenance tasks that run outside the request cycle.
+
+Each module can be run directly, e.g. ``python -m app.jobs.recompute_streaks``.
+"""
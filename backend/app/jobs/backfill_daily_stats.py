@@ -0,0 +1,45 @@
+"""
+Daily Stats Backfill
+====================
+[HASEEB] Rebuilds the user_daily_stats rollup from the logs table.
+
+Users are otherwise backfilled lazily on their first analytics request;
+run this after deploying the rollup, or to repair drift:
+
+    python -m app.jobs.backfill_daily_stats
+    python -m app.jobs.backfill_daily_stats --user-id 42 --user-id 43
+"""
+
+import argparse
+import logging
+import time
+from typing import Dict
+
+from app.database import SessionLocal
+from app.utils.daily_stats import backfill_daily_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description="Rebuild the user_daily_stats rollup from logs.")
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids",
+                        help="Only rebuild these users (repeatable)")
+    args = parser.parse_args(argv)
+    
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rows = backfill_daily_stats(db, args.user_ids)
+    finally:
+        db.close()
+    
+    elapsed = round(time.perf_counter() - started, 4)
+    logger.info("Wrote %s daily stats rows in %ss", rows, elapsed)
+    return {"rows_written": rows, "elapsed_seconds": elapsed}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,75 @@
+"""
+Import Logs Job
+===============
+[OMAMAH] Imports a CSV log history for one user from the command line.
+
+Same format and behaviour as POST /api/logs/import (columns date, habit,
+completed, notes, mood; missing habits are created). Useful for large
+migrations that should not go through an HTTP upload:
+
+    python -m app.jobs.import_logs history.csv --user-id 42
+    python -m app.jobs.import_logs history.csv --user-id 42 --skip-existing
+
+The running API only sees the analytics cache invalidation this job
+makes when ANALYTICS_CACHE_BACKEND=sqlite (a file both processes
+share). With the default in-process memory backend the server keeps
+serving cached analytics for the user until it restarts or the user
+writes again.
+"""
+
+import argparse
+import logging
+import time
+from typing import Dict
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.user import User
+from app.utils import log_import
+from app.utils.analytics_cache import analytics_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description="Import habit logs from a CSV file.")
+    parser.add_argument("path", help="CSV file with columns date, habit, completed, notes, mood")
+    parser.add_argument("--user-id", type=int, required=True, help="Owner of the imported logs")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Keep logs that already exist instead of overwriting them")
+    parser.add_argument("--batch-size", type=int, default=log_import.BATCH_SIZE,
+                        help="Rows per INSERT statement")
+    args = parser.parse_args(argv)
+    
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        user = db.get(User, args.user_id)
+        if user is None:
+            parser.error(f"user {args.user_id} not found")
+        errors = []
+        with open(args.path, encoding="utf-8-sig", newline="") as f:
+            result = log_import.import_logs(
+                db, user, log_import.parse_csv(f, errors),
+                overwrite=not args.skip_existing, batch_size=args.batch_size, errors=errors
+            )
+        analytics_cache.invalidate_user(user.id)
+        if settings.ANALYTICS_CACHE_ENABLED and settings.ANALYTICS_CACHE_BACKEND != "sqlite":
+            logger.warning("Analytics cache backend %r is per process; the API may serve cached "
+                           "analytics for user %s until restart", settings.ANALYTICS_CACHE_BACKEND, user.id)
+    finally:
+        db.close()
+    
+    for error in result["errors"]:
+        logger.warning("Line %s: %s", error["line"], error["error"])
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 4)
+    logger.info("Wrote %s logs (%s habits created, %s errors) in %ss",
+                result["logs_written"], len(result["habits_created"]), result["error_count"],
+                result["elapsed_seconds"])
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,56 @@
+"""
+Recompute Streaks Job
+=====================
+[NOUMAN] Maintenance job for rebuilding stored streaks.
+
+Rebuilds Habit.current_streak / longest_streak from the logs table after
+data repairs or imports. Run from the backend directory:
+
+    python -m app.jobs.recompute_streaks
+    python -m app.jobs.recompute_streaks --user-id 3
+    python -m app.jobs.recompute_streaks --habit-id 10 --habit-id 11
+    python -m app.jobs.recompute_streaks --bitmaps
+"""
+
+import argparse
+import logging
+
+from app.database import SessionLocal
+from app.utils.analytics_cache import analytics_cache
+from app.utils.streak_calculator import bulk_recompute_streaks
+from app.utils.completion_bitmap import rebuild_bitmaps
+
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Recompute habit streaks from logs.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only habits owned by this user")
+    parser.add_argument("--habit-id", type=int, action="append", dest="habit_ids",
+                        help="Only this habit (repeatable)")
+    parser.add_argument("--bitmaps", action="store_true",
+                        help="Also rebuild completion bitmaps from logs")
+    args = parser.parse_args(argv)
+    
+    db = SessionLocal()
+    try:
+        if args.bitmaps:
+            rebuilt = rebuild_bitmaps(db, habit_ids=args.habit_ids, user_id=args.user_id)
+            logger.info("Rebuilt completion bitmaps for %s habits", rebuilt)
+        result = bulk_recompute_streaks(db, habit_ids=args.habit_ids, user_id=args.user_id)
+        for user_id in result["user_ids"]:
+            analytics_cache.invalidate_user(user_id)
+    finally:
+        db.close()
+    
+    logger.info(
+        "Recomputed streaks for %s habits in %ss (%s rows/s)",
+        result["habits_updated"], result["elapsed_seconds"], result["rows_per_second"]
+    )
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
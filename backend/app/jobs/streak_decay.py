@@ -0,0 +1,158 @@
+"""
+Streak Decay Sweeper
+====================
+[NOUMAN] Scheduled job that keeps Habit.current_streak honest.
+
+current_streak only changes on writes, so a habit that is simply not
+logged would keep showing its old streak. After each local midnight this
+job zeroes streaks whose last completion is older than yesterday (or
+the previous due unit, for scheduled habits) with set-based UPDATEs per
+timezone bucket. Read endpoints can then trust the stored column.
+
+Habits without last_completed_date (rows written before it existed) are
+left alone; run app.jobs.recompute_streaks once to backfill them.
+
+Run once from the backend directory:
+
+    python -m app.jobs.streak_decay
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.habit import Habit, HabitFrequency
+from app.models.user import User
+from app.utils.analytics_cache import analytics_cache
+from app.utils.habit_schedule import get_habit_schedule
+from app.utils.timezone_helper import local_today
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_timezone_buckets(db: Session) -> List[Optional[str]]:
+    """
+    Distinct timezone names across users (None for users without one).
+    """
+    return db.execute(select(User.timezone).distinct()).scalars().all()
+
+
+def sweep_timezone(db: Session, tz_name: Optional[str], today: date) -> int:
+    """
+    Reset broken streaks for every user in one timezone bucket.
+    Returns the number of habits reset.
+    
+    Daily habits are reset with a single UPDATE. Weekly/monthly/custom
+    habits with a live streak are checked against their schedule and
+    reset with one more UPDATE by id.
+    """
+    bucket_users = select(User.id).where(
+        User.timezone.is_(None) if tz_name is None else User.timezone == tz_name
+    )
+    result = db.execute(
+        update(Habit)
+        .where(
+            Habit.frequency == HabitFrequency.DAILY,
+            Habit.current_streak > 0,
+            Habit.last_completed_date < today - timedelta(days=1),
+            Habit.user_id.in_(bucket_users)
+        )
+        .values(current_streak=0)
+        .execution_options(synchronize_session=False)
+    )
+    reset_count = result.rowcount
+    
+    scheduled = db.execute(
+        select(Habit.id, Habit.frequency, Habit.target_days, Habit.last_completed_date).where(
+            Habit.frequency != HabitFrequency.DAILY,
+            Habit.current_streak > 0,
+            Habit.last_completed_date.isnot(None),
+            Habit.user_id.in_(bucket_users)
+        )
+    ).all()
+    broken_ids = [
+        row.id for row in scheduled
+        if get_habit_schedule(row).units_between(row.last_completed_date, today) > 0
+    ]
+    if broken_ids:
+        db.execute(
+            update(Habit)
+            .where(Habit.id.in_(broken_ids))
+            .values(current_streak=0)
+            .execution_options(synchronize_session=False)
+        )
+        reset_count += len(broken_ids)
+    
+    db.commit()
+    if reset_count:
+        for user_id in db.execute(bucket_users).scalars():
+            analytics_cache.invalidate_user(user_id)
+    return reset_count
+
+
+class StreakDecaySweeper:
+    """
+    Sweeps each timezone bucket once per local day.
+    
+    Remembers the last local date swept per bucket, so it can be called
+    as often as needed and only does work after a bucket crosses midnight.
+    """
+    
+    def __init__(self):
+        self._last_swept: Dict[Optional[str], date] = {}
+    
+    def run_due(self, db: Session, now: Optional[datetime] = None) -> Dict[Optional[str], int]:
+        """
+        Sweep every bucket whose local date changed since its last sweep.
+        Returns habits reset per swept bucket.
+        """
+        swept = {}
+        for tz_name in get_timezone_buckets(db):
+            today = local_today(tz_name, now)
+            if self._last_swept.get(tz_name) == today:
+                continue
+            swept[tz_name] = sweep_timezone(db, tz_name, today)
+            self._last_swept[tz_name] = today
+        
+        if swept:
+            logger.info(f"Streak decay sweep reset {sum(swept.values())} habits across {len(swept)} timezones")
+        return swept
+    
+    def run_once(self) -> Dict[Optional[str], int]:
+        """
+        Run due sweeps with a fresh session.
+        """
+        db = SessionLocal()
+        try:
+            return self.run_due(db)
+        finally:
+            db.close()
+    
+    async def run_forever(self, interval_seconds: int):
+        """
+        Background loop started from the app lifespan.
+        """
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"Streak decay sweep failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+streak_decay_sweeper = StreakDecaySweeper()
+
+
+def main() -> Dict[Optional[str], int]:
+    return StreakDecaySweeper().run_once()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
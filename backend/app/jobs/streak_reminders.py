@@ -0,0 +1,177 @@
+"""
+Streak Reminder Scheduler
+=========================
+[NOUMAN] Scheduled job that warns users before a streak breaks.
+
+A few hours before local midnight, each timezone bucket gets one
+set-based at-risk query (see streak_calculator.find_at_risk_habits) and
+one notification per at-risk habit is queued in an in-process outbox.
+Delivery (push, email, ...) drains the outbox; tests drain it directly.
+
+Each bucket is handled at most once per local day, so the job can run
+on a short interval.
+
+Run once from the backend directory:
+
+    python -m app.jobs.streak_reminders
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.jobs.streak_decay import get_timezone_buckets
+from app.models.user import User
+from app.utils.streak_calculator import find_at_risk_habits
+from app.utils.timezone_helper import local_now
+
+
+logger = logging.getLogger(__name__)
+
+
+class StreakReminder(NamedTuple):
+    """One at-risk notification waiting for delivery."""
+    user_id: int
+    habit_id: int
+    habit_title: str
+    current_streak: int
+    local_date: date
+    timezone: Optional[str]
+
+
+class ReminderOutbox:
+    """
+    Thread-safe in-process queue of pending reminders.
+    """
+    
+    def __init__(self):
+        self._items: Deque[StreakReminder] = deque()
+        self._lock = threading.Lock()
+    
+    def put_many(self, reminders: List[StreakReminder]):
+        with self._lock:
+            self._items.extend(reminders)
+    
+    def drain(self) -> List[StreakReminder]:
+        """
+        Remove and return everything queued so far.
+        """
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+        return items
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def collect_timezone(db: Session, tz_name: Optional[str], today: date) -> List[StreakReminder]:
+    """
+    At-risk reminders for every active user in one timezone bucket.
+    """
+    bucket_users = select(User.id).where(
+        User.is_active == True,
+        User.timezone.is_(None) if tz_name is None else User.timezone == tz_name
+    )
+    return [
+        StreakReminder(
+            user_id=row.user_id,
+            habit_id=row.id,
+            habit_title=row.title,
+            current_streak=row.current_streak,
+            local_date=today,
+            timezone=tz_name
+        )
+        for row in find_at_risk_habits(db, today, bucket_users)
+    ]
+
+
+class StreakReminderScheduler:
+    """
+    Fills the outbox for each timezone bucket once per local day, once
+    the bucket is within `hours_before_midnight` of midnight.
+    """
+    
+    def __init__(self, outbox: ReminderOutbox, hours_before_midnight: int = 4):
+        self.outbox = outbox
+        self.hours_before_midnight = hours_before_midnight
+        self._last_sent: Dict[Optional[str], date] = {}
+    
+    def run_due(self, db: Session, now: Optional[datetime] = None) -> Dict[Optional[str], int]:
+        """
+        Queue reminders for every bucket inside its reminder window.
+        Returns reminders queued per bucket handled.
+        """
+        queued = {}
+        window = timedelta(hours=24 - self.hours_before_midnight)
+        for tz_name in get_timezone_buckets(db):
+            local = local_now(tz_name, now)
+            today = local.date()
+            if self._last_sent.get(tz_name) == today:
+                continue
+            if local - local.replace(hour=0, minute=0, second=0, microsecond=0) < window:
+                continue
+            reminders = collect_timezone(db, tz_name, today)
+            self.outbox.put_many(reminders)
+            self._last_sent[tz_name] = today
+            queued[tz_name] = len(reminders)
+        
+        if queued:
+            logger.info(f"Queued {sum(queued.values())} streak reminders across {len(queued)} timezones")
+        return queued
+    
+    def run_once(self) -> Dict[Optional[str], int]:
+        """
+        Run due buckets with a fresh session.
+        """
+        db = SessionLocal()
+        try:
+            return self.run_due(db)
+        finally:
+            db.close()
+    
+    async def run_forever(self, interval_seconds: int):
+        """
+        Background loop started from the app lifespan.
+        """
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"Streak reminder run failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+reminder_outbox = ReminderOutbox()
+streak_reminder_scheduler = StreakReminderScheduler(
+    reminder_outbox,
+    hours_before_midnight=settings.STREAK_REMINDER_HOURS_BEFORE_MIDNIGHT
+)
+
+
+def main() -> List[StreakReminder]:
+    """
+    Collect reminders for every bucket right now, ignoring the window.
+    """
+    db = SessionLocal()
+    try:
+        reminders = []
+        for tz_name in get_timezone_buckets(db):
+            reminders.extend(collect_timezone(db, tz_name, local_now(tz_name).date()))
+        logger.info(f"{len(reminders)} habits at risk")
+        return reminders
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
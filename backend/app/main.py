@@ -10,13 +10,16 @@ It initializes the FastAPI app and registers all routers.
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from app.config import settings
 from app.database import engine, Base
+from app.jobs.streak_decay import streak_decay_sweeper
+from app.jobs.streak_reminders import streak_reminder_scheduler
 
 # Import all routers
-from app.routers import auth, habits, logs, analytics, parties, party_goals, calendar, ai, accountability
+from app.routers import auth, habits, logs, analytics, parties, party_goals, calendar, ai, accountability, admin
 
 
 # Configure logging
@@ -39,12 +42,25 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Database initialization error: {e}")
     
+    # Start background jobs
+    background_tasks = []
+    if settings.STREAK_DECAY_SWEEP_ENABLED:
+        background_tasks.append(asyncio.create_task(
+            streak_decay_sweeper.run_forever(settings.STREAK_DECAY_INTERVAL_SECONDS)
+        ))
+    if settings.STREAK_REMINDER_ENABLED:
+        background_tasks.append(asyncio.create_task(
+            streak_reminder_scheduler.run_forever(settings.STREAK_REMINDER_INTERVAL_SECONDS)
+        ))
+    
     logger.info("Habit Tracker API started successfully!")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Habit Tracker API...")
+    for task in background_tasks:
+        task.cancel()
     logger.info("Cleanup completed. Goodbye!")
 
 
@@ -85,6 +101,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Caching and pagination headers read by the frontend
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 
@@ -98,6 +116,7 @@ app.include_router(party_goals.router, prefix="/api")
 app.include_router(calendar.router, prefix="/api")
 app.include_router(ai.router, prefix="/api")
 app.include_router(accountability.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 
 @app.get("/")
@@ -141,6 +160,10 @@ async def health_check():
         if db is not None:
             db.close()
     
+    # Per-process hit/miss counters for the analytics result cache
+    from app.utils.analytics_cache import analytics_cache
+    health_status["analytics_cache"] = analytics_cache.stats()
+    
     return health_status
 
 
@@ -158,6 +181,7 @@ async def api_info():
             "party_goals": "/api/party-goals",
             "calendar": "/api/calendar",
             "ai": "/api/ai",
-            "accountability": "/api/accountability"
+            "accountability": "/api/accountability",
+            "admin": "/api/admin"
         }
     }
@@ -18,3 +18,4 @@ from app.models.party import Party
 from app.models.party_member import PartyMember
 from app.models.party_goal import PartyGoal
 from app.models.comment import Comment
+from app.models.user_daily_stats import UserDailyStats
@@ -5,10 +5,10 @@ Habits can be personal or associated with a party/guild.
 """
 
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime,
-    ForeignKey, Enum, Text
+    Column, Integer, String, Boolean, DateTime, Date,
+    ForeignKey, Enum, Text, LargeBinary
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import enum
 
@@ -56,6 +56,12 @@ class Habit(Base):
     is_active = Column(Boolean, default=True, nullable=False)  
     current_streak = Column(Integer, default=0, nullable=False)  
     longest_streak = Column(Integer, default=0, nullable=False)   
+    # Most recent completed log date; lets streaks be updated incrementally
+    last_completed_date = Column(Date, nullable=True)
+    # Bit i set = completed on bitmap_start + i days; NULL until first built.
+    # Deferred so habit rows don't carry (or serialize) the raw bytes unless asked
+    completion_bitmap = deferred(Column(LargeBinary, nullable=True), group="bitmap")
+    bitmap_start = deferred(Column(Date, nullable=True), group="bitmap")
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     color = Column(String(10), nullable=True)  # hex color
@@ -7,7 +7,7 @@ Defines the Log table for recording daily habit completions.
 Each log entry represents a single completion of a habit.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Date, UniqueConstraint, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Date, UniqueConstraint, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
 
@@ -51,4 +51,19 @@ class Log(Base):
     # Constraints - prevent duplicate logs for same habit on same day
     __table_args__ = (
         UniqueConstraint('habit_id', 'log_date', name='uq_habit_log_date'),
+        # Keyset pages of a habit's history: WHERE habit_id = ? AND (log_date, id) < (?, ?)
+        Index('ix_logs_habit_date_id', 'habit_id', 'log_date', 'id'),
+        # Summaries, exports and rollup backfills: WHERE user_id = ? AND log_date BETWEEN ...
+        Index('ix_logs_user_date', 'user_id', 'log_date'),
+        # Streaks and bitmaps only read completed days of a habit
+        Index(
+            'ix_logs_habit_completed_date', 'habit_id', 'log_date',
+            postgresql_where=completed == True,
+            sqlite_where=completed == True
+        ),
+        # Time-of-day histograms read only these columns for completed logs
+        Index(
+            'ix_logs_user_completion_time', 'user_id', 'completion_time', 'habit_id',
+            postgresql_where=completion_time.isnot(None)
+        ),
     )
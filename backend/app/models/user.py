@@ -42,6 +42,10 @@ class User(Base):
     avatar_url = Column(String, nullable=True)
     bio = Column(Text, nullable=True)
     timezone = Column(String, nullable=True)
+    # Set once user_daily_stats has been backfilled for this user; NULL until then
+    daily_stats_built_at = Column(DateTime, nullable=True)
+    # Bumped by every write to the user's rollup; tags cached heatmap blocks and ETags
+    daily_stats_version = Column(Integer, default=0, server_default="0", nullable=False)
     habits = relationship("Habit", back_populates="user")
     achievements = relationship("Achievement", back_populates="user")
     party_memberships = relationship("PartyMember", back_populates="user")
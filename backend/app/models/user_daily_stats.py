@@ -0,0 +1,51 @@
+"""
+User Daily Stats Model
+======================
+[HASEEB] Rollup table behind the analytics endpoints.
+
+One row per user per day that has any logs, holding the counts the
+dashboards need so they never re-aggregate the logs table. Rows are
+kept current by the log write paths (see app.utils.daily_stats) and can
+be rebuilt with `python -m app.jobs.backfill_daily_stats`.
+"""
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Date, Float
+from datetime import datetime
+
+from app.database import Base
+
+
+class UserDailyStats(Base):
+    """
+    Per-user, per-day log rollup.
+    
+    active_habit_count is the number of active habits when the row was
+    created, refreshed for today's row when habits are added or removed.
+    Averages are stored as sum + count so rows can be updated by deltas.
+    """
+    
+    __tablename__ = "user_daily_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    
+    completed_count = Column(Integer, default=0, nullable=False)
+    logged_count = Column(Integer, default=0, nullable=False)
+    active_habit_count = Column(Integer, default=0, nullable=False)
+    
+    # Self-reported mood (1-5)
+    mood_sum = Column(Integer, default=0, nullable=False)
+    mood_count = Column(Integer, default=0, nullable=False)
+    # AI-analyzed mood intensity (0.0-1.0)
+    mood_intensity_sum = Column(Float, default=0.0, nullable=False)
+    mood_intensity_count = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def average_mood(self):
+        return self.mood_sum / self.mood_count if self.mood_count else None
+    
+    @property
+    def average_mood_intensity(self):
+        return self.mood_intensity_sum / self.mood_intensity_count if self.mood_intensity_count else None
@@ -0,0 +1,39 @@
+"""
+Admin Router
+============
+[TEAM] Maintenance endpoints restricted to ADMIN users.
+
+Defines administrative API endpoints for data repair jobs.
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.middleware.auth import require_role
+from app.models.user import User
+from app.schemas.habit import StreakRecomputeRequest, StreakRecomputeResult
+from app.utils.analytics_cache import analytics_cache
+from app.utils.streak_calculator import bulk_recompute_streaks
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+
+@router.post("/streaks/recompute", response_model=StreakRecomputeResult)
+async def recompute_streaks(
+    request: StreakRecomputeRequest,
+    current_user: User = Depends(require_role(["ADMIN"])),
+    db: Session = Depends(get_db)
+):
+    """
+    Rebuild stored streaks from logs for all habits or a filtered set.
+    Returns how many habits were updated and the throughput.
+    """
+    result = bulk_recompute_streaks(db, habit_ids=request.habit_ids, user_id=request.user_id)
+    for user_id in result["user_ids"]:
+        analytics_cache.invalidate_user(user_id)
+    return result
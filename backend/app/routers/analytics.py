@@ -6,7 +6,7 @@ Analytics Router
 Defines analytics and statistics API endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import date, timedelta
@@ -15,6 +15,8 @@ from app.database import get_db
 from app.controllers import analytics_controller
 from app.middleware.auth import get_current_active_user
 from app.models.user import User
+from app.utils.analytics_cache import analytics_cache
+from app.utils.heatmap_blocks import make_etag
 
 
 router = APIRouter(
@@ -25,6 +27,7 @@ router = APIRouter(
 
 @router.get("/overview")
 async def get_overview(
+    as_of: Optional[date] = Query(None, description="Snapshot date (defaults to today)"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -32,7 +35,10 @@ async def get_overview(
     Get overview statistics for dashboard.
     Returns total habits, completion rates, and streak info.
     """
-    return await analytics_controller.get_overview_stats(current_user, db)
+    return await analytics_cache.cached(
+        current_user.id, "analytics.overview", {"as_of": as_of},
+        lambda: analytics_controller.get_overview_stats(current_user, db, as_of)
+    )
 
 
 @router.get("/streaks")
@@ -44,13 +50,45 @@ async def get_streaks(
     Get streak information for all habits.
     Returns habits with active streaks and overall streak stats.
     """
-    return await analytics_controller.get_streak_data(current_user, db)
+    return await analytics_cache.cached(
+        current_user.id, "analytics.streaks", None,
+        lambda: analytics_controller.get_streak_data(current_user, db)
+    )
+
+
+# Multi-year ranges are served from per-year blocks
+HEATMAP_MAX_DAYS = 3653
+
+
+def not_modified(etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """304 response when the client already has this ETag."""
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def serialize_counts(start_date: date, counts: list, format: str) -> dict:
+    """
+    Compact form is one count per day from start_date; the map form keys
+    days that have completions by ISO date.
+    """
+    if format == "compact":
+        return {"start_date": start_date.isoformat(), "counts": counts}
+    return {
+        "data": {
+            (start_date + timedelta(days=offset)).isoformat(): count
+            for offset, count in enumerate(counts) if count
+        }
+    }
 
 
 @router.get("/heatmap")
 async def get_heatmap(
+    response: Response,
     start_date: date = Query(..., description="Start date for heatmap"),
     end_date: date = Query(..., description="End date for heatmap"),
+    format: str = Query("map", pattern="^(map|compact)$", description="map (date -> count) or compact (counts array)"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -65,29 +103,42 @@ async def get_heatmap(
             detail="start_date must be before end_date"
         )
     
-    # Limit range to prevent excessive queries (max 1 year)
-    max_days = 365
-    if (end_date - start_date).days > max_days:
+    # Limit range to prevent excessive payloads (max 10 years)
+    if (end_date - start_date).days > HEATMAP_MAX_DAYS:
         raise HTTPException(
             status_code=400,
-            detail=f"Date range cannot exceed {max_days} days"
+            detail=f"Date range cannot exceed {HEATMAP_MAX_DAYS} days"
         )
     
-    heatmap_data = await analytics_controller.get_completion_heatmap(
-        current_user, db, start_date, end_date
-    )
+    version = await analytics_controller.get_data_version(current_user, db)
+    etag = make_etag(current_user, version, "heatmap", start_date, end_date, format)
+    cached = not_modified(etag, if_none_match)
+    if cached:
+        return cached
     
-    # Convert date keys to ISO format strings for JSON serialization
-    return {
-        "start_date": start_date.isoformat(),
-        "end_date": end_date.isoformat(),
-        "data": {d.isoformat(): count for d, count in heatmap_data.items()}
-    }
+    async def compute():
+        counts = await analytics_controller.get_completion_heatmap(
+            current_user, db, start_date, end_date, version
+        )
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            **serialize_counts(start_date, counts, format)
+        }
+    
+    response.headers["ETag"] = etag
+    return await analytics_cache.cached(
+        current_user.id, "analytics.heatmap",
+        {"start_date": start_date, "end_date": end_date, "format": format}, compute
+    )
 
 
 @router.get("/progress")
 async def get_progress_chart(
+    response: Response,
     period: str = Query("week", description="Period: week, month, or year"),
+    format: str = Query("map", pattern="^(map|compact)$", description="map (date -> count) or compact (counts array)"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -101,19 +152,39 @@ async def get_progress_chart(
             detail="Period must be 'week', 'month', or 'year'"
         )
     
-    chart_data = await analytics_controller.get_progress_chart_data(
-        current_user, db, period
-    )
+    version = await analytics_controller.get_data_version(current_user, db)
+    # The period's dates move with today
+    etag = make_etag(current_user, version, "progress", period, format, date.today())
+    cached = not_modified(etag, if_none_match)
+    if cached:
+        return cached
     
-    # Convert date keys to ISO format strings for JSON serialization
+    async def compute():
+        start_date, counts = await analytics_controller.get_progress_chart_data(
+            current_user, db, period, version
+        )
+        return {
+            "period": period,
+            **serialize_counts(start_date, counts, format)
+        }
+    
+    response.headers["ETag"] = etag
+    return await analytics_cache.cached(
+        current_user.id, "analytics.progress", {"period": period, "format": format}, compute
+    )
+
+
+def serialize_categories(category_data: dict) -> dict:
+    """Convert enum keys to strings for JSON serialization."""
     return {
-        "period": period,
-        "data": {d.isoformat(): count for d, count in chart_data.items()}
+        (cat.value if hasattr(cat, 'value') else str(cat)): stats 
+        for cat, stats in category_data.items()
     }
 
 
 @router.get("/categories")
 async def get_category_breakdown(
+    period: str = Query("all", pattern="^(week|month|year|all)$", description="Period: week, month, year, or all"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -121,17 +192,31 @@ async def get_category_breakdown(
     Get statistics by habit category.
     Returns completion stats grouped by category.
     """
-    category_data = await analytics_controller.get_category_breakdown(current_user, db)
+    async def compute():
+        category_data = await analytics_controller.get_category_breakdown(current_user, db, period)
+        return serialize_categories(category_data)
     
-    # Convert enum keys to strings for JSON serialization
-    return {
-        (cat.value if hasattr(cat, 'value') else str(cat)): stats 
-        for cat, stats in category_data.items()
-    }
+    return await analytics_cache.cached(current_user.id, "analytics.categories", {"period": period}, compute)
+
+
+@router.get("/parties/{party_id}/categories")
+async def get_party_category_breakdown(
+    party_id: int,
+    period: str = Query("all", pattern="^(week|month|year|all)$", description="Period: week, month, year, or all"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get category statistics across all habits shared with a party.
+    """
+    category_data = await analytics_controller.get_category_breakdown(current_user, db, period, party_id)
+    return serialize_categories(category_data)
 
 
 @router.get("/trends")
 async def get_trends(
+    period: str = Query("week", pattern="^(week|month|quarter|year)$", description="Period: week, month, quarter, or year"),
+    sparkline_points: int = Query(0, ge=0, le=90, description="Downsample sparklines to at most this many points (0 = none)"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -139,33 +224,54 @@ async def get_trends(
     Get trend analysis data.
     Compares current vs previous periods for insights.
     """
-    trends_data = await analytics_controller.get_trends(current_user, db)
-    
-    # Calculate comparison metrics
-    current_week_completions = sum(1 for log in trends_data["current_week_logs"] if log.completed)
-    previous_week_completions = sum(1 for log in trends_data["previous_week_logs"] if log.completed)
-    
-    current_month_completions = sum(1 for log in trends_data["current_month_logs"] if log.completed)
-    previous_month_completions = sum(1 for log in trends_data["previous_month_logs"] if log.completed)
-    
-    # Calculate percentage changes (avoid division by zero)
-    def calc_change(current, previous):
-        if previous == 0:
-            return 100.0 if current > 0 else 0.0
-        return ((current - previous) / previous) * 100
+    return await analytics_cache.cached(
+        current_user.id, "analytics.trends", {"period": period, "sparkline_points": sparkline_points},
+        lambda: analytics_controller.get_trends(current_user, db, period, sparkline_points)
+    )
+
+
+@router.get("/time-of-day")
+async def get_time_of_day(
+    habit_id: Optional[int] = Query(None, description="Limit to one habit"),
+    start_date: Optional[date] = Query(None, description="First log date to include"),
+    end_date: Optional[date] = Query(None, description="Last log date to include"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get completion histograms by local hour and weekday.
+    Returns overall and per-habit counts in the user's timezone.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=400,
+            detail="start_date must be before end_date"
+        )
     
-    return {
-        "weekly": {
-            "current": current_week_completions,
-            "previous": previous_week_completions,
-            "change_percent": round(calc_change(current_week_completions, previous_week_completions), 1)
-        },
-        "monthly": {
-            "current": current_month_completions,
-            "previous": previous_month_completions,
-            "change_percent": round(calc_change(current_month_completions, previous_month_completions), 1)
-        }
-    }
+    return await analytics_cache.cached(
+        current_user.id, "analytics.time_of_day",
+        {"habit_id": habit_id, "start_date": start_date, "end_date": end_date},
+        lambda: analytics_controller.get_time_of_day(current_user, db, habit_id, start_date, end_date)
+    )
+
+
+@router.get("/correlations")
+async def get_correlations(
+    days: int = Query(90, ge=14, le=730, description="Number of days to compare, ending today"),
+    limit: int = Query(10, ge=1, le=100, description="Number of habit pairs to return"),
+    include_matrix: bool = Query(False, description="Also return the full correlation and lift matrices"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get habit co-completion statistics.
+    Returns the most strongly correlated habit pairs with their lift.
+    """
+    return await analytics_cache.cached(
+        current_user.id, "analytics.correlations",
+        {"days": days, "limit": limit, "include_matrix": include_matrix},
+        lambda: analytics_controller.get_correlations(current_user, db, days, limit, include_matrix)
+    )
 
 
 @router.get("/achievements")
@@ -177,4 +283,7 @@ async def get_achievements_progress(
     Get achievement progress.
     Returns earned achievements and progress toward unearned ones.
     """
-    return await analytics_controller.get_achievements_progress(current_user, db)
+    return await analytics_cache.cached(
+        current_user.id, "analytics.achievements", None,
+        lambda: analytics_controller.get_achievements_progress(current_user, db)
+    )
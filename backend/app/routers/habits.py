@@ -7,17 +7,26 @@ Defines habit-related API endpoints.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from datetime import date
+from datetime import date, timedelta
 
 from app.database import get_db
-from app.schemas.habit import HabitCreate, HabitUpdate, HabitResponse, HabitStats
+from app.schemas.habit import HabitCreate, HabitUpdate, HabitResponse, HabitStats, HabitBitmapResponse, HabitStrip, HabitStripResponse
 from app.middleware.auth import get_current_active_user
 from app.models.user import User
 from app.models.habit import Habit, HabitFrequency, HabitCategory
 from app.models.log import Log
-from app.utils.streak_calculator import update_habit_streaks
+from app.utils.log_upsert import upsert_log
+from app.utils.streak_calculator import refresh_habit_streaks
+from app.utils import daily_stats
+from app.utils.analytics_cache import analytics_cache
+from app.utils.timezone_helper import local_today
+from app.routers.analytics import HEATMAP_MAX_DAYS
+from app.utils.completion_bitmap import (
+    completed_on, is_built, windows, scheduled_window, encode_bits, with_bitmaps
+)
 
 
 def parse_frequency(frequency_str: str) -> HabitFrequency:
@@ -46,6 +55,28 @@ def parse_category(category_str: str) -> HabitCategory:
             return HabitCategory.OTHER  # Default
 
 
+def build_strips(habits: List[Habit], days: int, end_date: date,
+                 encoding: str, db: Session) -> HabitStripResponse:
+    """Encode completion and schedule strips for habits over the N days up to end_date."""
+    start_date = end_date - timedelta(days=days - 1)
+    completed = windows(habits, start_date, end_date, db)
+    
+    return HabitStripResponse(
+        start_date=start_date,
+        end_date=end_date,
+        days=days,
+        encoding=encoding,
+        habits=[
+            HabitStrip(
+                habit_id=habit.id,
+                completed=encode_bits(completed[habit.id], days, encoding),
+                scheduled=encode_bits(scheduled_window(habit, start_date, end_date), days, encoding)
+            )
+            for habit in habits
+        ]
+    )
+
+
 router = APIRouter(
     prefix="/habits",
     tags=["Habits"]
@@ -85,7 +116,9 @@ async def create_habit(
     )
     
     db.add(new_habit)
+    daily_stats.refresh_active_habits(db, current_user)
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     db.refresh(new_habit)
     
     return new_habit
@@ -101,7 +134,7 @@ async def get_habits(
     """
     Get all habits for the current user.
     """
-    query = db.query(Habit).filter(Habit.user_id == current_user.id)
+    query = db.query(Habit).options(with_bitmaps).filter(Habit.user_id == current_user.id)
     
     if category:
         query = query.filter(Habit.category == category)
@@ -112,7 +145,7 @@ async def get_habits(
     habits = query.all()
     
     # Add completed_today field
-    today = date.today()
+    today = local_today(current_user.timezone)
     result = []
     for habit in habits:
         habit_dict = {
@@ -132,17 +165,35 @@ async def get_habits(
             "is_active": habit.is_active,
             "created_at": habit.created_at,
             "updated_at": habit.updated_at,
-            "completed_today": db.query(Log).filter(
-                Log.habit_id == habit.id,
-                Log.log_date == today,
-                Log.completed == True
-            ).first() is not None
+            "completed_today": completed_on(habit, today, db)
         }
         result.append(habit_dict)
     
     return result
 
 
+@router.get("/strip", response_model=HabitStripResponse)
+async def get_habits_strip(
+    habit_ids: Optional[List[int]] = Query(None, description="Habits to include (defaults to all active habits)"),
+    days: int = Query(7, ge=1, le=366, description="Number of days, ending at end_date"),
+    end_date: Optional[date] = Query(None, description="Last day (defaults to today)"),
+    encoding: str = Query("base64", pattern="^(base64|bits)$"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get N-day completion strips for many habits in one request.
+    """
+    query = db.query(Habit).options(with_bitmaps).filter(Habit.user_id == current_user.id)
+    if habit_ids:
+        query = query.filter(Habit.id.in_(habit_ids))
+    else:
+        query = query.filter(Habit.is_active == True)
+    
+    habits = query.order_by(Habit.id).all()
+    return build_strips(habits, days, end_date or local_today(current_user.timezone), encoding, db)
+
+
 @router.get("/{habit_id}", response_model=HabitResponse)
 async def get_habit(
     habit_id: int,
@@ -164,12 +215,8 @@ async def get_habit(
         )
     
     # Add completed_today
-    today = date.today()
-    completed_today = db.query(Log).filter(
-        Log.habit_id == habit.id,
-        Log.log_date == today,
-        Log.completed == True
-    ).first() is not None
+    today = local_today(current_user.timezone)
+    completed_today = completed_on(habit, today, db)
     
     return {
         **habit.__dict__,
@@ -200,6 +247,8 @@ async def update_habit(
             detail="Habit not found"
         )
     
+    schedule = (habit.frequency, habit.target_days)
+    
     # Update fields with enum conversion for frequency and category
     update_data = habit_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -217,7 +266,14 @@ async def update_habit(
             if value is not None:
                 setattr(habit, field, value)
     
+    # Streaks are counted in schedule units; recount them under the new schedule
+    if (habit.frequency, habit.target_days) != schedule:
+        habit.longest_streak = 0
+        refresh_habit_streaks(habit, db, local_today(current_user.timezone))
+    if "is_active" in update_data:
+        daily_stats.refresh_active_habits(db, current_user)
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     db.refresh(habit)
     
     return habit
@@ -245,7 +301,9 @@ async def delete_habit(
     
     # Soft delete - mark as inactive
     habit.is_active = False
+    daily_stats.refresh_active_habits(db, current_user)
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     
     return None
 
@@ -295,16 +353,20 @@ async def get_habit_stats(
     )
 
 
-@router.post("/{habit_id}/complete")
-async def complete_habit(
+@router.get("/{habit_id}/bitmap", response_model=HabitBitmapResponse)
+async def get_habit_bitmap(
     habit_id: int,
+    start_date: Optional[date] = Query(None, description="First day (defaults to first completion)"),
+    end_date: Optional[date] = Query(None, description="Last day (defaults to today)"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
-    Quick endpoint to mark habit as completed for today.
+    Get the raw completion bitmap for a habit.
+    One bit per day, so clients can answer day lookups locally. Read-only:
+    habits whose bitmap isn't built yet are answered from their logs.
     """
-    habit = db.query(Habit).filter(
+    habit = db.query(Habit).options(with_bitmaps).filter(
         Habit.id == habit_id,
         Habit.user_id == current_user.id
     ).first()
@@ -315,33 +377,92 @@ async def complete_habit(
             detail="Habit not found"
         )
     
-    today = date.today()
+    end_date = end_date or local_today(current_user.timezone)
+    if start_date is None:
+        if is_built(habit):
+            first_completion = habit.bitmap_start
+        else:
+            first_completion = db.query(func.min(Log.log_date)).filter(
+                Log.habit_id == habit.id,
+                Log.completed == True
+            ).scalar()
+        start_date = max(first_completion or end_date, end_date - timedelta(days=HEATMAP_MAX_DAYS))
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must be before end_date"
+        )
+    if (end_date - start_date).days > HEATMAP_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range cannot exceed {HEATMAP_MAX_DAYS} days"
+        )
     
-    # Check if already logged today
-    existing_log = db.query(Log).filter(
-        Log.habit_id == habit_id,
-        Log.log_date == today
+    days = (end_date - start_date).days + 1
+    return HabitBitmapResponse(
+        habit_id=habit.id,
+        start_date=start_date,
+        end_date=end_date,
+        days=days,
+        bitmap=encode_bits(windows([habit], start_date, end_date, db)[habit.id], days)
+    )
+
+
+@router.get("/{habit_id}/strip", response_model=HabitStripResponse)
+async def get_habit_strip(
+    habit_id: int,
+    days: int = Query(7, ge=1, le=366, description="Number of days, ending at end_date"),
+    end_date: Optional[date] = Query(None, description="Last day (defaults to today)"),
+    encoding: str = Query("base64", pattern="^(base64|bits)$"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the N-day completion strip for a habit.
+    """
+    habit = db.query(Habit).options(with_bitmaps).filter(
+        Habit.id == habit_id,
+        Habit.user_id == current_user.id
     ).first()
     
-    if existing_log:
-        existing_log.completed = True
-        from datetime import datetime
-        existing_log.completion_time = datetime.utcnow()
-    else:
-        from datetime import datetime
-        new_log = Log(
-            habit_id=habit_id,
-            user_id=current_user.id,
-            log_date=today,
-            completed=True,
-            completion_time=datetime.utcnow()
+    if not habit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found"
         )
-        db.add(new_log)
     
-    db.commit()
+    return build_strips([habit], days, end_date or local_today(current_user.timezone), encoding, db)
+
+
+@router.post("/{habit_id}/complete")
+async def complete_habit(
+    habit_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Quick endpoint to mark habit as completed for today.
+    """
+    # Locked until commit: set_completed rewrites the habit's bitmap
+    habit = db.query(Habit).options(with_bitmaps).filter(
+        Habit.id == habit_id,
+        Habit.user_id == current_user.id
+    ).with_for_update().first()
     
-    # Update streak using proper calculation (after commit so log is saved)
-    current_streak, longest_streak = update_habit_streaks(habit_id, db)
+    if not habit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found"
+        )
+    
+    today = local_today(current_user.timezone)
+    
+    # One upsert, so a double tap can't trip uq_habit_log_date
+    upsert_log(db, current_user, habit, today, completed=True)
+    current_streak, longest_streak = habit.current_streak, habit.longest_streak
+    
+    db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     
     return {
         "message": "Habit marked as completed",
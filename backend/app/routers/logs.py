@@ -6,20 +6,29 @@ Logs Router
 Defines habit log/completion API endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Tuple
 from datetime import date, datetime, timedelta
+import io
 import logging
 
 from app.database import get_db
-from app.schemas.log import LogCreate, LogUpdate, LogResponse, DailyLogSummary, WeeklyLogSummary, MoodAnalysisResponse, MoodInsightsResponse
+from app.schemas.log import LogCreate, LogUpdate, LogResponse, DailyLogSummary, WeeklyLogSummary, MoodAnalysisResponse, MoodInsightsResponse, LogBatchRequest, LogBatchResponse
 from app.middleware.auth import get_current_active_user
 from app.models.user import User
 from app.models.habit import Habit
 from app.models.log import Log
-from app.utils.streak_calculator import update_habit_streaks
+from app.utils.streak_calculator import record_completion, record_uncompletion
+from app.utils import daily_stats, log_export, log_import, log_pages, log_summary, mood_insights
+from app.utils.analytics_cache import analytics_cache
+from app.utils.completion_bitmap import with_bitmaps
+from app.utils.log_upsert import upsert_log
+from app.utils.timezone_helper import local_today
 from app.utils.gemini_helper import GeminiHelper
+from app.controllers import log_controller
 
 
 router = APIRouter(
@@ -42,6 +51,13 @@ mood_insights_cache: Dict[MoodInsightsKey, Dict] = {}
 MOOD_INSIGHTS_TTL = timedelta(hours=6)
 
 
+def _evict_mood_insights(user_id: int, day: date):
+    """Drop cached narratives whose range covers `day` (a new analysis landed there)."""
+    for key in [key for key in mood_insights_cache
+                if key[0] == user_id and key[1] <= day.isoformat() <= key[2]]:
+        del mood_insights_cache[key]
+
+
 def _is_fresh(entry: Dict, ttl: timedelta) -> bool:
     ts: datetime = entry.get("generated_at")
     if not ts:
@@ -58,11 +74,12 @@ async def create_log(
     """
     Log a habit completion.
     """
-    # Verify habit exists and belongs to user
-    habit = db.query(Habit).filter(
+    # Verify habit exists and belongs to user (with its bitmap, which gives the
+    # day's previous state). The row stays locked, since set_completed rewrites the bitmap
+    habit = db.query(Habit).options(with_bitmaps).filter(
         Habit.id == log_data.habit_id,
         Habit.user_id == current_user.id
-    ).first()
+    ).with_for_update().first()
     
     if not habit:
         raise HTTPException(
@@ -70,53 +87,60 @@ async def create_log(
             detail="Habit not found"
         )
     
-    log_date = log_data.log_date or date.today()
+    log_date = log_data.log_date or local_today(current_user.timezone)
     
-    # Check if log already exists for this date
-    existing_log = db.query(Log).filter(
-        Log.habit_id == log_data.habit_id,
-        Log.log_date == log_date
-    ).first()
+    # Insert in one statement; an existing log for the day (even one written
+    # by a concurrent request) is left alone instead of failing uq_habit_log_date
+    new_log, _ = upsert_log(
+        db, current_user, habit, log_date, log_data.completed,
+        overwrite=False,
+        notes=log_data.notes,
+        mood=log_data.mood,
+        duration_minutes=log_data.duration_minutes
+    )
     
-    if existing_log:
+    if new_log is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Log already exists for this date. Use PUT to update."
         )
     
-    # Create log
-    new_log = Log(
-        habit_id=log_data.habit_id,
-        user_id=current_user.id,
-        log_date=log_date,
-        completed=log_data.completed,
-        completion_time=datetime.utcnow() if log_data.completed else None,
-        notes=log_data.notes,
-        mood=log_data.mood,
-        duration_minutes=log_data.duration_minutes
-    )
-    
-    db.add(new_log)
+    # Serialize before commit expires the row
+    response = LogResponse.model_validate(new_log)
     db.commit()
-    db.refresh(new_log)
-    
-    # Update streak using proper calculation (after commit so log is saved)
-    if log_data.completed:
-        update_habit_streaks(log_data.habit_id, db)
+    analytics_cache.invalidate_user(current_user.id)
     
-    return new_log
+    return response
+
+
+@router.post("/batch", response_model=LogBatchResponse)
+async def submit_log_batch(
+    batch: LogBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or update up to 500 logs in one request and one transaction.
+    Results are returned per item, in request order.
+    """
+    return await log_controller.submit_log_batch(batch, current_user, db)
 
 
 @router.get("/habit/{habit_id}", response_model=List[LogResponse])
 async def get_habit_logs(
     habit_id: int,
+    response: Response,
     start_date: Optional[date] = Query(None, description="Start date filter"),
     end_date: Optional[date] = Query(None, description="End date filter"),
+    limit: int = Query(log_pages.DEFAULT_LIMIT, ge=1, le=log_pages.MAX_LIMIT, description="Logs per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. log_date,completed"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get logs for a specific habit.
+    Get logs for a specific habit, newest first, one page at a time.
+    The next page's cursor is returned in the X-Next-Cursor header.
     """
     # Verify habit ownership
     habit = db.query(Habit).filter(
@@ -130,102 +154,80 @@ async def get_habit_logs(
             detail="Habit not found"
         )
     
-    query = db.query(Log).filter(Log.habit_id == habit_id)
-    
-    if start_date:
-        query = query.filter(Log.log_date >= start_date)
-    if end_date:
-        query = query.filter(Log.log_date <= end_date)
-    
-    logs = query.order_by(Log.log_date.desc()).all()
-    
+    try:
+        projection = log_pages.parse_fields(fields)
+        logs, next_cursor = log_pages.habit_log_page(
+            db, habit_id, limit, cursor, projection, start_date, end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if projection:
+        # Partial rows don't fit LogResponse; return them as they are
+        return JSONResponse(content=jsonable_encoder(logs), headers=headers)
+    response.headers.update(headers)
     return logs
 
 
 @router.get("/weekly")
 async def get_weekly_summary(
     week_start: Optional[date] = Query(None, description="Start of week (defaults to current week)"),
+    include_logs: bool = Query(True, description="Embed each day's logs"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Get summary for current or specified week.
     """
-    if week_start is None:
-        # Default to start of current week (Monday)
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-    
-    week_end = week_start + timedelta(days=6)
-    
-    # Get user's active habits
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
-    
-    total_habits = len(habits)
-    
-    # Build daily summaries
-    daily_summaries = []
-    total_completions = 0
-    best_day = None
-    best_day_rate = 0.0
-    
-    for i in range(7):
-        day = week_start + timedelta(days=i)
-        
-        logs = db.query(Log).filter(
-            Log.user_id == current_user.id,
-            Log.log_date == day
-        ).all()
-        
-        completed = sum(1 for log in logs if log.completed)
-        total_completions += completed
-        rate = (completed / total_habits * 100) if total_habits > 0 else 0.0
-        
-        if rate > best_day_rate:
-            best_day_rate = rate
-            best_day = day
-        
-        # Serialize logs properly
-        serialized_logs = [
-            {
-                "id": log.id,
-                "habit_id": log.habit_id,
-                "user_id": log.user_id,
-                "log_date": log.log_date,
-                "completed": log.completed,
-                "completion_time": log.completion_time,
-                "notes": log.notes,
-                "mood": log.mood,
-                "duration_minutes": log.duration_minutes,
-                "created_at": log.created_at
-            }
-            for log in logs
-        ]
-        
-        daily_summaries.append({
-            "date": day,
-            "total_habits": total_habits,
-            "completed_habits": completed,
-            "completion_percentage": rate,
-            "logs": serialized_logs
-        })
-    
-    total_possible = total_habits * 7
-    weekly_rate = (total_completions / total_possible * 100) if total_possible > 0 else 0.0
-    
-    return {
-        "week_start": week_start,
-        "week_end": week_end,
-        "daily_summaries": daily_summaries,
-        "weekly_completion_rate": weekly_rate,
-        "total_completions": total_completions,
-        "total_habits_tracked": total_habits,
-        "best_day": best_day,
-        "best_day_completion_rate": best_day_rate
-    }
+    week_start, _ = log_summary.week_bounds(week_start)
+    
+    async def compute():
+        return await log_controller.get_weekly_summary(current_user, db, week_start, include_logs)
+    
+    return await analytics_cache.cached(
+        current_user.id, "logs.weekly", {"week_start": week_start, "include_logs": include_logs}, compute
+    )
+
+
+@router.get("/summary")
+async def get_range_summary(
+    start_date: date = Query(..., description="First day of the range"),
+    end_date: date = Query(..., description="Last day of the range"),
+    include_logs: bool = Query(False, description="Embed each day's logs"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get per-day summaries and totals for any range of up to a year.
+    """
+    async def compute():
+        return await log_controller.get_range_summary(current_user, db, start_date, end_date, include_logs)
+    
+    params = {"start_date": start_date, "end_date": end_date, "include_logs": include_logs}
+    return await analytics_cache.cached(current_user.id, "logs.summary", params, compute)
+
+
+@router.get("/monthly")
+async def get_monthly_summary(
+    year: Optional[int] = Query(None, ge=1970, le=9999, description="Year (defaults to current)"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="Month (defaults to current)"),
+    months: int = Query(1, ge=1, le=log_summary.MAX_MONTHS, description="Number of months ending at year/month"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get monthly summaries with per-day and per-habit completion counts,
+    oldest month first.
+    """
+    today = date.today()
+    year, month = year or today.year, month or today.month
+    
+    async def compute():
+        return {"months": await log_controller.get_monthly_summaries(current_user, db, month, year, months)}
+    
+    params = {"year": year, "month": month, "months": months}
+    return await analytics_cache.cached(current_user.id, "logs.monthly", params, compute)
 
 
 @router.get("/mood-insights", response_model=MoodInsightsResponse)
@@ -243,97 +245,34 @@ async def get_mood_insights(
     if start_date is None:
         start_date = end_date - timedelta(days=30)
     
-    # Get logs with mood analysis
-    logs = db.query(Log).filter(
-        Log.user_id == current_user.id,
-        Log.log_date >= start_date,
-        Log.log_date <= end_date,
-        Log.mood_label.isnot(None),
-        Log.mood_intensity.isnot(None)
-    ).order_by(Log.log_date.asc()).all()
-    
-    # Build mood trend data
-    mood_trend = [
-        {
-            "date": str(log.log_date),
-            "mood_intensity": log.mood_intensity,
-            "mood_label": log.mood_label,
-            "sentiment": "positive" if log.mood_intensity > 0.6 else "negative" if log.mood_intensity < 0.4 else "neutral"
-        }
-        for log in logs
-    ]
-    
-    # Build weighted mood distribution
-    # Weight factors:
-    # 1. Recency: More recent logs have higher weight (exponential decay)
-    # 2. Intensity: Higher intensity moods have more weight
-    # 3. Frequency: Normalized by total count
-    
-    mood_distribution = {}
-    today = date.today()
-    total_weight = 0.0
-    
-    if logs:
-        for log in logs:
-            label = log.mood_label
-            if not label:  # Skip if no mood label
-                continue
-            
-            # Calculate recency weight (exponential decay - more recent = higher weight)
-            days_ago = (today - log.log_date).days
-            # Use exponential decay: weight = 1 / (1 + days_ago / decay_factor)
-            # decay_factor of 14 means weight halves every ~10 days
-            decay_factor = 14.0
-            recency_weight = 1.0 / (1.0 + (days_ago / decay_factor))
-            
-            # Intensity weight (mood_intensity is 0-1, use it directly)
-            intensity_weight = float(log.mood_intensity) if log.mood_intensity is not None else 0.5
-            
-            # Combined weight: recency * (0.6) + intensity * (0.4)
-            # Recent logs are more important, but intensity matters too
-            combined_weight = (recency_weight * 0.6) + (intensity_weight * 0.4)
-            
-            # Add weighted contribution
-            if label not in mood_distribution:
-                mood_distribution[label] = 0.0
-            mood_distribution[label] += combined_weight
-            total_weight += combined_weight
-        
-        # Keep weighted values (already calculated)
-        # Frontend will calculate percentages from these weighted values
-        if total_weight > 0 and mood_distribution:
-            # Round for cleaner display
-            mood_distribution = {label: round(weight, 3) for label, weight in mood_distribution.items()}
+    # Distribution, downsampled trend and analysis fingerprint in one query
+    insights = mood_insights.mood_insights(db, current_user, start_date, end_date)
+    mood_distribution = insights["distribution"]
     
     # Generate AI insights
     ai_insights = "Keep tracking your mood to see patterns over time."
-    if len(logs) >= 5:
-        # Prepare context for AI
-        recent_moods = [{"date": str(log.log_date), "mood": log.mood_label, "intensity": log.mood_intensity} for log in logs[-10:]]
-        context = {
-            "total_entries": len(logs),
-            "recent_moods": recent_moods,
-            "mood_distribution": mood_distribution,
-            "average_intensity": sum(log.mood_intensity for log in logs) / len(logs) if logs else 0.5
-        }
-
-        # Check cache for this user + date range
+    if insights["total_entries"] >= 5:
+        # Cached text is reused only while no analysis in the range was added or redone
         cache_key: MoodInsightsKey = (
             current_user.id,
             start_date.isoformat(),
             end_date.isoformat(),
         )
         cached = mood_insights_cache.get(cache_key)
-        if cached and _is_fresh(cached, MOOD_INSIGHTS_TTL):
+        if cached and _is_fresh(cached, MOOD_INSIGHTS_TTL) and cached.get("fingerprint") == insights["fingerprint"]:
             ai_insights = cached["ai_insights"]
         else:
             try:
+                recent_moods = [
+                    {"date": point["date"], "mood": point["mood_label"], "intensity": point["mood_intensity"]}
+                    for point in insights["trend"][-5:]
+                ]
                 prompt = f"""
                 Analyze this mood tracking data from a habit tracker:
-                Total entries: {len(logs)}
+                Total entries: {insights['total_entries']}
                 Mood distribution: {mood_distribution}
-                Recent moods: {recent_moods[-5:]}
-                Average intensity: {context['average_intensity']:.2f}
+                Recent moods (per {insights['trend_period']}): {recent_moods}
+                Average intensity: {insights['average_intensity']:.2f}
                 
                 Provide a brief, encouraging insight (2-3 sentences) about the user's mood patterns.
                 Focus on positive observations and gentle suggestions if patterns are concerning.
@@ -342,6 +281,7 @@ async def get_mood_insights(
                 mood_insights_cache[cache_key] = {
                     "ai_insights": ai_insights,
                     "generated_at": datetime.utcnow(),
+                    "fingerprint": insights["fingerprint"],
                 }
             except Exception as e:
                 logger = logging.getLogger(__name__)
@@ -349,7 +289,8 @@ async def get_mood_insights(
                 ai_insights = "Keep tracking your mood to see patterns over time."
     
     return MoodInsightsResponse(
-        mood_trend=mood_trend,
+        mood_trend=insights["trend"],
+        trend_period=insights["trend_period"],
         mood_distribution=mood_distribution,
         ai_insights=ai_insights,
         period_start=start_date,
@@ -357,6 +298,68 @@ async def get_mood_insights(
     )
 
 
+@router.get("/export")
+async def export_logs(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    include_habit: bool = Query(False, description="Add each log's habit title"),
+    compress: bool = Query(False, description="gzip the file on the fly"),
+    habit_id: Optional[int] = Query(None, description="Only export this habit"),
+    start_date: Optional[date] = Query(None, description="First log date to include"),
+    end_date: Optional[date] = Query(None, description="Last log date to include"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the user's full log history, streamed in chunks.
+    """
+    rows = log_export.export_rows(db, current_user.id, include_habit, habit_id, start_date, end_date)
+    if format == "csv":
+        chunks = log_export.iter_csv(rows, log_export.field_names(include_habit))
+        media_type = "text/csv"
+    else:
+        chunks = log_export.iter_ndjson(rows)
+        media_type = "application/x-ndjson"
+    
+    filename = f"habit-logs.{format}"
+    if compress:
+        chunks = log_export.gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import")
+async def import_logs(
+    file: UploadFile = File(..., description="CSV with columns date, habit, completed, notes, mood"),
+    on_conflict: str = Query("update", pattern="^(update|skip)$", description="Overwrite or keep existing logs"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import a log history from CSV. Missing habits are created by title;
+    rows that cannot be parsed are skipped and reported.
+    """
+    errors = []
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        rows = log_import.parse_csv(stream, errors)
+        result = log_import.import_logs(db, current_user, rows, overwrite=on_conflict == "update", errors=errors)
+    except log_import.ImportRowError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be UTF-8 encoded CSV")
+    finally:
+        stream.detach()
+        # Batches written before a failure are committed too
+        analytics_cache.invalidate_user(current_user.id)
+    return result
+
+
 @router.get("/{log_id}", response_model=LogResponse)
 async def get_log(
     log_id: int,
@@ -390,7 +393,14 @@ async def update_log(
     """
     Update a log entry.
     """
-    log = db.query(Log).filter(
+    habit_id = db.query(Log.habit_id).filter(
+        Log.id == log_id,
+        Log.user_id == current_user.id
+    ).scalar()
+    # Lock the habit before reading the log, so concurrent toggles of the
+    # same log each see the other's committed state
+    habit = db.query(Habit).options(with_bitmaps).filter(Habit.id == habit_id).with_for_update().first()
+    log = db.query(Log).populate_existing().filter(
         Log.id == log_id,
         Log.user_id == current_user.id
     ).first()
@@ -403,6 +413,7 @@ async def update_log(
     
     # Track if completion status changed
     was_completed = log.completed
+    before = daily_stats.log_contribution(log)
     
     # Update fields
     if log_data.completed is not None:
@@ -419,7 +430,17 @@ async def update_log(
     if log_data.duration_minutes is not None:
         log.duration_minutes = log_data.duration_minutes
     
+    daily_stats.record_log_change(db, current_user, log.log_date, before, daily_stats.log_contribution(log))
+    
+    # Keep habit streaks in sync with completion changes
+    if log.completed != was_completed:
+        if log.completed:
+            record_completion(habit, log.log_date, db, local_today(current_user.timezone))
+        else:
+            record_uncompletion(habit, log.log_date, db, local_today(current_user.timezone))
+    
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     db.refresh(log)
     
     return log
@@ -434,7 +455,13 @@ async def delete_log(
     """
     Delete a log entry.
     """
-    log = db.query(Log).filter(
+    habit_id = db.query(Log.habit_id).filter(
+        Log.id == log_id,
+        Log.user_id == current_user.id
+    ).scalar()
+    # Lock the habit before reading the log (see update_log)
+    habit = db.query(Habit).options(with_bitmaps).filter(Habit.id == habit_id).with_for_update().first()
+    log = db.query(Log).populate_existing().filter(
         Log.id == log_id,
         Log.user_id == current_user.id
     ).first()
@@ -445,8 +472,20 @@ async def delete_log(
             detail="Log not found"
         )
     
+    was_completed = log.completed
+    log_date = log.log_date
+    
+    daily_stats.record_log_change(
+        db, current_user, log_date, daily_stats.log_contribution(log), daily_stats.NO_CONTRIBUTION
+    )
     db.delete(log)
+    
+    # Removing a completed day can break a streak
+    if was_completed:
+        record_uncompletion(habit, log_date, db, local_today(current_user.timezone))
+    
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
     
     return None
 
@@ -460,30 +499,10 @@ async def get_daily_summary(
     """
     Get summary of all habits for a specific date.
     """
-    # Get user's active habits
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
-    
-    total_habits = len(habits)
-    
-    # Get logs for this date
-    logs = db.query(Log).filter(
-        Log.user_id == current_user.id,
-        Log.log_date == log_date
-    ).all()
-    
-    completed_habits = sum(1 for log in logs if log.completed)
-    completion_percentage = (completed_habits / total_habits * 100) if total_habits > 0 else 0.0
-    
-    return DailyLogSummary(
-        date=log_date,
-        total_habits=total_habits,
-        completed_habits=completed_habits,
-        completion_percentage=completion_percentage,
-        logs=logs
-    )
+    async def compute():
+        return await log_controller.get_daily_summary(log_date, current_user, db)
+    
+    return await analytics_cache.cached(current_user.id, "logs.daily", {"log_date": log_date}, compute)
 
 
 @router.post("/{log_id}/analyze-mood", response_model=MoodAnalysisResponse)
@@ -525,11 +544,15 @@ async def analyze_log_mood(
     )
     
     # Update log with analysis results
+    before = daily_stats.log_contribution(log)
     log.mood_label = analysis["mood_label"]
     log.mood_intensity = analysis["mood_intensity"]
     log.mood_analyzed_at = datetime.utcnow()
+    daily_stats.record_log_change(db, current_user, log.log_date, before, daily_stats.log_contribution(log))
     
     db.commit()
+    analytics_cache.invalidate_user(current_user.id)
+    _evict_mood_insights(current_user.id, log.log_date)
     db.refresh(log)
     
     return MoodAnalysisResponse(
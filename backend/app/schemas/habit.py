@@ -99,3 +99,56 @@ class HabitStats(BaseModel):
     longest_streak: int = 0
     last_completed: Optional[date] = None
     total_days_tracked: int = 0
+
+
+class HabitBitmapResponse(BaseModel):
+    """
+    Schema for a habit's raw completion bitmap.
+    Bit i (little-endian within each byte) is day start_date + i.
+    """
+    habit_id: int
+    start_date: date
+    end_date: date
+    days: int
+    encoding: str = "base64"
+    bitmap: str = ""
+
+
+class HabitStrip(BaseModel):
+    """
+    Schema for one habit's completion strip.
+    Both strips use the same encoding; day i is start_date + i.
+    """
+    habit_id: int
+    completed: str = ""
+    scheduled: str = ""
+
+
+class HabitStripResponse(BaseModel):
+    """
+    Schema for N-day completion strips of one or more habits.
+    encoding is "base64" (little-endian bits) or "bits" ("0"/"1", oldest first).
+    """
+    start_date: date
+    end_date: date
+    days: int
+    encoding: str = "base64"
+    habits: List[HabitStrip] = []
+
+
+class StreakRecomputeRequest(BaseModel):
+    """
+    Schema for an admin bulk streak recompute.
+    Omit both filters to recompute every habit.
+    """
+    habit_ids: Optional[List[int]] = None
+    user_id: Optional[int] = None
+
+
+class StreakRecomputeResult(BaseModel):
+    """
+    Schema for bulk streak recompute results.
+    """
+    habits_updated: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
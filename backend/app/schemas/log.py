@@ -6,9 +6,28 @@ Log Schemas
 Pydantic schemas for habit log/completion validation.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+
+
+# Accepted log dates relative to today. Completion bitmaps span from a
+# habit's first completed day, so this keeps them to about 460 bytes.
+MAX_LOG_HISTORY_DAYS = 3660
+MAX_LOG_FUTURE_DAYS = 1
+
+
+def check_log_date(log_date: date, today: Optional[date] = None) -> date:
+    """
+    Reject log dates more than MAX_LOG_HISTORY_DAYS before today or
+    MAX_LOG_FUTURE_DAYS after it (clients ahead of the server's timezone).
+    """
+    today = today or date.today()
+    earliest = today - timedelta(days=MAX_LOG_HISTORY_DAYS)
+    latest = today + timedelta(days=MAX_LOG_FUTURE_DAYS)
+    if not earliest <= log_date <= latest:
+        raise ValueError(f"log_date must be between {earliest} and {latest}")
+    return log_date
 
 
 class LogBase(BaseModel):
@@ -27,6 +46,11 @@ class LogCreate(LogBase):
     habit_id: int
     log_date: Optional[date] = None  # Defaults to today if not provided
     completed: bool = True
+    
+    @field_validator("log_date")
+    @classmethod
+    def log_date_in_range(cls, v: Optional[date]) -> Optional[date]:
+        return v if v is None else check_log_date(v)
 
 
 class LogUpdate(BaseModel):
@@ -58,6 +82,36 @@ class LogResponse(LogBase):
         from_attributes = True
 
 
+MAX_BATCH_LOGS = 500
+
+
+class LogBatchRequest(BaseModel):
+    """
+    Schema for replaying many log upserts at once (offline clients).
+    """
+    logs: List[LogCreate] = Field(..., min_length=1, max_length=MAX_BATCH_LOGS)
+
+
+class LogBatchItemResult(BaseModel):
+    """
+    Outcome of one item in a batch, in request order.
+    """
+    index: int
+    status: str  # "created", "updated" or "error"
+    log: Optional[LogResponse] = None
+    error: Optional[str] = None
+
+
+class LogBatchResponse(BaseModel):
+    """
+    Schema for batch submission results.
+    """
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    results: List[LogBatchItemResult] = []
+
+
 class LogWithHabitInfo(LogResponse):
     """
     Schema for log with habit details.
@@ -120,7 +174,8 @@ class MoodInsightsResponse(BaseModel):
     """
     Schema for mood insights summary.
     """
-    mood_trend: List[dict] = []  # [{date, mood_intensity, mood_label}]
+    mood_trend: List[dict] = []  # [{date, mood_intensity, mood_label, sentiment, entries}], one per bucket
+    trend_period: str = "day"  # bucket size of mood_trend: "day", "week" or "month"
     mood_distribution: dict = {}  # {mood_label: count}
     ai_insights: str = ""
     period_start: date
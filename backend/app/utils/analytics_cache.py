@@ -0,0 +1,253 @@
+"""
+Analytics Cache
+===============
+[HASEEB] Per-user result cache for analytics and summary endpoints.
+
+A user's analytics only change when they write (log, edit or delete a
+habit or log), so results are cached under a key of
+
+    user id, user generation, endpoint, params, today's date
+
+Every write path calls invalidate_user() after committing, which bumps
+the user's generation: older entries can no longer be looked up and age
+out of the LRU. Today's date is part of the key because "today", "this
+week" and streak decay move with the calendar.
+
+Backends:
+- MemoryBackend: bounded in-process LRU (default, one worker).
+- SQLiteBackend: a shared SQLite file, so several workers on one host
+  see the same entries and generations.
+
+Values are stored JSON-encoded (jsonable_encoder), i.e. exactly what the
+endpoint would have sent, so they never hold ORM objects.
+"""
+
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    Bounded LRU dict plus generation counters, guarded by one lock.
+    """
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+    
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+    
+    def bump(self, user_id: int):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    Entries and generations in a SQLite file shared by every worker on
+    the host. Least recently read entries are pruned every
+    `prune_every` writes once the table is over `max_entries`.
+    """
+    
+    def __init__(self, path: str, max_entries: int = 10000, prune_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations (user_id INTEGER PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return True, pickle.loads(row[0])
+    
+    def set(self, key: str, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+                (key, blob, time.time())
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+    
+    def _prune(self):
+        self._conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            " SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+    
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM generations WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else 0
+    
+    def bump(self, user_id: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO generations (user_id, generation) VALUES (?, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET generation = generation + 1",
+                (user_id,)
+            )
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM generations")
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class AnalyticsCache:
+    """
+    Generation-keyed result cache with hit/miss counters.
+    """
+    
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.invalidations = 0
+    
+    def make_key(self, user_id: int, endpoint: str, params: Optional[Dict] = None) -> str:
+        return "|".join((
+            str(user_id),
+            str(self.backend.generation(user_id)),
+            endpoint,
+            json.dumps(params or {}, sort_keys=True, default=str),
+            date.today().isoformat(),
+        ))
+    
+    async def cached(self, user_id: int, endpoint: str, params: Optional[Dict],
+                     compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached result for this user / endpoint / params, or
+        await `compute()` and cache its JSON-encoded result.
+        """
+        if not self.enabled:
+            return await compute()
+        
+        key = self.make_key(user_id, endpoint, params)
+        found, value = self.backend.get(key)
+        self._record(endpoint, found)
+        if found:
+            return value
+        
+        value = jsonable_encoder(await compute())
+        self.backend.set(key, value)
+        return value
+    
+    def invalidate_user(self, user_id: int):
+        """
+        Call after committing any write that changes a user's analytics.
+        """
+        self.backend.bump(user_id)
+        with self._lock:
+            self.invalidations += 1
+    
+    def _record(self, endpoint: str, hit: bool):
+        with self._lock:
+            self._counts[endpoint]["hits" if hit else "misses"] += 1
+    
+    def stats(self) -> Dict:
+        """
+        Hit/miss counts (this process only) overall and per endpoint.
+        """
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._counts.items()}
+            invalidations = self.invalidations
+        hits = sum(counts["hits"] for counts in endpoints.values())
+        misses = sum(counts["misses"] for counts in endpoints.values())
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "invalidations": invalidations,
+            "endpoints": endpoints,
+        }
+    
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._counts.clear()
+            self.invalidations = 0
+
+
+def make_backend(name: str, path: str, max_entries: int):
+    if name == "sqlite":
+        return SQLiteBackend(path, max_entries)
+    if name != "memory":
+        logger.warning(f"Unknown analytics cache backend '{name}', using memory")
+    return MemoryBackend(max_entries)
+
+
+analytics_cache = AnalyticsCache(
+    make_backend(
+        settings.ANALYTICS_CACHE_BACKEND,
+        settings.ANALYTICS_CACHE_PATH,
+        settings.ANALYTICS_CACHE_MAX_ENTRIES
+    ),
+    enabled=settings.ANALYTICS_CACHE_ENABLED
+)
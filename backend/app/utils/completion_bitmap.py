@@ -0,0 +1,215 @@
+"""
+Completion Bitmap Utility
+=========================
+[NOUMAN] Implementation.
+
+Keeps a compact bitmap of completed days on each Habit row, so "was
+habit X completed on day D" needs no query against logs.
+
+Bit i (byte i // 8, bit i % 8, little-endian) is set when the habit was
+completed on bitmap_start + i days. Ten years of history fits in about
+460 bytes. A NULL bitmap means it has not been built yet: readers fall
+back to the logs table and the first write builds it from logs.
+"""
+
+import base64
+from datetime import date, timedelta
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, undefer_group
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.utils.habit_schedule import as_days, get_habit_schedule, date_range
+
+
+# Loader option for queries that read the bitmaps of many habits at once
+with_bitmaps = undefer_group("bitmap")
+
+
+def is_built(habit: Habit) -> bool:
+    return habit.completion_bitmap is not None
+
+
+def _bits(habit: Habit) -> int:
+    return int.from_bytes(habit.completion_bitmap or b"", "little")
+
+
+def _store(habit: Habit, bits: int, start: Optional[date]):
+    habit.completion_bitmap = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    habit.bitmap_start = start if bits else None
+
+
+def _pack(dates) -> tuple:
+    """
+    Pack completed dates into (bits, start).
+    """
+    if len(dates) == 0:
+        return 0, None
+    start = min(dates)
+    bits = 0
+    for day in dates:
+        bits |= 1 << (day - start).days
+    return bits, start
+
+
+def build_bitmap(habit: Habit, db: Session):
+    """
+    Build a habit's bitmap from its completed logs.
+    """
+    dates = db.execute(
+        select(Log.log_date).where(Log.habit_id == habit.id, Log.completed == True)
+    ).scalars().all()
+    _store(habit, *_pack(dates))
+
+
+def set_completed(habit: Habit, day: date, completed: bool, db: Session):
+    """
+    Set or clear the bit for one day, building the bitmap first if needed.
+    Back-dating before bitmap_start shifts the bitmap by whole bytes.
+    This rewrites the whole column, so load the habit with_for_update()
+    or a concurrent write to another day is lost. Does not commit.
+    """
+    if not is_built(habit):
+        build_bitmap(habit, db)
+
+    bits = _bits(habit)
+    start = habit.bitmap_start or day
+    offset = (day - start).days
+    if offset < 0:
+        shift = -(offset // 8) * 8
+        bits <<= shift
+        start -= timedelta(days=shift)
+        offset += shift
+
+    if completed:
+        bits |= 1 << offset
+    else:
+        bits &= ~(1 << offset)
+    _store(habit, bits, start)
+
+
+def window(habit: Habit, start: date, end: date) -> int:
+    """
+    Bits for [start, end] as an int where bit 0 is `start`.
+    """
+    days = (end - start).days + 1
+    if days <= 0 or not habit.bitmap_start:
+        return 0
+    offset = (start - habit.bitmap_start).days
+    bits = _bits(habit)
+    bits = bits >> offset if offset >= 0 else bits << -offset
+    return bits & ((1 << days) - 1)
+
+
+def completed_on(habit: Habit, day: date, db: Session) -> bool:
+    """
+    Whether the habit was completed on `day`; queries logs if the bitmap isn't built.
+    """
+    if is_built(habit):
+        return bool(window(habit, day, day))
+    return db.query(Log.id).filter(
+        Log.habit_id == habit.id,
+        Log.log_date == day,
+        Log.completed == True
+    ).first() is not None
+
+
+def completion_count(habit: Habit, start: date, end: date) -> int:
+    """
+    Number of completed days in [start, end] (popcount of the window).
+    """
+    return bin(window(habit, start, end)).count("1")
+
+
+def completed_days(habit: Habit) -> np.ndarray:
+    """
+    All completed days as a sorted datetime64[D] array.
+    """
+    if not habit.bitmap_start:
+        return np.empty(0, dtype="datetime64[D]")
+    flags = np.unpackbits(np.frombuffer(habit.completion_bitmap, dtype=np.uint8), bitorder="little")
+    return as_days([habit.bitmap_start]) + np.flatnonzero(flags)
+
+
+def windows(habits: Sequence[Habit], start: date, end: date, db: Session) -> Dict[int, int]:
+    """
+    Windows for many habits at once, keyed by habit id (bit 0 = start).
+    Built bitmaps are read directly; the rest share one range query.
+    """
+    result = {habit.id: window(habit, start, end) for habit in habits if is_built(habit)}
+    pending = [habit.id for habit in habits if not is_built(habit)]
+    if pending:
+        result.update((habit_id, 0) for habit_id in pending)
+        for habit_id, log_date in db.execute(
+            select(Log.habit_id, Log.log_date).where(
+                Log.habit_id.in_(pending),
+                Log.log_date >= start,
+                Log.log_date <= end,
+                Log.completed == True
+            )
+        ):
+            result[habit_id] |= 1 << (log_date - start).days
+    return result
+
+
+def scheduled_window(habit: Habit, start: date, end: date) -> int:
+    """
+    Bits for the days in [start, end] the habit is scheduled on (bit 0 = start).
+    """
+    flags = get_habit_schedule(habit).due_mask(date_range(start, end))
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def encode_bits(bits: int, days: int, encoding: str = "base64") -> str:
+    """
+    Encode a window as base64 (little-endian bytes) or as a "0"/"1"
+    bitstring read oldest day first.
+    """
+    if encoding == "bits":
+        return format(bits, "0%db" % days)[::-1] if days > 0 else ""
+    return base64.b64encode(bits.to_bytes((days + 7) // 8, "little")).decode("ascii")
+
+
+def encode_window(habit: Habit, start: date, end: date) -> str:
+    """
+    Base64 of the [start, end] window, little-endian bit order (bit 0 = start).
+    """
+    return encode_bits(window(habit, start, end), (end - start).days + 1)
+
+
+def rebuild_bitmaps(db: Session, habit_ids=None, user_id=None) -> int:
+    """
+    Rebuild bitmaps for many habits from one logs query and one bulk UPDATE.
+    Returns the number of habits rebuilt.
+    """
+    scope = select(Habit.id)
+    if habit_ids is not None:
+        scope = scope.where(Habit.id.in_(habit_ids))
+    if user_id is not None:
+        scope = scope.where(Habit.user_id == user_id)
+    scoped_ids = db.execute(scope).scalars().all()
+
+    dates_by_habit = {habit_id: [] for habit_id in scoped_ids}
+    for habit_id, log_date in db.execute(
+        select(Log.habit_id, Log.log_date).where(
+            Log.completed == True,
+            Log.habit_id.in_(scope)
+        )
+    ):
+        dates_by_habit[habit_id].append(log_date)
+
+    params = []
+    for habit_id, dates in dates_by_habit.items():
+        bits, start = _pack(dates)
+        params.append({
+            "id": habit_id,
+            "completion_bitmap": bits.to_bytes((bits.bit_length() + 7) // 8, "little"),
+            "bitmap_start": start,
+        })
+    if params:
+        db.execute(update(Habit), params)
+    db.commit()
+    return len(params)
@@ -0,0 +1,129 @@
+"""
+Habit Correlations
+==================
+[HASEEB] Which habits tend to be completed on the same days.
+
+One range query over completed logs fills a habits x days boolean
+matrix. Pairwise statistics are then computed for all pairs at once:
+
+- correlation: Pearson (phi) coefficient of the two day series
+- lift: P(both) / (P(a) * P(b)); above 1 means "together more than chance"
+- together_days: days both were completed
+
+The NumPy work runs in a worker thread so large histories do not block
+the event loop.
+"""
+
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.models.user import User
+
+
+def completion_matrix(db: Session, user: User, start_date: date, end_date: date):
+    """
+    (habit ids, titles, bool matrix[habit, day]) for habits with at least
+    one completion in [start_date, end_date].
+    """
+    rows = db.execute(
+        select(Log.habit_id, Habit.title, Log.log_date)
+        .join(Habit, Habit.id == Log.habit_id)
+        .where(
+            Log.user_id == user.id,
+            Log.completed == True,
+            Log.log_date.between(start_date, end_date)
+        )
+    ).all()
+    
+    titles = {}
+    for row in rows:
+        titles.setdefault(row.habit_id, row.title)
+    habit_ids = sorted(titles)
+    index = {habit_id: i for i, habit_id in enumerate(habit_ids)}
+    
+    matrix = np.zeros((len(habit_ids), (end_date - start_date).days + 1), dtype=bool)
+    if rows:
+        habit_rows = np.fromiter((index[row.habit_id] for row in rows), dtype=np.int64, count=len(rows))
+        day_columns = np.fromiter(((row.log_date - start_date).days for row in rows), dtype=np.int64, count=len(rows))
+        matrix[habit_rows, day_columns] = True
+    return habit_ids, [titles[habit_id] for habit_id in habit_ids], matrix
+
+
+def pairwise_stats(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Correlation, lift and together-day counts for every pair of rows.
+    Undefined values (a habit done every day or never) are reported as 0.
+    """
+    x = matrix.astype(np.float64)
+    days = x.shape[1]
+    together = x @ x.T
+    rates = x.mean(axis=1)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = (together / days) / np.outer(rates, rates)
+        centered = x - rates[:, None]
+        covariance = centered @ centered.T / days
+        spread = np.sqrt(np.diag(covariance))
+        correlation = covariance / np.outer(spread, spread)
+    
+    return {
+        "correlation": np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0),
+        "lift": np.nan_to_num(lift, nan=0.0, posinf=0.0, neginf=0.0),
+        "together": together.astype(np.int64),
+        "rates": rates,
+    }
+
+
+def top_pairs(habit_ids: List[int], titles: List[str], stats: Dict[str, np.ndarray],
+              limit: int) -> List[Dict]:
+    """
+    Pairs ordered by correlation, strongest first (positive or negative).
+    """
+    first, second = np.triu_indices(len(habit_ids), k=1)
+    order = np.argsort(-np.abs(stats["correlation"][first, second]), kind="stable")[:limit]
+    return [
+        {
+            "habit_a": habit_ids[a],
+            "habit_b": habit_ids[b],
+            "title_a": titles[a],
+            "title_b": titles[b],
+            "correlation": round(float(stats["correlation"][a, b]), 3),
+            "lift": round(float(stats["lift"][a, b]), 3),
+            "together_days": int(stats["together"][a, b]),
+        }
+        for a, b in zip(first[order], second[order])
+    ]
+
+
+async def habit_correlations(db: Session, user: User, days: int = 90, limit: int = 10,
+                             include_matrix: bool = False,
+                             end_date: Optional[date] = None) -> Dict:
+    """
+    Co-completion statistics for the last `days` days.
+    """
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    habit_ids, titles, matrix = completion_matrix(db, user, start_date, end_date)
+    stats = await asyncio.to_thread(pairwise_stats, matrix)
+    
+    result = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "habits": [
+            {"habit_id": habit_id, "title": title, "completion_rate": round(float(rate), 3)}
+            for habit_id, title, rate in zip(habit_ids, titles, stats["rates"])
+        ],
+        "pairs": top_pairs(habit_ids, titles, stats, limit),
+    }
+    if include_matrix:
+        result["correlation_matrix"] = np.round(stats["correlation"], 3).tolist()
+        result["lift_matrix"] = np.round(stats["lift"], 3).tolist()
+    return result
@@ -0,0 +1,297 @@
+"""
+Daily Stats Utility
+===================
+[HASEEB] Keeps the user_daily_stats rollup in step with the logs table.
+
+Log write paths capture a log's contribution (completed, logged, mood)
+before and after the change and apply the difference to the user's row
+for that day with one INSERT ... ON CONFLICT DO UPDATE, in the same
+transaction as the log write. Upserts that never read the old log
+recount the day's row instead (refresh_day).
+
+A user whose rollup has never been built (daily_stats_built_at is NULL)
+is skipped on writes and backfilled from logs on the first analytics
+read, so rows written before the rollup existed are never half-counted.
+
+Every change to a user's rows also bumps users.daily_stats_version in
+the same transaction, which readers use as the version of the rollup.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select, update, insert
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.models.user import User
+from app.models.user_daily_stats import UserDailyStats
+from app.utils.sql_helpers import dialect_insert
+
+
+STAT_FIELDS = (
+    "completed_count",
+    "logged_count",
+    "mood_sum",
+    "mood_count",
+    "mood_intensity_sum",
+    "mood_intensity_count",
+)
+
+NO_CONTRIBUTION = dict.fromkeys(STAT_FIELDS, 0)
+
+
+def is_built(user: User) -> bool:
+    return user.daily_stats_built_at is not None
+
+
+def log_contribution(log: Optional[Log]) -> Dict[str, float]:
+    """
+    What one log adds to its day's row (all zeros for no log).
+    """
+    if log is None:
+        return dict(NO_CONTRIBUTION)
+    return {
+        "completed_count": 1 if log.completed else 0,
+        "logged_count": 1,
+        "mood_sum": log.mood or 0,
+        "mood_count": 1 if log.mood is not None else 0,
+        "mood_intensity_sum": log.mood_intensity or 0.0,
+        "mood_intensity_count": 1 if log.mood_intensity is not None else 0,
+    }
+
+
+def bump_version(db: Session, user_id: int):
+    """
+    Advance the user's rollup version. Does not commit.
+    """
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(daily_stats_version=User.daily_stats_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _active_habit_count(user_id):
+    return select(func.count(Habit.id)).where(
+        Habit.user_id == user_id,
+        Habit.is_active == True
+    ).scalar_subquery()
+
+
+def apply_delta(db: Session, user_id: int, day: date, delta: Dict[str, float]):
+    """
+    Add `delta` to a user's row for `day`, creating the row if needed.
+    Callers bump_version once per transaction. Does not commit.
+    """
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+    
+    stmt = dialect_insert(db, UserDailyStats).values(
+        user_id=user_id,
+        date=day,
+        active_habit_count=_active_habit_count(user_id),
+        updated_at=datetime.utcnow(),
+        **delta
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDailyStats.user_id, UserDailyStats.date],
+        set_={
+            **{field: getattr(UserDailyStats, field) + stmt.excluded[field] for field in delta},
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    db.execute(stmt)
+
+
+def record_log_change(db: Session, user: User, day: date,
+                      before: Dict[str, float], after: Dict[str, float]):
+    """
+    Apply the change between two log_contribution snapshots.
+    Use NO_CONTRIBUTION as `before` for inserts and `after` for deletes.
+    """
+    if not is_built(user):
+        return
+    apply_delta(db, user.id, day, {field: after[field] - before[field] for field in STAT_FIELDS})
+    bump_version(db, user.id)
+
+
+def refresh_active_habits(db: Session, user: User, day: Optional[date] = None):
+    """
+    Re-count active habits on the user's row for `day` (default today)
+    after a habit is created, deactivated or reactivated. Does not commit.
+    """
+    if not is_built(user):
+        return
+    # Make a pending habit insert or is_active change visible to the count
+    db.flush()
+    db.execute(
+        update(UserDailyStats)
+        .where(UserDailyStats.user_id == user.id, UserDailyStats.date == (day or date.today()))
+        .values(active_habit_count=_active_habit_count(user.id))
+        .execution_options(synchronize_session=False)
+    )
+    bump_version(db, user.id)
+
+
+def refresh_day(db: Session, user: User, day: date):
+    """
+    Recount the user's row for `day` from that day's logs. For write paths
+    that don't know a log's previous state (single-statement upserts).
+    
+    The row is locked (created if missing) before counting, so on
+    PostgreSQL the count runs after any concurrent writer to the same row
+    has committed and sees its logs. Does not commit.
+    """
+    if not is_built(user):
+        return
+    lock = dialect_insert(db, UserDailyStats).values(
+        user_id=user.id,
+        date=day,
+        active_habit_count=_active_habit_count(user.id),
+        updated_at=datetime.utcnow()
+    )
+    db.execute(lock.on_conflict_do_update(
+        index_elements=[UserDailyStats.user_id, UserDailyStats.date],
+        set_={"updated_at": lock.excluded.updated_at}
+    ))
+    
+    counts = {
+        "completed_count": func.coalesce(func.sum(case((Log.completed == True, 1), else_=0)), 0),
+        "logged_count": func.count(Log.id),
+        "mood_sum": func.coalesce(func.sum(Log.mood), 0),
+        "mood_count": func.count(Log.mood),
+        "mood_intensity_sum": func.coalesce(func.sum(Log.mood_intensity), 0.0),
+        "mood_intensity_count": func.count(Log.mood_intensity),
+    }
+    db.execute(
+        update(UserDailyStats)
+        .where(UserDailyStats.user_id == user.id, UserDailyStats.date == day)
+        .values(**{
+            field: select(count).where(Log.user_id == user.id, Log.log_date == day).scalar_subquery()
+            for field, count in counts.items()
+        })
+        .execution_options(synchronize_session=False)
+    )
+    bump_version(db, user.id)
+
+
+def backfill_daily_stats(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild rollup rows from logs with one INSERT ... SELECT ... GROUP BY
+    and mark the users as built. Covers every user when user_ids is None.
+    Returns the number of rows written.
+    
+    History of habit activations isn't stored, so backfilled rows use the
+    current active habit count.
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+    
+    clear = delete(UserDailyStats)
+    if user_ids is not None:
+        clear = clear.where(UserDailyStats.user_id.in_(user_ids))
+    db.execute(clear.execution_options(synchronize_session=False))
+    
+    grouped = select(
+        Log.user_id,
+        Log.log_date,
+        func.sum(case((Log.completed == True, 1), else_=0)),
+        func.count(Log.id),
+        _active_habit_count(Log.user_id),
+        func.coalesce(func.sum(Log.mood), 0),
+        func.count(Log.mood),
+        func.coalesce(func.sum(Log.mood_intensity), 0.0),
+        func.count(Log.mood_intensity),
+        func.now(),
+    ).group_by(Log.user_id, Log.log_date)
+    if user_ids is not None:
+        grouped = grouped.where(Log.user_id.in_(user_ids))
+    
+    result = db.execute(
+        insert(UserDailyStats).from_select(
+            ["user_id", "date", "completed_count", "logged_count", "active_habit_count",
+             "mood_sum", "mood_count", "mood_intensity_sum", "mood_intensity_count", "updated_at"],
+            grouped
+        )
+    )
+    
+    mark = update(User).values(
+        daily_stats_built_at=datetime.utcnow(),
+        daily_stats_version=User.daily_stats_version + 1
+    )
+    if user_ids is not None:
+        mark = mark.where(User.id.in_(user_ids))
+    db.execute(mark.execution_options(synchronize_session="fetch"))
+    
+    db.commit()
+    return result.rowcount
+
+
+def ensure_built(db: Session, user: User):
+    """
+    Backfill a user's rollup on first use.
+    """
+    if not is_built(user):
+        backfill_daily_stats(db, [user.id])
+        db.refresh(user)
+
+
+def completions_by_day(db: Session, user: User, start_date: date, end_date: date) -> Dict[date, int]:
+    """
+    Completed count per day with any completions in [start_date, end_date].
+    """
+    ensure_built(db, user)
+    rows = db.execute(
+        select(UserDailyStats.date, UserDailyStats.completed_count).where(
+            UserDailyStats.user_id == user.id,
+            UserDailyStats.date >= start_date,
+            UserDailyStats.date <= end_date,
+            UserDailyStats.completed_count > 0
+        ).order_by(UserDailyStats.date)
+    ).all()
+    return {row.date: row.completed_count for row in rows}
+
+
+def completed_total(db: Session, user: User, start_date: Optional[date] = None,
+                    end_date: Optional[date] = None) -> int:
+    """
+    Total completions for a user, optionally within [start_date, end_date].
+    """
+    ensure_built(db, user)
+    query = select(func.coalesce(func.sum(UserDailyStats.completed_count), 0)).where(
+        UserDailyStats.user_id == user.id
+    )
+    if start_date:
+        query = query.where(UserDailyStats.date >= start_date)
+    if end_date:
+        query = query.where(UserDailyStats.date <= end_date)
+    return int(db.execute(query).scalar())
+
+
+def completed_totals(db: Session, user: User, ranges: Dict[str, Tuple[date, date]]) -> Dict[str, int]:
+    """
+    Total completions for several named [start, end] ranges in one query.
+    """
+    ensure_built(db, user)
+    if not ranges:
+        return {}
+    columns = [
+        func.coalesce(func.sum(case(
+            (UserDailyStats.date.between(start, end), UserDailyStats.completed_count),
+            else_=0
+        )), 0).label(name)
+        for name, (start, end) in ranges.items()
+    ]
+    earliest = min(start for start, _ in ranges.values())
+    latest = max(end for _, end in ranges.values())
+    row = db.execute(
+        select(*columns).where(
+            UserDailyStats.user_id == user.id,
+            UserDailyStats.date >= earliest,
+            UserDailyStats.date <= latest
+        )
+    ).one()
+    return {name: int(row._mapping[name]) for name in ranges}
@@ -163,19 +163,25 @@ class GeminiHelper:
         return await self.generate_text(prompt)
     
     async def analyze_patterns(self, 
-                                logs: List[dict]) -> dict:
+                                habit_stats: List[dict],
+                                pairs: Optional[List[dict]] = None) -> dict:
         """
         Analyze habit patterns with AI.
+        `habit_stats` holds one aggregated row per habit (completions,
+        peak hour / weekday, part-of-day shares); `pairs` the habits most
+        often completed on the same days.
         """
-        # Prepare log data for analysis
-        # Limit logs to avoid token limits
-        recent_logs = logs[:50]
+        # Limit habits to avoid token limits
+        stats = habit_stats[:50]
         
         # Build analysis prompt
         # WHY: Ask AI to identify patterns
         prompt = f"""
-        Analyze these recent habit logs:
-        {recent_logs}
+        Analyze these per-habit completion statistics (hours are the user's local time):
+        {stats}
+        
+        Habit pairs completed on the same days (correlation, lift over chance):
+        {pairs or []}
         
         Identify patterns in time of day, consistency, or completion rates.
         Return a JSON object with a "patterns" key containing a list of 2-3 short strings describing these patterns.
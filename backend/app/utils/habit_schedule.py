@@ -0,0 +1,243 @@
+"""
+Habit Schedule Utility
+======================
+[NOUMAN] Implementation.
+
+Turns a habit's frequency and target_days into a compact schedule and
+evaluates due days and streaks over date ranges with NumPy.
+
+A schedule is made of "due units":
+- period "day": each due day is a unit. A day is due when its weekday bit
+  or its day-of-month bit is set (DAILY has every weekday bit set).
+- period "week" / "month": each calendar week (Mon-Sun) or month is one
+  unit, completed by any completion inside it.
+
+A streak is the number of consecutive completed units. The unit that
+contains today is still in progress, so leaving it open does not break
+the streak.
+"""
+
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.habit import HabitFrequency
+
+
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+ALL_WEEKDAYS = 0b1111111
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+")
+
+
+class HabitSchedule(NamedTuple):
+    """Parsed schedule for one frequency / target_days combination."""
+    period: str  # "day", "week" or "month"
+    weekday_mask: int = 0  # bit 0 = Monday ... bit 6 = Sunday
+    monthday_mask: int = 0  # bit 0 = 1st ... bit 30 = 31st
+
+    @property
+    def is_every_day(self) -> bool:
+        return self.period == "day" and self.weekday_mask == ALL_WEEKDAYS
+
+    def due_mask(self, days: np.ndarray) -> np.ndarray:
+        """
+        Boolean array marking which of `days` (datetime64[D]) fall on a due unit.
+        """
+        if self.period != "day" or self.is_every_day:
+            return np.ones(len(days), dtype=bool)
+
+        weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        due = (np.left_shift(1, weekdays) & self.weekday_mask) != 0
+        if self.monthday_mask:
+            monthdays = (days - days.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64)
+            due |= (np.left_shift(1, monthdays) & self.monthday_mask) != 0
+        return due
+
+    def unit_ids(self, days: np.ndarray) -> np.ndarray:
+        """
+        Map days (datetime64[D]) to an increasing integer id for their unit.
+        """
+        day_numbers = days.astype(np.int64)
+        if self.period == "week":
+            return (day_numbers + 3) // 7
+        if self.period == "month":
+            return days.astype("datetime64[M]").astype(np.int64)
+        return day_numbers
+
+    def is_due_on(self, day: date) -> bool:
+        return bool(self.due_mask(as_days([day]))[0])
+
+    def unit_id(self, day: date) -> int:
+        return int(self.unit_ids(as_days([day]))[0])
+
+    def period_start(self, day: date) -> date:
+        """
+        First day of the unit containing `day`.
+        """
+        if self.period == "week":
+            return day - timedelta(days=day.weekday())
+        if self.period == "month":
+            return day.replace(day=1)
+        return day
+
+    def period_end(self, day: date) -> date:
+        """
+        Last day of the unit containing `day`.
+        """
+        if self.period == "week":
+            return day + timedelta(days=6 - day.weekday())
+        if self.period == "month":
+            next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            return next_month - timedelta(days=1)
+        return day
+    
+    def units_between(self, earlier: date, later: date) -> int:
+        """
+        Number of due units strictly between the units of two dates.
+        """
+        if self.period != "day":
+            return max(self.unit_id(later) - self.unit_id(earlier) - 1, 0)
+        if self.is_every_day:
+            return max((later - earlier).days - 1, 0)
+        if later - earlier <= timedelta(days=1):
+            return 0
+        return int(self.due_mask(date_range(earlier + timedelta(days=1), later - timedelta(days=1))).sum())
+
+    def count_due(self, start: date, end: date) -> int:
+        """
+        Number of due units overlapping [start, end].
+        """
+        if end < start:
+            return 0
+        days = date_range(start, end)
+        due_days = days[self.due_mask(days)]
+        if self.period == "day":
+            return len(due_days)
+        return len(np.unique(self.unit_ids(due_days)))
+
+    def unit_completions(self, completed_dates: np.ndarray,
+                         start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Due units overlapping [start, end] and whether each was completed.
+        Returns (unit ids, done flags), both ordered by unit.
+        """
+        days = date_range(start, end)
+        due = self.due_mask(days)
+        if not due.any():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+        # Mark completions by offset into the range instead of searching
+        offsets = (completed_dates - days[0]).astype(np.int64)
+        offsets = offsets[(offsets >= 0) & (offsets < len(days))]
+        hit = np.zeros(len(days), dtype=bool)
+        hit[offsets] = True
+
+        ids = self.unit_ids(days[due])
+        completed = hit[due]
+        if self.period == "day":
+            return ids, completed
+        units, first_index = np.unique(ids, return_index=True)
+        done = np.logical_or.reduceat(completed, first_index)
+        return units, done
+
+
+@lru_cache(maxsize=1024)
+def parse_schedule(frequency, target_days: Optional[str]) -> HabitSchedule:
+    """
+    Parse frequency plus target_days (e.g. "MO,WE,FR" or "1,15") into a
+    HabitSchedule. Cached, so each distinct combination is parsed once.
+
+    - DAILY ignores target_days and is due every day.
+    - WEEKLY is due on the listed weekdays, or once per week if none.
+    - MONTHLY is due on the listed days of month, or once per month if none.
+    - CUSTOM is due on the listed weekdays/days of month, or daily if none.
+    """
+    if isinstance(frequency, HabitFrequency):
+        frequency = frequency.value
+    frequency = (frequency or HabitFrequency.DAILY.value).lower()
+
+    weekday_mask = 0
+    monthday_mask = 0
+    for token in _TOKEN_RE.findall(target_days or ""):
+        if token.isdigit():
+            day = int(token)
+            if 1 <= day <= 31:
+                monthday_mask |= 1 << (day - 1)
+        elif token[:2].upper() in WEEKDAY_CODES:
+            weekday_mask |= 1 << WEEKDAY_CODES.index(token[:2].upper())
+
+    if frequency == HabitFrequency.WEEKLY.value:
+        return HabitSchedule("day", weekday_mask) if weekday_mask else HabitSchedule("week")
+    if frequency == HabitFrequency.MONTHLY.value:
+        return HabitSchedule("day", 0, monthday_mask) if monthday_mask else HabitSchedule("month")
+    if frequency == HabitFrequency.CUSTOM.value and (weekday_mask or monthday_mask):
+        return HabitSchedule("day", weekday_mask, monthday_mask)
+    return HabitSchedule("day", ALL_WEEKDAYS)
+
+
+def get_habit_schedule(habit) -> HabitSchedule:
+    """
+    Schedule for a Habit row (or any object with frequency/target_days).
+    """
+    return parse_schedule(habit.frequency, habit.target_days)
+
+
+def evaluate_streaks(schedule: HabitSchedule, completed_dates: Sequence[date],
+                     today: date) -> Tuple[int, int, Optional[date]]:
+    """
+    Compute (current streak, longest streak, last counted completion date)
+    from a habit's completed log dates.
+    """
+    if len(completed_dates) == 0:
+        return 0, 0, None
+
+    dates = np.unique(as_days(completed_dates))
+    dates = dates[schedule.due_mask(dates)]
+    if len(dates) == 0:
+        return 0, 0, None
+
+    start = dates[0].astype(object)
+    end = max(dates[-1].astype(object), today)
+    units, done = schedule.unit_completions(dates, start, end)
+
+    longest = int(run_lengths(done).max(initial=0))
+
+    # Current streak: trailing run up to today's unit, skipping it if still open
+    today_unit = schedule.unit_id(today)
+    upto_today = done[units <= today_unit]
+    if len(upto_today) and units[len(upto_today) - 1] == today_unit and not upto_today[-1]:
+        upto_today = upto_today[:-1]
+    misses = np.flatnonzero(~upto_today)
+    current = len(upto_today) - (misses[-1] + 1 if len(misses) else 0)
+
+    return int(current), longest, dates[-1].astype(object)
+
+
+def run_lengths(done: np.ndarray) -> np.ndarray:
+    """
+    Lengths of every run of consecutive True values.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], done.astype(np.int8), [0]))))
+    return edges[1::2] - edges[::2]
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def as_days(dates: Sequence[date]) -> np.ndarray:
+    if isinstance(dates, np.ndarray):
+        return dates.astype("datetime64[D]")
+    # Going through ordinals is much faster than letting NumPy convert date objects
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    return (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def date_range(start: date, end: date) -> np.ndarray:
+    """
+    Every day in [start, end] as datetime64[D].
+    """
+    return np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
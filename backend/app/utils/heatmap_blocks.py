@@ -0,0 +1,118 @@
+"""
+Heatmap Blocks
+==============
+[HASEEB] Per-year completion count arrays behind the heatmap and progress
+endpoints.
+
+Each (user, year) block is a NumPy array with one completion count per
+day of that year, read from the user_daily_stats rollup. Blocks are kept
+in a bounded in-process LRU and tagged with the user's data version
+(users.daily_stats_version, bumped by every rollup write and backfill),
+so any log write makes the user's blocks stale. A multi-year range is
+served by slicing and joining blocks; only stale or missing years are
+read, in one query.
+
+The same version makes a cheap ETag: clients that send it back in
+If-None-Match get 304 after a single lookup on the users primary key,
+without touching logs or the rollup.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.user_daily_stats import UserDailyStats
+from app.utils import daily_stats
+
+
+MAX_BLOCKS = 2048  # about 1.5 KB each
+
+_blocks: "OrderedDict[Tuple[int, int], Tuple[str, np.ndarray]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def data_version(db: Session, user: User) -> str:
+    """
+    Changes whenever a log write or backfill touches the user's rollup.
+    Read by primary key rather than from `user`, which may predate a
+    write in the same session.
+    """
+    daily_stats.ensure_built(db, user)
+    return str(db.execute(select(User.daily_stats_version).where(User.id == user.id)).scalar())
+
+
+def make_etag(user: User, version: str, *params) -> str:
+    """
+    Weak ETag for one user's view of the data at `version`.
+    """
+    key = "|".join(str(part) for part in (user.id, version, *params))
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def _year_days(year: int) -> int:
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def year_blocks(db: Session, user: User, years: Iterable[int], version: str) -> Dict[int, np.ndarray]:
+    """
+    Daily completion counts for each requested year, from the LRU where
+    still current and otherwise rebuilt with one rollup query.
+    """
+    blocks = {}
+    missing = []
+    with _lock:
+        for year in years:
+            cached = _blocks.get((user.id, year))
+            if cached and cached[0] == version:
+                _blocks.move_to_end((user.id, year))
+                blocks[year] = cached[1]
+            else:
+                missing.append(year)
+    if not missing:
+        return blocks
+    
+    built = {year: np.zeros(_year_days(year), dtype=np.int32) for year in missing}
+    rows = db.execute(
+        select(UserDailyStats.date, UserDailyStats.completed_count).where(
+            UserDailyStats.user_id == user.id,
+            UserDailyStats.completed_count > 0,
+            or_(*[UserDailyStats.date.between(date(year, 1, 1), date(year, 12, 31)) for year in missing])
+        )
+    ).all()
+    for row in rows:
+        built[row.date.year][row.date.timetuple().tm_yday - 1] = row.completed_count
+    
+    with _lock:
+        for year, block in built.items():
+            _blocks[(user.id, year)] = (version, block)
+            _blocks.move_to_end((user.id, year))
+        while len(_blocks) > MAX_BLOCKS:
+            _blocks.popitem(last=False)
+    blocks.update(built)
+    return blocks
+
+
+def daily_counts(db: Session, user: User, start_date: date, end_date: date,
+                 version: str) -> np.ndarray:
+    """
+    Completion count for every day in [start_date, end_date].
+    """
+    blocks = year_blocks(db, user, range(start_date.year, end_date.year + 1), version)
+    parts = []
+    for year in range(start_date.year, end_date.year + 1):
+        first = (max(start_date, date(year, 1, 1)) - date(year, 1, 1)).days
+        last = (min(end_date, date(year, 12, 31)) - date(year, 1, 1)).days
+        parts.append(blocks[year][first:last + 1])
+    return np.concatenate(parts)
+
+
+def clear():
+    with _lock:
+        _blocks.clear()
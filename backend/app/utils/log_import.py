@@ -0,0 +1,254 @@
+"""
+Log Import
+==========
+[OMAMAH] Bulk import of habit histories exported from other trackers.
+
+Input is CSV with the columns date, habit, completed, notes, mood (only
+date and habit are required). The file is parsed as a stream; habits
+are matched by title (case-insensitive) and created when missing. Logs
+are written in batches with one INSERT ... ON CONFLICT (habit_id,
+log_date) per batch, either updating or keeping existing logs.
+
+Derived data is rebuilt once at the end instead of per row: streaks and
+completion bitmaps for every affected habit, and the user's daily stats
+rollup. Habits created by the import are backdated to their first
+imported day, since due-day counts (trends, category breakdown) start
+at created_at.
+"""
+
+import csv
+import logging
+from datetime import date, datetime, time
+from typing import Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit, HabitFrequency, HabitCategory
+from app.models.log import Log
+from app.models.user import User
+from app.schemas.log import check_log_date
+from app.utils import daily_stats
+from app.utils.completion_bitmap import rebuild_bitmaps
+from app.utils.sql_helpers import dialect_insert
+from app.utils.streak_calculator import bulk_recompute_streaks
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+TRUE_VALUES = {"1", "true", "yes", "y", "done", "x"}
+FALSE_VALUES = {"0", "false", "no", "n"}
+
+
+class ImportRow(NamedTuple):
+    log_date: date
+    habit: str
+    completed: bool
+    notes: Optional[str]
+    mood: Optional[int]
+
+
+class ImportRowError(ValueError):
+    """A CSV row that could not be parsed."""
+
+
+def parse_row(row: Dict[str, str]) -> ImportRow:
+    """
+    Validate one CSV record. Raises ImportRowError with a readable message.
+    """
+    try:
+        log_date = date.fromisoformat((row.get("date") or "").strip())
+    except ValueError:
+        raise ImportRowError(f"invalid date '{row.get('date')}'")
+    try:
+        check_log_date(log_date)
+    except ValueError as exc:
+        raise ImportRowError(str(exc))
+    
+    habit = (row.get("habit") or "").strip()
+    if not habit:
+        raise ImportRowError("missing habit")
+    if len(habit) > 200:
+        raise ImportRowError("habit title longer than 200 characters")
+    
+    # A missing or blank completed column means the habit was done
+    completed_text = (row.get("completed") or "").strip().lower()
+    if not completed_text or completed_text in TRUE_VALUES:
+        completed = True
+    elif completed_text in FALSE_VALUES:
+        completed = False
+    else:
+        raise ImportRowError(f"invalid completed value '{row.get('completed')}'")
+    
+    mood = (row.get("mood") or "").strip()
+    if mood:
+        if not mood.isdigit() or not 1 <= int(mood) <= 5:
+            raise ImportRowError(f"mood must be 1-5, got '{mood}'")
+        mood = int(mood)
+    else:
+        mood = None
+    
+    notes = (row.get("notes") or "").strip() or None
+    return ImportRow(log_date, habit, completed, notes, mood)
+
+
+def parse_csv(stream: IO[str], errors: List[Dict]) -> Iterator[ImportRow]:
+    """
+    Yield valid rows; invalid ones are appended to `errors` (line numbers
+    count the header as line 1).
+    """
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None or not {"date", "habit"} <= {name.strip().lower() for name in reader.fieldnames}:
+        raise ImportRowError("CSV must have at least the columns: date, habit")
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for line, row in enumerate(reader, start=2):
+        try:
+            yield parse_row(row)
+        except ImportRowError as e:
+            errors.append({"line": line, "error": str(e)})
+
+
+def _resolve_habits(db: Session, user: User, titles: Iterable[str],
+                    habits: Dict[str, int], created: List[str]):
+    """
+    Fill `habits` (lower-cased title -> id), creating habits that do not exist.
+    """
+    new_titles = {}
+    for title in titles:
+        key = title.lower()
+        if key not in habits and key not in new_titles:
+            new_titles[key] = title
+    for key, title in new_titles.items():
+        habit = Habit(
+            user_id=user.id,
+            title=title,
+            description="Imported",
+            frequency=HabitFrequency.DAILY,
+            category=HabitCategory.OTHER,
+            is_active=True,
+            current_streak=0,
+            longest_streak=0
+        )
+        db.add(habit)
+        db.flush()
+        habits[key] = habit.id
+        created.append(title)
+
+
+def _write_batch(db: Session, user: User, batch: List[ImportRow], habits: Dict[str, int],
+                 created: List[str], overwrite: bool) -> Tuple[int, set]:
+    """
+    Upsert one batch. Later rows for the same habit and day win.
+    Returns (rows written, habit ids touched).
+    """
+    _resolve_habits(db, user, (row.habit for row in batch), habits, created)
+    
+    values = {}
+    for row in batch:
+        habit_id = habits[row.habit.lower()]
+        values[(habit_id, row.log_date)] = {
+            "habit_id": habit_id,
+            "user_id": user.id,
+            "log_date": row.log_date,
+            "completed": row.completed,
+            "notes": row.notes,
+            "mood": row.mood,
+        }
+    
+    stmt = dialect_insert(db, Log).values(list(values.values()))
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Log.habit_id, Log.log_date],
+            set_={
+                "completed": stmt.excluded.completed,
+                "notes": func.coalesce(stmt.excluded.notes, Log.notes),
+                "mood": func.coalesce(stmt.excluded.mood, Log.mood),
+            }
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Log.habit_id, Log.log_date])
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount, {habit_id for habit_id, _ in values}
+
+
+def _backdate_habits(db: Session, habit_ids: List[int]):
+    """
+    Move created_at of habits made by the import back to their first log.
+    """
+    if not habit_ids:
+        return
+    first_days = db.execute(
+        select(Log.habit_id, func.min(Log.log_date)).where(Log.habit_id.in_(habit_ids)).group_by(Log.habit_id)
+    ).all()
+    for habit_id, first_day in first_days:
+        started = datetime.combine(first_day, time.min)
+        db.execute(update(Habit).where(Habit.id == habit_id, Habit.created_at > started).values(created_at=started))
+    db.commit()
+
+
+def _rebuild_derived(db: Session, user: User, habit_ids: set, created_ids: List[int]):
+    """
+    Backdate new habits, then recompute streaks, bitmaps and the daily
+    rollup once for the import.
+    """
+    _backdate_habits(db, created_ids)
+    if not habit_ids:
+        return
+    bulk_recompute_streaks(db, habit_ids=sorted(habit_ids))
+    rebuild_bitmaps(db, habit_ids=sorted(habit_ids))
+    if daily_stats.is_built(user):
+        daily_stats.backfill_daily_stats(db, [user.id])
+
+
+def import_logs(db: Session, user: User, rows: Iterable[ImportRow], overwrite: bool = True,
+                batch_size: int = BATCH_SIZE, errors: Optional[List[Dict]] = None) -> Dict:
+    """
+    Import parsed rows for `user`. Each batch is committed as it is
+    written; streaks, bitmaps and the rollup are rebuilt once at the end.
+    """
+    errors = errors if errors is not None else []
+    habits = {
+        title.lower(): habit_id
+        for habit_id, title in db.execute(
+            select(Habit.id, Habit.title).where(Habit.user_id == user.id).order_by(Habit.id.desc())
+        )
+    }
+    created: List[str] = []
+    touched = set()
+    rows_read = written = 0
+    
+    batch: List[ImportRow] = []
+    try:
+        for row in rows:
+            batch.append(row)
+            rows_read += 1
+            if len(batch) >= batch_size:
+                count, habit_ids = _write_batch(db, user, batch, habits, created, overwrite)
+                written += count
+                touched |= habit_ids
+                batch = []
+        if batch:
+            count, habit_ids = _write_batch(db, user, batch, habits, created, overwrite)
+            written += count
+            touched |= habit_ids
+    except Exception:
+        # Batches already committed stay; keep their derived data in step
+        db.rollback()
+        _rebuild_derived(db, user, touched, [habits[title.lower()] for title in created])
+        raise
+    
+    _rebuild_derived(db, user, touched, [habits[title.lower()] for title in created])
+    
+    logger.info(f"Imported {written} logs for user {user.id} ({len(created)} habits created, {len(errors)} errors)")
+    return {
+        "rows_read": rows_read,
+        "logs_written": written,
+        "habits_created": created,
+        "habits_updated": len(touched),
+        "error_count": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+    }
@@ -0,0 +1,100 @@
+"""
+Log History Pages
+=================
+[OMAMAH] Keyset pagination and column projection for a habit's logs.
+
+Pages are ordered newest first by (log_date, id). The cursor is the key
+of the last row returned, and the next page starts with
+WHERE (log_date, id) < (cursor) on the ix_logs_habit_date_id index, so
+every page costs the same however deep it is (no OFFSET scan).
+
+`fields` limits the selected columns, e.g. to skip notes and mood when
+drawing a history strip. id and log_date are always included since the
+cursor is built from them.
+"""
+
+import base64
+import binascii
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.log import Log
+from app.schemas.log import LogResponse
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Columns a projection may ask for (everything LogResponse exposes)
+PAGE_FIELDS = tuple(LogResponse.model_fields)
+CURSOR_FIELDS = ("id", "log_date")
+
+
+def encode_cursor(log_date: date, log_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{log_date.isoformat()},{log_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Raises ValueError for a cursor that wasn't produced by encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, log_id = raw.split(",")
+        return date.fromisoformat(day), int(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Comma-separated field names -> ordered list including the cursor
+    fields. None means every column. Raises ValueError on unknown names.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PAGE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys([*CURSOR_FIELDS, *names]))
+
+
+def habit_log_page(db: Session, habit_id: int, limit: int = DEFAULT_LIMIT,
+                   cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                   start_date: Optional[date] = None,
+                   end_date: Optional[date] = None) -> Tuple[list, Optional[str]]:
+    """
+    One page of the habit's logs, newest first, and the cursor for the
+    next page (None on the last page). Rows are Log objects, or dicts of
+    the requested fields when `fields` is given.
+    """
+    if fields:
+        query = select(*[getattr(Log, name) for name in fields])
+    else:
+        query = select(Log)
+    query = query.where(Log.habit_id == habit_id)
+    if start_date:
+        query = query.where(Log.log_date >= start_date)
+    if end_date:
+        query = query.where(Log.log_date <= end_date)
+    if cursor:
+        query = query.where(tuple_(Log.log_date, Log.id) < tuple_(*decode_cursor(cursor)))
+    
+    # One extra row tells whether there is a next page
+    query = query.order_by(Log.log_date.desc(), Log.id.desc()).limit(limit + 1)
+    result = db.execute(query)
+    rows: list = [dict(row._mapping) for row in result] if fields else list(result.scalars())
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if fields:
+            next_cursor = encode_cursor(last["log_date"], last["id"])
+        else:
+            next_cursor = encode_cursor(last.log_date, last.id)
+    return rows, next_cursor
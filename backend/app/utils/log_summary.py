@@ -0,0 +1,204 @@
+"""
+Log Summaries
+=============
+[OMAMAH] Daily, weekly and custom-range completion summaries.
+
+Every summary is built from one pass over a date range: with embedded
+logs, a single logs query for the whole window grouped by day in Python;
+without them, per-day completion counts from the user_daily_stats
+rollup. The active habit count comes from one COUNT query.
+
+Monthly summaries need per-day and per-habit counts, so they use one
+GROUP BY (habit, day) over the user's habits outer-joined to completed
+logs and roll that up per day, habit and month in Python.
+"""
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.models.user import User
+from app.schemas.log import LogResponse
+from app.utils import daily_stats
+
+
+MAX_RANGE_DAYS = 366
+MAX_MONTHS = 12
+
+
+def week_bounds(week_start: Optional[date] = None):
+    """
+    (Monday, Sunday) of the current week, or the week starting at week_start.
+    """
+    if week_start is None:
+        today = date.today()
+        week_start = today - timedelta(days=today.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+def _percentage(completed: int, possible: int) -> float:
+    return (completed / possible * 100) if possible > 0 else 0.0
+
+
+def range_summary(db: Session, user: User, start_date: date, end_date: date,
+                  include_logs: bool = True) -> Dict:
+    """
+    Per-day completion summaries for [start_date, end_date] plus totals
+    and the best day. With include_logs each day carries its logs.
+    """
+    total_habits = db.execute(
+        select(func.count(Habit.id)).where(Habit.user_id == user.id, Habit.is_active == True)
+    ).scalar_one()
+    
+    logs_by_day = defaultdict(list)
+    if include_logs:
+        completions = defaultdict(int)
+        for log in db.execute(
+            select(Log).where(
+                Log.user_id == user.id,
+                Log.log_date.between(start_date, end_date)
+            ).order_by(Log.log_date, Log.id)
+        ).scalars():
+            logs_by_day[log.log_date].append(LogResponse.model_validate(log))
+            completions[log.log_date] += 1 if log.completed else 0
+    else:
+        completions = daily_stats.completions_by_day(db, user, start_date, end_date)
+    
+    days = (end_date - start_date).days + 1
+    daily_summaries = []
+    total_completions = 0
+    best_day = None
+    best_day_rate = 0.0
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        completed = completions.get(day, 0)
+        total_completions += completed
+        rate = _percentage(completed, total_habits)
+        if rate > best_day_rate:
+            best_day_rate = rate
+            best_day = day
+        
+        summary = {
+            "date": day,
+            "total_habits": total_habits,
+            "completed_habits": completed,
+            "completion_percentage": rate,
+        }
+        if include_logs:
+            summary["logs"] = logs_by_day.get(day, [])
+        daily_summaries.append(summary)
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "daily_summaries": daily_summaries,
+        "completion_rate": _percentage(total_completions, total_habits * days),
+        "total_completions": total_completions,
+        "total_habits_tracked": total_habits,
+        "best_day": best_day,
+        "best_day_completion_rate": best_day_rate,
+    }
+
+
+def daily_summary(db: Session, user: User, day: date) -> Dict:
+    """
+    One day's summary with its logs.
+    """
+    return range_summary(db, user, day, day)["daily_summaries"][0]
+
+
+def weekly_summary(db: Session, user: User, week_start: Optional[date] = None,
+                   include_logs: bool = True) -> Dict:
+    """
+    range_summary for one week, with the weekly response's field names.
+    """
+    week_start, week_end = week_bounds(week_start)
+    summary = range_summary(db, user, week_start, week_end, include_logs)
+    return {
+        "week_start": week_start,
+        "week_end": week_end,
+        "daily_summaries": summary["daily_summaries"],
+        "weekly_completion_rate": summary["completion_rate"],
+        "total_completions": summary["total_completions"],
+        "total_habits_tracked": summary["total_habits_tracked"],
+        "best_day": summary["best_day"],
+        "best_day_completion_rate": summary["best_day_completion_rate"],
+    }
+
+
+def month_starts(year: int, month: int, months: int) -> List[date]:
+    """
+    First days of the `months` months ending at year/month, oldest first.
+    """
+    last = year * 12 + month - 1
+    return [date(index // 12, index % 12 + 1, 1) for index in range(last - months + 1, last + 1)]
+
+
+def monthly_summaries(db: Session, user: User, year: int, month: int, months: int = 1) -> List[Dict]:
+    """
+    Summaries for the `months` months ending at year/month, oldest first,
+    each with a completion count for every day and for every habit.
+    """
+    firsts = month_starts(year, month, months)
+    start_date = firsts[0]
+    end_date = firsts[-1].replace(day=monthrange(firsts[-1].year, firsts[-1].month)[1])
+    
+    rows = db.execute(
+        select(
+            Habit.id, Habit.title, Habit.is_active, Log.log_date,
+            func.count(Log.id).label("completions")
+        ).outerjoin(Log, and_(
+            Log.habit_id == Habit.id,
+            Log.completed == True,
+            Log.log_date.between(start_date, end_date)
+        )).where(
+            Habit.user_id == user.id
+        ).group_by(Habit.id, Habit.title, Habit.is_active, Log.log_date)
+    ).all()
+    
+    habits = {}
+    by_day = defaultdict(int)
+    by_habit_month = defaultdict(int)
+    for row in rows:
+        habits[row.id] = (row.title, row.is_active)
+        if row.log_date is not None:
+            by_day[row.log_date] += row.completions
+            by_habit_month[(row.id, row.log_date.year, row.log_date.month)] += row.completions
+    total_habits = sum(1 for _, is_active in habits.values() if is_active)
+    
+    summaries = []
+    for first in firsts:
+        days_in_month = monthrange(first.year, first.month)[1]
+        daily = [
+            {"date": day, "completed": by_day.get(day, 0)}
+            for day in (first + timedelta(days=offset) for offset in range(days_in_month))
+        ]
+        per_habit = [
+            {"habit_id": habit_id, "title": title,
+             "completions": by_habit_month.get((habit_id, first.year, first.month), 0)}
+            for habit_id, (title, is_active) in habits.items()
+            if is_active or (habit_id, first.year, first.month) in by_habit_month
+        ]
+        per_habit.sort(key=lambda habit: (-habit["completions"], habit["habit_id"]))
+        
+        total_completions = sum(day["completed"] for day in daily)
+        total_possible = total_habits * days_in_month
+        summaries.append({
+            "month": first.month,
+            "year": first.year,
+            "total_completions": total_completions,
+            "total_possible": total_possible,
+            "completion_rate": _percentage(total_completions, total_possible),
+            "total_habits": total_habits,
+            "days_in_month": days_in_month,
+            "daily": daily,
+            "habits": per_habit,
+        })
+    return summaries
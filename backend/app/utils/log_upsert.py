@@ -0,0 +1,81 @@
+"""
+Log Upsert
+==========
+[OMAMAH] Writes one habit/day log with a single statement.
+
+INSERT ... ON CONFLICT (habit_id, log_date) DO UPDATE ... RETURNING
+replaces the old SELECT-then-INSERT/UPDATE, so two requests logging the
+same day at once (a double tap, a retried request) both succeed and
+leave one row instead of one of them failing on uq_habit_log_date.
+POST /api/logs/ keeps its "already exists" contract with ON CONFLICT DO
+NOTHING instead: the losing request gets no row back and a 400.
+
+The previous completed state comes from the habit's completion bitmap,
+which is loaded with the habit, so streaks are updated incrementally
+without reading the old log. The daily rollup is recounted for the day
+(daily_stats.refresh_day). Nothing here commits; callers commit the log,
+streak and rollup changes together.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.models.user import User
+from app.utils import completion_bitmap, daily_stats
+from app.utils.sql_helpers import dialect_insert
+from app.utils.streak_calculator import record_completion, record_uncompletion
+from app.utils.timezone_helper import local_today
+
+
+def upsert_log(db: Session, user: User, habit: Habit, log_date: date,
+               completed: bool, overwrite: bool = True, **fields) -> Tuple[Optional[Log], bool]:
+    """
+    Create or overwrite the habit's log for `log_date` and keep streaks,
+    bitmap and rollup in step. `fields` (notes, mood, duration_minutes)
+    are written as given. completion_time is stamped when the log is
+    completed and kept otherwise.
+    
+    With overwrite=False an existing log (including one inserted
+    concurrently) is left untouched and None is returned in its place.
+    
+    Returns (log, was_completed).
+    """
+    was_completed = completion_bitmap.completed_on(habit, log_date, db)
+    
+    values: Dict = dict(
+        habit_id=habit.id,
+        user_id=user.id,
+        log_date=log_date,
+        completed=completed,
+        completion_time=datetime.utcnow() if completed else None,
+        **fields
+    )
+    stmt = dialect_insert(db, Log).values(**values)
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Log.habit_id, Log.log_date],
+            set_={
+                "completed": stmt.excluded.completed,
+                "completion_time": func.coalesce(stmt.excluded.completion_time, Log.completion_time),
+                **{name: stmt.excluded[name] for name in fields},
+            }
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Log.habit_id, Log.log_date])
+    log = db.scalars(stmt.returning(Log), execution_options={"populate_existing": True}).one_or_none()
+    if log is None:
+        return None, was_completed
+    
+    daily_stats.refresh_day(db, user, log_date)
+    today = local_today(user.timezone)
+    if completed and not was_completed:
+        record_completion(habit, log_date, db, today)
+    elif was_completed and not completed:
+        record_uncompletion(habit, log_date, db, today)
+    
+    return log, was_completed
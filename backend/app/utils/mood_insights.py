@@ -0,0 +1,131 @@
+"""
+Mood Insights
+=============
+[OMAMAH] Aggregates behind /api/logs/mood-insights.
+
+Mood-analyzed logs in the range are read with one GROUP BY over (trend
+bucket, mood_label). That single query yields the recency and intensity
+weighted distribution, the downsampled trend and a fingerprint of the
+analyses in the range, so the work after it and the response size
+depend on the number of buckets and labels, not on the number of logs.
+
+The trend is bucketed by day for ranges up to DAILY_MAX_DAYS, by week
+(starting Monday) up to WEEKLY_MAX_DAYS and by month beyond that.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import Date, Float, cast, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.log import Log
+from app.models.user import User
+from app.utils.sql_helpers import date_bucket, day_number
+
+
+DAILY_MAX_DAYS = 92
+WEEKLY_MAX_DAYS = 730
+
+# weight = RECENCY_SHARE / (1 + days_ago / RECENCY_DECAY_DAYS) + INTENSITY_SHARE * intensity
+RECENCY_DECAY_DAYS = 14.0
+RECENCY_SHARE = 0.6
+INTENSITY_SHARE = 0.4
+
+
+def trend_period(start_date: date, end_date: date) -> str:
+    """
+    Bucket size for a range: "day", "week" or "month".
+    """
+    days = (end_date - start_date).days + 1
+    if days <= DAILY_MAX_DAYS:
+        return "day"
+    if days <= WEEKLY_MAX_DAYS:
+        return "week"
+    return "month"
+
+
+def sentiment(intensity: float) -> str:
+    if intensity > 0.6:
+        return "positive"
+    if intensity < 0.4:
+        return "negative"
+    return "neutral"
+
+
+def mood_weight(today: date):
+    """
+    SQL expression for one log's share of the distribution: recent logs
+    count for more, and so do more intense moods.
+    """
+    days_ago = day_number(literal(today, Date)) - day_number(Log.log_date)
+    recency = 1.0 / (1.0 + cast(days_ago, Float) / RECENCY_DECAY_DAYS)
+    return RECENCY_SHARE * recency + INTENSITY_SHARE * Log.mood_intensity
+
+
+def mood_insights(db: Session, user: User, start_date: date, end_date: date,
+                  today: Optional[date] = None) -> Dict:
+    """
+    Weighted label distribution and bucketed trend for mood-analyzed logs
+    between start_date and end_date (inclusive).
+    
+    "fingerprint" changes whenever an analysis in the range is added or
+    redone, which is what callers caching derived text should key on.
+    """
+    today = today or date.today()
+    period = trend_period(start_date, end_date)
+    bucket = date_bucket(period, Log.log_date).label("bucket")
+    rows = db.execute(
+        select(
+            bucket,
+            Log.mood_label,
+            func.count().label("entries"),
+            func.sum(Log.mood_intensity).label("intensity"),
+            func.sum(mood_weight(today)).label("weight"),
+            func.max(Log.mood_analyzed_at).label("analyzed_at"),
+        ).where(
+            Log.user_id == user.id,
+            Log.log_date >= start_date,
+            Log.log_date <= end_date,
+            Log.mood_label.isnot(None),
+            Log.mood_intensity.isnot(None)
+        ).group_by(bucket, Log.mood_label).order_by(bucket)
+    ).all()
+    
+    buckets = defaultdict(lambda: {"entries": 0, "intensity": 0.0, "labels": {}})
+    distribution = defaultdict(float)
+    entries = 0
+    intensity = 0.0
+    analyzed_at = None
+    for row in rows:
+        point = buckets[row.bucket]
+        point["entries"] += row.entries
+        point["intensity"] += row.intensity
+        point["labels"][row.mood_label] = row.entries
+        distribution[row.mood_label] += row.weight
+        entries += row.entries
+        intensity += row.intensity
+        if row.analyzed_at is not None and (analyzed_at is None or row.analyzed_at > analyzed_at):
+            analyzed_at = row.analyzed_at
+    
+    trend = []
+    for day, point in buckets.items():
+        average = point["intensity"] / point["entries"]
+        trend.append({
+            "date": str(day),
+            "mood_intensity": round(average, 3),
+            # Most frequent label in the bucket; ties go to the alphabetically first
+            "mood_label": min(point["labels"], key=lambda label: (-point["labels"][label], label)),
+            "sentiment": sentiment(average),
+            "entries": point["entries"],
+        })
+    
+    return {
+        "trend_period": period,
+        "trend": trend,
+        "distribution": {label: round(weight, 3) for label, weight in distribution.items()},
+        "total_entries": entries,
+        "average_intensity": intensity / entries if entries else 0.5,
+        "fingerprint": (entries, analyzed_at.isoformat() if analyzed_at else None),
+    }
@@ -0,0 +1,125 @@
+"""
+SQL Helpers
+===========
+[TEAM] Shared by any module that builds dialect-specific SQL.
+
+Small SQLAlchemy constructs that compile differently on PostgreSQL
+(production) and SQLite (tests), so set-based queries can be written once.
+"""
+
+from typing import Optional
+
+from sqlalchemy import Date, Integer, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from app.utils.timezone_helper import get_zone, local_now
+
+
+class day_number(FunctionElement):
+    """
+    Whole number of days since a fixed epoch for a DATE expression.
+    
+    Consecutive calendar days map to consecutive integers, which is what
+    gaps-and-islands queries need to group runs of days.
+    """
+    type = Integer()
+    name = "day_number"
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):
+    return "(%s - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    return "CAST(julianday(%s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+def dialect_insert(db, model):
+    """
+    INSERT construct for the session's dialect, so callers can use
+    on_conflict_do_update / on_conflict_do_nothing on both PostgreSQL and
+    SQLite.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
+class weekday(FunctionElement):
+    """
+    Day of week for a DATE expression, Monday = 0 ... Sunday = 6
+    (same numbering as date.weekday()).
+    """
+    type = Integer()
+    name = "weekday"
+    inherit_cache = True
+
+
+@compiles(weekday)
+def _weekday_default(element, compiler, **kw):
+    return "(CAST(EXTRACT(ISODOW FROM %s) AS INTEGER) - 1)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(weekday, "sqlite")
+def _weekday_sqlite(element, compiler, **kw):
+    return "((CAST(strftime('%%w', %s) AS INTEGER) + 6) %% 7)" % compiler.process(element.clauses, **kw)
+
+
+class date_bucket(FunctionElement):
+    """
+    First day of the "week" (Monday) or "month" containing a DATE
+    expression, for GROUP BY downsampling. "day" returns the date itself.
+    """
+    type = Date()
+    name = "date_bucket"
+    inherit_cache = True
+    # The period changes the SQL, so it is part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [
+        ("period", InternalTraversal.dp_string)
+    ]
+    
+    def __init__(self, period: str, expr):
+        if period not in ("day", "week", "month"):
+            raise ValueError(f"unknown bucket period '{period}'")
+        self.period = period
+        super().__init__(expr)
+
+
+@compiles(date_bucket)
+def _date_bucket_default(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    if element.period == "day":
+        return expr
+    return "CAST(date_trunc('%s', %s) AS DATE)" % (element.period, expr)
+
+
+@compiles(date_bucket, "sqlite")
+def _date_bucket_sqlite(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    if element.period == "day":
+        return "date(%s)" % expr
+    if element.period == "month":
+        return "date(%s, 'start of month')" % expr
+    return "date(%s, '-' || ((CAST(strftime('%%w', %s) AS INTEGER) + 6) %% 7) || ' days')" % (expr, expr)
+
+
+def local_datetime(db, utc_column, tz_name: Optional[str]):
+    """
+    Convert a naive UTC DATETIME expression (as written by
+    datetime.utcnow()) to wall-clock time in the user's timezone.
+
+    PostgreSQL converts each row with its own DST offset. SQLite has no
+    timezone data, so it shifts by the zone's current offset.
+    """
+    zone = get_zone(tz_name)
+    if db.get_bind().dialect.name == "postgresql":
+        return func.timezone(zone.key, func.timezone("UTC", utc_column))
+    offset = int(local_now(zone.key).utcoffset().total_seconds() // 60)
+    return func.datetime(utc_column, f"{offset:+d} minutes")
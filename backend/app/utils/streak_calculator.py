@@ -4,176 +4,413 @@ Streak Calculator Utility
 [NOUMAN] Implementation.
 
 Calculates habit completion streaks.
+Streaks follow each habit's schedule (see habit_schedule), so weekly,
+monthly and custom-day habits count consecutive due units, not days.
+They are evaluated on the owner's local date (timezone_helper), the
+same "today" the decay sweeper and reminder jobs use.
 """
 
 from datetime import date, timedelta
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
+from collections import defaultdict
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import func, select, case, update, or_
+import time
 
 from app.models.log import Log
-from app.models.habit import Habit
+from app.models.habit import Habit, HabitFrequency
+from app.models.user import User
+from app.utils.sql_helpers import day_number
+from app.utils.habit_schedule import HabitSchedule, parse_schedule, get_habit_schedule, evaluate_streaks, as_days
+from app.utils.timezone_helper import local_today
+from app.utils import completion_bitmap
+
+def owner_today(habit: Habit) -> date:
+    """
+    Today's date in the habit owner's timezone.
+    """
+    return local_today(habit.user.timezone)
+
+def _get_schedule(habit_id: int, db: Session) -> Tuple[HabitSchedule, date]:
+    """
+    Load just the schedule fields for a habit, plus its owner's local date.
+    """
+    row = db.query(Habit.frequency, Habit.target_days, User.timezone).join(
+        User, User.id == Habit.user_id
+    ).filter(Habit.id == habit_id).first()
+    if not row:
+        return parse_schedule(HabitFrequency.DAILY, None), date.today()
+    return get_habit_schedule(row), local_today(row.timezone)
+
+def _completed_dates(habit_id: int, db: Session) -> List[date]:
+    """
+    All completed log dates for a habit, oldest first (dates only, no ORM rows).
+    """
+    return db.execute(
+        select(Log.log_date).where(
+            Log.habit_id == habit_id,
+            Log.completed == True
+        ).order_by(Log.log_date)
+    ).scalars().all()
 
 def calculate_current_streak(habit_id: int, db: Session) -> int:
     """
     Calculate the current streak for a habit.
-    Checks consecutive days starting from today or yesterday.
+    Counts consecutive completed due units ending at today's unit,
+    or at the previous one while today's is still open.
     """
-    # 1. Get all completed logs for this habit, sorted by date (newest first)
-    logs = db.query(Log).filter(
-        Log.habit_id == habit_id, 
-        Log.completed == True
-    ).order_by(desc(Log.log_date)).all()
-    
-    if not logs:
-        return 0
-    
-    today = date.today()
-    start_check = logs[0].log_date
-    
-    # 2. Determine if streak is active
-    # Streak is active if last completion was Today OR Yesterday
-    if start_check == today:
-        current_streak = 1
-        last_date = today
-    elif start_check == today - timedelta(days=1):
-        current_streak = 1
-        last_date = start_check
-    else:
-        # Last completion was 2+ days ago, streak is broken
-        return 0
-        
-    # 3. Iterate backwards to count consecutive days
-    # We skip the first log since we already counted it above
-    for i in range(1, len(logs)):
-        expected_date = last_date - timedelta(days=1)
-        if logs[i].log_date == expected_date:
-            current_streak += 1
-            last_date = expected_date
-        elif logs[i].log_date == last_date:
-            # Handle case where multiple logs might exist for same day
-            continue
-        else:
-            break
-            
-    return current_streak
+    schedule, today = _get_schedule(habit_id, db)
+    current, _, _ = evaluate_streaks(schedule, _completed_dates(habit_id, db), today)
+    return current
 
 def calculate_longest_streak(habit_id: int, db: Session) -> int:
     """
     Calculate the longest streak ever for a habit.
     """
-    # 1. Get all completed logs sorted by date (oldest first)
-    logs = db.query(Log).filter(
-        Log.habit_id == habit_id, 
-        Log.completed == True
-    ).order_by(Log.log_date).all()
-    
-    if not logs:
-        return 0
-        
-    max_streak = 0
-    current_run = 0
-    prev_date = None
-    
-    for log in logs:
-        if prev_date is None:
-            current_run = 1
-        elif log.log_date == prev_date + timedelta(days=1):
-            # Consecutive day
-            current_run += 1
-        elif log.log_date == prev_date:
-            # Same day, ignore
-            pass
-        else:
-            # Gap found, reset run
-            current_run = 1
-            
-        max_streak = max(max_streak, current_run)
-        prev_date = log.log_date
-        
-    return max_streak
+    schedule, today = _get_schedule(habit_id, db)
+    _, longest, _ = evaluate_streaks(schedule, _completed_dates(habit_id, db), today)
+    return longest
 
 def update_habit_streaks(habit_id: int, db: Session) -> Tuple[int, int]:
     """
     Update streak fields on a habit record.
+    Loads the habit's completed dates once and computes both streaks.
     """
-    current = calculate_current_streak(habit_id, db)
-    longest = calculate_longest_streak(habit_id, db)
-    
     habit = db.query(Habit).filter(Habit.id == habit_id).first()
-    if habit:
-        habit.current_streak = current
-        # Only update longest if current is higher, or if we recalculated and found a historical high
-        habit.longest_streak = max(longest, habit.longest_streak)
-        db.commit()
-        db.refresh(habit)
-        
+    if not habit:
+        return 0, 0
+    
+    current, longest = refresh_habit_streaks(habit, db)
+    db.commit()
+    db.refresh(habit)
+    
     return current, longest
 
-def get_streak_at_risk_habits(user_id: int, db: Session) -> List[Habit]:
+def refresh_habit_streaks(habit: Habit, db: Session, today: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Recompute a loaded habit's streak fields from its bitmap (or its logs
+    when no bitmap is built) as of `today` (default: owner_today). Does
+    not commit, so several writes can share one recompute.
+    """
+    if completion_bitmap.is_built(habit):
+        completed_dates = completion_bitmap.completed_days(habit)
+    else:
+        completed_dates = _completed_dates(habit.id, db)
+    current, longest, last_completed = evaluate_streaks(
+        get_habit_schedule(habit), completed_dates, today or owner_today(habit)
+    )
+    
+    habit.current_streak = current
+    # Only update longest if current is higher, or if we recalculated and found a historical high
+    habit.longest_streak = max(longest, habit.longest_streak)
+    habit.last_completed_date = last_completed
+    
+    return current, longest
+
+def record_completion(habit: Habit, log_date: date, db: Session,
+                      today: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Incrementally update streak fields after a day is marked completed.
+    
+    Uses the stored streak state and last_completed_date, so completing
+    the current or previous due unit in order needs no log queries.
+    Back-dated completions (or habits with no tracked state yet) fall
+    back to a full recompute from the bitmap. Neither path commits; the
+    caller commits together with the log write. `today` defaults to
+    owner_today.
+    """
+    completion_bitmap.set_completed(habit, log_date, True, db)
+    
+    schedule = get_habit_schedule(habit)
+    if not schedule.is_due_on(log_date):
+        # Completions on days the habit isn't scheduled don't affect streaks
+        return habit.current_streak, habit.longest_streak
+    
+    today = today or owner_today(habit)
+    last = habit.last_completed_date
+    
+    untracked = last is None and (habit.current_streak > 0 or habit.longest_streak > 0)
+    back_dated = (
+        (last is not None and log_date < last)
+        or (log_date < today and schedule.units_between(log_date, today) > 0)
+    )
+    same_unit = last is not None and schedule.unit_id(last) == schedule.unit_id(log_date)
+    consecutive = (
+        last is not None
+        and not same_unit
+        and schedule.units_between(last, log_date) == 0
+    )
+    # A run that had already lapsed is stored as 0, so its length is unknown
+    lapsed = consecutive and habit.current_streak == 0
+    if untracked or back_dated or lapsed:
+        return refresh_habit_streaks(habit, db, today)
+    
+    if not same_unit:
+        if not consecutive:
+            habit.reset_streak()
+        habit.increment_streak()
+    habit.last_completed_date = log_date
+    
+    return habit.current_streak, habit.longest_streak
+
+def record_uncompletion(habit: Habit, log_date: date, db: Session,
+                        today: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Update streak fields after a completed log is deleted or un-completed.
+    
+    Removing a day can split a run anywhere in history, so this always
+    does a full recompute. Does not commit.
+    """
+    completion_bitmap.set_completed(habit, log_date, False, db)
+    return refresh_habit_streaks(habit, db, today)
+
+def bulk_recompute_streaks(db: Session,
+                           habit_ids: Optional[List[int]] = None,
+                           user_id: Optional[int] = None,
+                           as_of: Optional[date] = None) -> Dict:
+    """
+    Recompute current/longest streaks for many habits with set-based SQL.
+    
+    Daily habits use gaps-and-islands: day_number(log_date) minus
+    ROW_NUMBER() is constant within a run of consecutive days, so grouping
+    on it yields every run per habit. Weekly/monthly/custom habits are
+    evaluated with the schedule engine from a single range query.
+    Results match calculate_current_streak and calculate_longest_streak
+    and are written back with one bulk UPDATE. Habits in scope with no
+    completed logs are reset to zero.
+    
+    Each habit is evaluated on its owner's local date unless `as_of` is
+    given. Users span at most a few local dates at once, so the daily
+    pass runs once per distinct date over the timezones on it.
+    
+    The result includes `user_ids`, the owners of the recomputed habits,
+    so callers can invalidate their cached analytics.
+    """
+    started = time.perf_counter()
+    
+    scope = select(Habit.id)
+    if habit_ids is not None:
+        scope = scope.where(Habit.id.in_(habit_ids))
+    if user_id is not None:
+        scope = scope.where(Habit.user_id == user_id)
+    scoped = db.execute(
+        select(Habit.id, Habit.user_id, Habit.frequency, Habit.target_days, User.timezone)
+        .join(User, User.id == Habit.user_id)
+        .where(Habit.id.in_(scope))
+    ).all()
+    
+    today_by_timezone = {tz_name: as_of or local_today(tz_name) for tz_name in {row.timezone for row in scoped}}
+    timezones_by_date = defaultdict(list)
+    for tz_name, today in today_by_timezone.items():
+        timezones_by_date[today].append(tz_name)
+    
+    computed = {}
+    daily_scope = scope.where(Habit.frequency == HabitFrequency.DAILY)
+    for today, tz_names in timezones_by_date.items():
+        owners = select(User.id)
+        if not as_of:
+            matches = [User.timezone.in_([tz_name for tz_name in tz_names if tz_name is not None])]
+            if None in tz_names:
+                matches.append(User.timezone.is_(None))
+            owners = owners.where(or_(*matches))
+        computed.update(_daily_streaks(db, daily_scope.where(Habit.user_id.in_(owners)), today))
+    
+    # Scheduled (non-daily) habits: one range query, evaluated per habit
+    scheduled = {row.id: get_habit_schedule(row) for row in scoped if row.frequency != HabitFrequency.DAILY}
+    if scheduled:
+        dates_by_habit = defaultdict(list)
+        for habit_id, log_date in db.execute(
+            select(Log.habit_id, Log.log_date).where(
+                Log.completed == True,
+                Log.habit_id.in_(list(scheduled))
+            ).order_by(Log.habit_id, Log.log_date)
+        ):
+            dates_by_habit[habit_id].append(log_date)
+        for row in scoped:
+            if row.id in scheduled:
+                computed[row.id] = evaluate_streaks(
+                    scheduled[row.id], dates_by_habit[row.id], today_by_timezone[row.timezone]
+                )
+    
+    params = []
+    for row in scoped:
+        current, longest, last_completed = computed.get(row.id, (0, 0, None))
+        params.append({
+            "id": row.id,
+            "current_streak": current,
+            "longest_streak": longest,
+            "last_completed_date": last_completed,
+        })
+    
+    if params:
+        db.execute(update(Habit), params)
+    db.commit()
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "habits_updated": len(params),
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(len(params) / elapsed, 1) if elapsed > 0 else 0.0,
+        "user_ids": sorted({row.user_id for row in scoped}),
+    }
+
+def _daily_streaks(db: Session, daily_scope, as_of: date) -> Dict[int, Tuple[int, int, date]]:
     """
-    Get habits that have an active streak but haven't been completed today.
+    (current, longest, last_completed) per daily habit in `daily_scope`
+    as of `as_of`, from one gaps-and-islands query.
+    """
+    days = select(Log.habit_id, Log.log_date).where(
+        Log.completed == True,
+        Log.habit_id.in_(daily_scope)
+    ).distinct().subquery()
+    
+    islands = select(
+        days.c.habit_id,
+        days.c.log_date,
+        (day_number(days.c.log_date) - func.row_number().over(
+            partition_by=days.c.habit_id,
+            order_by=days.c.log_date
+        )).label("grp")
+    ).subquery()
+    
+    runs = select(
+        islands.c.habit_id,
+        func.count().label("length"),
+        func.max(islands.c.log_date).label("run_end")
+    ).group_by(islands.c.habit_id, islands.c.grp).subquery()
+    
+    # A run is still current if it ends today or yesterday
+    per_habit = select(
+        runs.c.habit_id,
+        func.max(runs.c.length).label("longest"),
+        func.max(case(
+            (runs.c.run_end >= as_of - timedelta(days=1), runs.c.length),
+            else_=0
+        )).label("current"),
+        func.max(runs.c.run_end).label("last_completed")
+    ).group_by(runs.c.habit_id)
+    
+    return {
+        row.habit_id: (int(row.current), int(row.longest), row.last_completed)
+        for row in db.execute(per_habit)
+    }
+
+def find_at_risk_habits(db: Session, today: date, user_scope=None) -> List:
+    """
+    Set-based at-risk detection across many users.
+    
+    Selects active habits with a live streak whose last completion falls
+    before today's due unit, in one query over the habits table. Weekly
+    and monthly units stay open until their last day, so those habits are
+    only at risk on that day. Rows
+    written before last_completed_date existed fall back to a correlated
+    MAX(log_date) lookup. `user_scope` is an optional list of user ids or
+    a SELECT of them (e.g. one timezone bucket); `today` is the users'
+    local date.
+    
+    Returns rows with id, user_id, title, current_streak and
+    last_completed_date.
     """
-    today = date.today()
+    last_logged = select(func.max(Log.log_date)).where(
+        Log.habit_id == Habit.id,
+        Log.completed == True
+    ).scalar_subquery()
+    last_completed = func.coalesce(Habit.last_completed_date, last_logged).label("last_completed_date")
     
-    # Get all active habits with a streak > 0
-    habits = db.query(Habit).filter(
-        Habit.user_id == user_id,
+    query = select(
+        Habit.id, Habit.user_id, Habit.title, Habit.current_streak,
+        Habit.frequency, Habit.target_days, last_completed
+    ).where(
         Habit.is_active == True,
         Habit.current_streak > 0
-    ).all()
+    )
+    if user_scope is not None:
+        query = query.where(Habit.user_id.in_(user_scope))
+    # Narrows daily habits exactly; scheduled ones are refined below
+    query = query.where(or_(last_completed.is_(None), last_completed < today))
     
     at_risk = []
-    for habit in habits:
-        # Check if completed today
-        completed_today = db.query(Log).filter(
-            Log.habit_id == habit.id,
-            Log.log_date == today,
-            Log.completed == True
-        ).first()
-        
-        if not completed_today:
-            at_risk.append(habit)
-            
+    for row in db.execute(query):
+        if row.frequency != HabitFrequency.DAILY:
+            schedule = get_habit_schedule(row)
+            if not schedule.is_due_on(today) or schedule.period_end(today) != today:
+                continue
+            if row.last_completed_date is not None and row.last_completed_date >= schedule.period_start(today):
+                continue
+        at_risk.append(row)
+    
     return at_risk
 
+def get_streak_at_risk_habits(user_id: int, db: Session) -> List[Habit]:
+    """
+    Get habits that have an active streak but haven't been completed
+    in today's due unit. Weekly/monthly habits count only on the last day
+    of their week or month.
+    """
+    today = local_today(db.query(User.timezone).filter(User.id == user_id).scalar())
+    at_risk_ids = [row.id for row in find_at_risk_habits(db, today, [user_id])]
+    if not at_risk_ids:
+        return []
+    
+    return db.query(Habit).filter(Habit.id.in_(at_risk_ids)).all()
+
 def calculate_completion_rate(habit_id: int, db: Session, days: int = 30) -> float:
     """
     Calculate completion rate over last N days.
+    Rate is completed due units / due units in the window, so a weekly
+    habit done every week scores 100%.
     """
-    today = date.today()
+    habit = db.query(Habit).filter(Habit.id == habit_id).first()
+    if not habit:
+        return 0.0
+    today = owner_today(habit)
     start_date = today - timedelta(days=days - 1) # Inclusive of today
+    schedule = get_habit_schedule(habit)
     
-    logs_count = db.query(Log).filter(
-        Log.habit_id == habit_id,
-        Log.log_date >= start_date,
-        Log.completed == True
-    ).count()
+    if completion_bitmap.is_built(habit):
+        if schedule.is_every_day:
+            # Plain popcount over the window
+            return (completion_bitmap.completion_count(habit, start_date, today) / days) * 100
+        completed_dates = completion_bitmap.completed_days(habit)
+    else:
+        completed_dates = db.execute(
+            select(Log.log_date).where(
+                Log.habit_id == habit_id,
+                Log.log_date >= start_date,
+                Log.log_date <= today,
+                Log.completed == True
+            )
+        ).scalars().all()
+    
+    _, done = schedule.unit_completions(as_days(completed_dates), start_date, today)
+    if len(done) == 0:
+        return 0.0
     
-    # Basic calculation: completions / days * 100
     # Note: This assumes the habit existed for all those days.
-    return (logs_count / days) * 100
+    return (int(done.sum()) / len(done)) * 100
 
 def get_weekly_completion_data(habit_id: int, db: Session) -> List[Dict]:
     """
     Get completion status for the last 7 days.
     """
-    today = date.today()
+    habit = db.query(Habit).filter(Habit.id == habit_id).first()
+    if not habit:
+        return []
+    
+    today = owner_today(habit)
+    start_date = today - timedelta(days=6)
+    completed = completion_bitmap.windows([habit], start_date, today, db)[habit.id]
+    scheduled = completion_bitmap.scheduled_window(habit, start_date, today)
     result = []
     
-    for i in range(6, -1, -1): # 6 days ago to 0 days ago (today)
-        check_date = today - timedelta(days=i)
-        
-        log = db.query(Log).filter(
-            Log.habit_id == habit_id,
-            Log.log_date == check_date,
-            Log.completed == True
-        ).first()
+    for i in range(7): # 6 days ago to 0 days ago (today)
+        check_date = start_date + timedelta(days=i)
         
         result.append({
             "date": check_date,
             "day_name": check_date.strftime("%a"), # Mon, Tue
-            "completed": log is not None
+            "completed": bool(completed >> i & 1),
+            "scheduled": bool(scheduled >> i & 1)
         })
-        
-    return result
\ No newline at end of file
+    
+    return result
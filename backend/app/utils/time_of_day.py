@@ -0,0 +1,112 @@
+"""
+Time-of-Day Histograms
+======================
+[HASEEB] When in the day and week a user completes their habits.
+
+Completed logs are bucketed by local weekday and hour of completion_time
+in one GROUP BY, converting from UTC with the user's timezone in SQL
+(see sql_helpers.local_datetime). The ix_logs_user_completion_time
+index (user_id, completion_time, habit_id) finds the user's completed
+rows, and at most habits x 7 x 24 rows come back however long the
+history.
+
+The analytics endpoint returns the full histograms; pattern_summary()
+condenses them for the AI pattern analysis.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.models.user import User
+from app.utils.sql_helpers import local_datetime, weekday
+from app.utils.timezone_helper import get_zone
+from app.utils.trends import WEEKDAY_NAMES
+
+
+def _empty_histogram() -> Dict:
+    return {"total": 0, "by_hour": [0] * 24, "by_weekday": [0] * 7}
+
+
+def _finish(histogram: Dict) -> Dict:
+    """
+    Add peak hour / weekday (None without completions).
+    """
+    by_hour, by_weekday = histogram["by_hour"], histogram["by_weekday"]
+    histogram["peak_hour"] = by_hour.index(max(by_hour)) if histogram["total"] else None
+    histogram["peak_weekday"] = WEEKDAY_NAMES[by_weekday.index(max(by_weekday))] if histogram["total"] else None
+    return histogram
+
+
+def completion_histogram(db: Session, user: User, habit_id: Optional[int] = None,
+                         start_date: Optional[date] = None,
+                         end_date: Optional[date] = None) -> Dict:
+    """
+    Completion counts by local hour and weekday, overall and per habit.
+    overall["weekday_hour"][weekday][hour] holds the combined grid.
+    """
+    local = local_datetime(db, Log.completion_time, user.timezone)
+    query = select(
+        Log.habit_id,
+        Habit.title,
+        weekday(local).label("weekday"),
+        extract("hour", local).label("hour"),
+        func.count().label("completions"),
+    ).join(Habit, Habit.id == Log.habit_id).where(
+        Log.user_id == user.id,
+        Log.completed == True,
+        Log.completion_time.isnot(None)
+    ).group_by(Log.habit_id, Habit.title, "weekday", "hour")
+    if habit_id is not None:
+        query = query.where(Log.habit_id == habit_id)
+    if start_date:
+        query = query.where(Log.log_date >= start_date)
+    if end_date:
+        query = query.where(Log.log_date <= end_date)
+    
+    overall = _empty_histogram()
+    overall["weekday_hour"] = [[0] * 24 for _ in range(7)]
+    habits = {}
+    for row in db.execute(query):
+        day, hour, count = int(row.weekday), int(row.hour), row.completions
+        habit = habits.get(row.habit_id)
+        if habit is None:
+            habit = habits[row.habit_id] = {"habit_id": row.habit_id, "title": row.title, **_empty_histogram()}
+        for histogram in (overall, habit):
+            histogram["total"] += count
+            histogram["by_hour"][hour] += count
+            histogram["by_weekday"][day] += count
+        overall["weekday_hour"][day][hour] += count
+    
+    return {
+        "timezone": get_zone(user.timezone).key,
+        "overall": _finish(overall),
+        "habits": [_finish(habit) for habit in sorted(habits.values(), key=lambda h: h["habit_id"])],
+    }
+
+
+def pattern_summary(histogram: Dict) -> List[Dict]:
+    """
+    Per-habit rows small enough for an AI prompt: totals, peaks and the
+    share of completions in each part of the day.
+    """
+    parts = {"night": range(0, 6), "morning": range(6, 12), "afternoon": range(12, 18), "evening": range(18, 24)}
+    summary = []
+    for habit in histogram["habits"]:
+        total = habit["total"]
+        summary.append({
+            "habit": habit["title"],
+            "completions": total,
+            "peak_hour": habit["peak_hour"],
+            "peak_weekday": habit["peak_weekday"],
+            "share_by_part_of_day": {
+                name: round(sum(habit["by_hour"][hour] for hour in hours) / total, 2)
+                for name, hours in parts.items()
+            },
+            "by_weekday": dict(zip(WEEKDAY_NAMES, habit["by_weekday"])),
+        })
+    return summary
@@ -0,0 +1,42 @@
+"""
+Timezone Helper
+===============
+[TEAM] Shared helpers for working with User.timezone.
+
+Users store an IANA timezone name (or nothing). Unknown or missing
+names fall back to UTC so scheduled jobs never fail on bad profile data.
+"""
+
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "UTC"
+
+
+def get_zone(tz_name: Optional[str]) -> ZoneInfo:
+    """
+    Resolve a timezone name to a ZoneInfo, falling back to UTC.
+    """
+    try:
+        return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def local_now(tz_name: Optional[str], now: Optional[datetime] = None) -> datetime:
+    """
+    Current time in the given timezone.
+    Naive `now` values are treated as UTC, matching datetime.utcnow().
+    """
+    now = now or datetime.now(dt_timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=dt_timezone.utc)
+    return now.astimezone(get_zone(tz_name))
+
+
+def local_today(tz_name: Optional[str], now: Optional[datetime] = None) -> date:
+    """
+    Today's date in the given timezone.
+    """
+    return local_now(tz_name, now).date()
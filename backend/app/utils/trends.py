@@ -0,0 +1,259 @@
+"""
+Trends Engine
+=============
+[HASEEB] Period-over-period comparisons for the analytics trends endpoint.
+
+Compares the current period (the last N days up to today) with the N days
+before it. Everything is aggregated in the database, from the
+user_daily_stats rollup plus one per-habit GROUP BY over logs, so the
+response has the same size whether the user has a week or ten years of
+history:
+
+- completions, due-adjusted completion rate and active days per period
+- best weekday per period
+- per-habit movers (largest rate gains and drops)
+- optional sparklines, downsampled to at most `sparkline_points` buckets
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, cast, func, literal, select, Date, String
+from sqlalchemy.orm import Session
+
+from app.models.habit import Habit
+from app.models.log import Log
+from app.models.user import User
+from app.models.user_daily_stats import UserDailyStats
+from app.utils import daily_stats
+from app.utils.habit_schedule import get_habit_schedule
+from app.utils.sql_helpers import day_number, weekday
+
+
+PERIOD_DAYS = {"week": 7, "month": 30, "quarter": 90, "year": 365}
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+MOVERS_LIMIT = 3
+
+
+def period_windows(period: str, today: date) -> Tuple[Tuple[date, date], Tuple[date, date]]:
+    """
+    (current, previous) [start, end] windows for a period ending today.
+    """
+    days = PERIOD_DAYS[period]
+    current_start = today - timedelta(days=days - 1)
+    previous_end = current_start - timedelta(days=1)
+    return (current_start, today), (previous_end - timedelta(days=days - 1), previous_end)
+
+
+def legacy_windows(today: date) -> Dict[str, Tuple[date, date]]:
+    """
+    Windows behind the `weekly` and `monthly` keys, with the meaning those
+    keys have always had: the 8 days up to today against the 7 days
+    before, and month to date against the 30 days before the 1st.
+    """
+    month_start = today.replace(day=1)
+    return {
+        "week_current": (today - timedelta(days=7), today),
+        "week_previous": (today - timedelta(days=14), today - timedelta(days=8)),
+        "month_current": (month_start, today),
+        "month_previous": (month_start - timedelta(days=30), month_start - timedelta(days=1)),
+    }
+
+
+def percent_change(current: float, previous: float) -> float:
+    if previous == 0:
+        return 100.0 if current > 0 else 0.0
+    return round((current - previous) / previous * 100, 1)
+
+
+def compare(current, previous) -> Dict:
+    return {"current": current, "previous": previous, "change": round(current - previous, 1)}
+
+
+def _sum_between(column, start: date, end: date):
+    return func.coalesce(func.sum(case((UserDailyStats.date.between(start, end), column), else_=0)), 0)
+
+
+def _rollup_totals(db: Session, user: User, windows: Dict[str, Tuple[date, date]]) -> Dict[str, int]:
+    """
+    Completions and active days for each named window, in one query.
+    """
+    active = case((UserDailyStats.completed_count > 0, 1), else_=0)
+    columns = []
+    for name, (start, end) in windows.items():
+        columns.append(_sum_between(UserDailyStats.completed_count, start, end).label(f"{name}_completions"))
+        columns.append(_sum_between(active, start, end).label(f"{name}_active_days"))
+    row = db.execute(
+        select(*columns).where(
+            UserDailyStats.user_id == user.id,
+            UserDailyStats.date >= min(start for start, _ in windows.values())
+        )
+    ).one()
+    return {key: int(value) for key, value in row._mapping.items()}
+
+
+def _best_weekdays(db: Session, user: User, current: Tuple[date, date],
+                   previous: Tuple[date, date]) -> Dict[str, Optional[Dict]]:
+    """
+    Weekday with the most completions in each window (at most 7 rows).
+    """
+    day_of_week = weekday(UserDailyStats.date)
+    rows = db.execute(
+        select(
+            day_of_week.label("weekday"),
+            _sum_between(UserDailyStats.completed_count, *current).label("current"),
+            _sum_between(UserDailyStats.completed_count, *previous).label("previous"),
+        ).where(
+            UserDailyStats.user_id == user.id,
+            UserDailyStats.date.between(previous[0], current[1])
+        ).group_by(day_of_week)
+    ).all()
+    
+    best = {}
+    for window in ("current", "previous"):
+        top = max(rows, key=lambda row: (getattr(row, window), -row.weekday), default=None)
+        if top is None or getattr(top, window) == 0:
+            best[window] = None
+        else:
+            best[window] = {"weekday": WEEKDAY_NAMES[top.weekday], "completions": int(getattr(top, window))}
+    return best
+
+
+def _habit_rates(db: Session, user: User, current: Tuple[date, date],
+                 previous: Tuple[date, date]) -> List[Dict]:
+    """
+    Per-habit due units and completed due units for both windows. One
+    row per habit from a single GROUP BY, carrying the habit's completed
+    dates across both windows; each schedule then marks which due units
+    were done, so repeat logs within one week or month count once.
+    """
+    rows = db.execute(
+        select(
+            Habit.id, Habit.title, Habit.frequency, Habit.target_days, Habit.created_at,
+            func.aggregate_strings(cast(Log.log_date, String), ",").label("completed_dates"),
+        ).select_from(Habit).outerjoin(Log, and_(
+            Log.habit_id == Habit.id,
+            Log.completed == True,
+            Log.log_date.between(previous[0], current[1])
+        )).where(
+            Habit.user_id == user.id,
+            Habit.is_active == True
+        ).group_by(Habit.id, Habit.title, Habit.frequency, Habit.target_days, Habit.created_at)
+    ).all()
+    
+    habits = []
+    for row in rows:
+        schedule = get_habit_schedule(row)
+        created = row.created_at.date() if row.created_at else previous[0]
+        completed_dates = row.completed_dates.split(",") if row.completed_dates else []
+        completed_days = np.array(completed_dates, dtype="datetime64[D]")
+        stats = {"habit_id": row.id, "title": row.title}
+        for window, (start, end) in (("current", current), ("previous", previous)):
+            _, done = schedule.unit_completions(completed_days, max(start, created), end)
+            stats[f"{window}_due"] = len(done)
+            stats[f"{window}_done"] = int(done.sum())
+        habits.append(stats)
+    return habits
+
+
+def _rate(habits: List[Dict], window: str) -> float:
+    due = sum(habit[f"{window}_due"] for habit in habits)
+    done = sum(habit[f"{window}_done"] for habit in habits)
+    return round(done / due * 100, 1) if due else 0.0
+
+
+def _movers(habits: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Habits whose completion rate rose or fell the most. Habits without
+    due units in both windows have nothing to compare and are skipped.
+    """
+    moved = []
+    for habit in habits:
+        if not habit["current_due"] or not habit["previous_due"]:
+            continue
+        current_rate = round(habit["current_done"] / habit["current_due"] * 100, 1)
+        previous_rate = round(habit["previous_done"] / habit["previous_due"] * 100, 1)
+        moved.append({
+            "habit_id": habit["habit_id"],
+            "title": habit["title"],
+            "current_rate": current_rate,
+            "previous_rate": previous_rate,
+            "change": round(current_rate - previous_rate, 1),
+        })
+    return {
+        "improving": sorted((m for m in moved if m["change"] > 0), key=lambda m: -m["change"])[:MOVERS_LIMIT],
+        "declining": sorted((m for m in moved if m["change"] < 0), key=lambda m: m["change"])[:MOVERS_LIMIT],
+    }
+
+
+def _sparklines(db: Session, user: User, current: Tuple[date, date],
+                previous: Tuple[date, date], points: int) -> Dict:
+    """
+    Completions per bucket of `bucket_days` days for each window, grouped
+    in SQL so at most 2 * points rows come back.
+    """
+    days = (current[1] - current[0]).days + 1
+    bucket_days = math.ceil(days / points)
+    in_current = UserDailyStats.date >= current[0]
+    window_start = case((in_current, literal(current[0], Date)), else_=literal(previous[0], Date))
+    bucket = (day_number(UserDailyStats.date) - day_number(window_start)) // bucket_days
+    rows = db.execute(
+        select(
+            case((in_current, 1), else_=0).label("is_current"),
+            bucket.label("bucket"),
+            func.sum(UserDailyStats.completed_count).label("completions"),
+        ).where(
+            UserDailyStats.user_id == user.id,
+            UserDailyStats.date.between(previous[0], current[1])
+        ).group_by("is_current", "bucket")
+    ).all()
+    
+    buckets = math.ceil(days / bucket_days)
+    lines = {"current": [0] * buckets, "previous": [0] * buckets}
+    for row in rows:
+        lines["current" if row.is_current else "previous"][int(row.bucket)] = int(row.completions)
+    return {"bucket_days": bucket_days, **lines}
+
+
+def compute_trends(db: Session, user: User, period: str = "week",
+                   sparkline_points: int = 0, today: Optional[date] = None) -> Dict:
+    """
+    Trend comparison for `period` (see PERIOD_DAYS), plus the fixed
+    weekly / monthly completion comparisons (see legacy_windows).
+    """
+    today = today or date.today()
+    daily_stats.ensure_built(db, user)
+    current, previous = period_windows(period, today)
+    
+    windows = {"current": current, "previous": previous, **legacy_windows(today)}
+    totals = _rollup_totals(db, user, windows)
+    habits = _habit_rates(db, user, current, previous)
+    
+    trends = {
+        "period": period,
+        "current_period": {"start": current[0], "end": current[1]},
+        "previous_period": {"start": previous[0], "end": previous[1]},
+        "completions": {
+            **compare(totals["current_completions"], totals["previous_completions"]),
+            "change_percent": percent_change(totals["current_completions"], totals["previous_completions"]),
+        },
+        "completion_rate": compare(_rate(habits, "current"), _rate(habits, "previous")),
+        "active_days": compare(totals["current_active_days"], totals["previous_active_days"]),
+        "best_weekday": _best_weekdays(db, user, current, previous),
+        "movers": _movers(habits),
+    }
+    for name, key in (("week", "weekly"), ("month", "monthly")):
+        current_total = totals[f"{name}_current_completions"]
+        previous_total = totals[f"{name}_previous_completions"]
+        trends[key] = {
+            "current": current_total,
+            "previous": previous_total,
+            "change_percent": percent_change(current_total, previous_total),
+        }
+    if sparkline_points:
+        trends["sparkline"] = _sparklines(db, user, current, previous, sparkline_points)
+    return trends
@@ -0,0 +1,7 @@
+"""
+Benchmarks Package
+==================
+Standalone performance scripts. Not collected by pytest.
+
+Run from the backend directory, e.g. ``python -m benchmarks.streak_engine``.
+"""
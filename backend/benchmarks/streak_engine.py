@@ -0,0 +1,78 @@
+"""
+Streak Engine Benchmark
+=======================
+Times evaluate_streaks and due counting over 10-year synthetic histories
+for each kind of schedule. Pure in-memory; no database needed.
+
+    python -m benchmarks.streak_engine
+    python -m benchmarks.streak_engine --years 20 --repeat 50
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from app.models.habit import HabitFrequency
+from app.utils.habit_schedule import parse_schedule, evaluate_streaks
+
+
+SCHEDULES = {
+    "daily": (HabitFrequency.DAILY, None),
+    "weekly": (HabitFrequency.WEEKLY, None),
+    "monthly": (HabitFrequency.MONTHLY, None),
+    "custom_mwf": (HabitFrequency.CUSTOM, "MO,WE,FR"),
+}
+
+
+def synthetic_history(years: int, density: float, seed: int = 42):
+    """Completed dates over `years` with random gaps."""
+    rng = random.Random(seed)
+    today = date.today()
+    return [
+        today - timedelta(days=d)
+        for d in range(years * 365, -1, -1)
+        if rng.random() < density
+    ]
+
+
+def run(years: int = 10, repeat: int = 20, density: float = 0.8) -> dict:
+    history = synthetic_history(years, density)
+    today = date.today()
+    results = {"years": years, "completed_days": len(history), "schedules": {}}
+    
+    for name, (frequency, target_days) in SCHEDULES.items():
+        schedule = parse_schedule(frequency, target_days)
+        
+        started = time.perf_counter()
+        for _ in range(repeat):
+            current, longest, _ = evaluate_streaks(schedule, history, today)
+        streak_ms = (time.perf_counter() - started) * 1000 / repeat
+        
+        started = time.perf_counter()
+        for _ in range(repeat):
+            due = schedule.count_due(history[0], today)
+        due_ms = (time.perf_counter() - started) * 1000 / repeat
+        
+        results["schedules"][name] = {
+            "evaluate_streaks_ms": round(streak_ms, 3),
+            "count_due_ms": round(due_ms, 3),
+            "current_streak": current,
+            "longest_streak": longest,
+            "due_units": due,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the schedule-aware streak engine.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--density", type=float, default=0.8)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.years, args.repeat, args.density), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Streak and Analytics Benchmark Suite
+====================================
+Generates a synthetic dataset (see benchmarks.synthetic), then times
+streak utilities and the analytics / logs / habits endpoints against it.
+For each case it records latency, SQL query count and peak Python memory,
+and prints (or writes) JSON so runs can be diffed between commits.
+
+    python -m benchmarks.suite --users 50 --habits 8 --years 3
+    python -m benchmarks.suite --database-url postgresql://localhost/habits_bench --reset
+    python -m benchmarks.suite --output after.json --compare before.json
+
+SQLite runs in memory by default. Against Postgres, point --database-url
+at a scratch database; --reset drops and recreates every table first.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.main import app
+from app.models.habit import Habit
+from app.models.user import User
+from app.routers import logs as logs_router
+from app.utils import streak_calculator, completion_bitmap
+from app.utils.analytics_cache import analytics_cache
+from app.utils.security import create_access_token
+from benchmarks.synthetic import generate_dataset
+
+
+class Case(NamedTuple):
+    """
+    One benchmarked call. `run` gets the shared context dict.
+    
+    The analytics result cache is off unless `cached` is set, so timed runs
+    measure the queries behind an endpoint rather than cache hits.
+    """
+    name: str
+    kind: str  # "utility" or "endpoint"
+    run: Callable[[Dict], object]
+    cached: bool = False
+
+
+def _get(path: str, **params) -> Callable[[Dict], object]:
+    def call(ctx):
+        response = ctx["client"].get(path.format(**ctx), params=params, headers=ctx["headers"])
+        response.raise_for_status()
+        return response
+    return call
+
+
+def _post(path: str, **body) -> Callable[[Dict], object]:
+    def call(ctx):
+        response = ctx["client"].post(path.format(**ctx), json=body or None, headers=ctx["headers"])
+        response.raise_for_status()
+        return response
+    return call
+
+
+def _today_minus(days: int) -> str:
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+CASES: List[Case] = [
+    # Utilities
+    Case("streak_calculator.update_habit_streaks", "utility",
+         lambda ctx: streak_calculator.update_habit_streaks(ctx["habit_id"], ctx["db"])),
+    Case("streak_calculator.calculate_completion_rate_365d", "utility",
+         lambda ctx: streak_calculator.calculate_completion_rate(ctx["habit_id"], ctx["db"], days=365)),
+    Case("streak_calculator.get_weekly_completion_data", "utility",
+         lambda ctx: streak_calculator.get_weekly_completion_data(ctx["habit_id"], ctx["db"])),
+    Case("streak_calculator.get_streak_at_risk_habits", "utility",
+         lambda ctx: streak_calculator.get_streak_at_risk_habits(ctx["user_id"], ctx["db"])),
+    Case("streak_calculator.find_at_risk_habits_all_users", "utility",
+         lambda ctx: streak_calculator.find_at_risk_habits(ctx["db"], date.today())),
+    Case("streak_calculator.bulk_recompute_streaks_all", "utility",
+         lambda ctx: streak_calculator.bulk_recompute_streaks(ctx["db"])),
+    Case("completion_bitmap.rebuild_bitmaps_user", "utility",
+         lambda ctx: completion_bitmap.rebuild_bitmaps(ctx["db"], user_id=ctx["user_id"])),
+    # Endpoints
+    Case("GET /api/analytics/overview", "endpoint", _get("/api/analytics/overview")),
+    Case("GET /api/analytics/overview (cache hit)", "endpoint", _get("/api/analytics/overview"), cached=True),
+    Case("GET /api/analytics/streaks", "endpoint", _get("/api/analytics/streaks")),
+    Case("GET /api/analytics/heatmap (365d)", "endpoint",
+         _get("/api/analytics/heatmap", start_date=_today_minus(364), end_date=_today_minus(0))),
+    Case("GET /api/analytics/progress (year)", "endpoint", _get("/api/analytics/progress", period="year")),
+    Case("GET /api/analytics/categories", "endpoint", _get("/api/analytics/categories")),
+    Case("GET /api/analytics/trends", "endpoint", _get("/api/analytics/trends")),
+    Case("GET /api/analytics/achievements", "endpoint", _get("/api/analytics/achievements")),
+    Case("GET /api/analytics/time-of-day", "endpoint", _get("/api/analytics/time-of-day")),
+    Case("GET /api/analytics/correlations (365d)", "endpoint", _get("/api/analytics/correlations", days=365)),
+    Case("GET /api/logs/weekly", "endpoint", _get("/api/logs/weekly")),
+    Case("GET /api/logs/mood-insights (90d)", "endpoint",
+         _get("/api/logs/mood-insights", start_date=_today_minus(89))),
+    Case("GET /api/logs/daily/{today}", "endpoint", _get("/api/logs/daily/{today}")),
+    Case("GET /api/logs/habit/{habit_id}", "endpoint", _get("/api/logs/habit/{habit_id}")),
+    Case("GET /api/habits/", "endpoint", _get("/api/habits/")),
+    Case("GET /api/habits/strip (90d)", "endpoint", _get("/api/habits/strip", days=90)),
+    Case("POST /api/habits/{habit_id}/complete", "endpoint", _post("/api/habits/{habit_id}/complete")),
+]
+
+
+@contextmanager
+def count_queries(engine: Engine):
+    """
+    Count SQL statements executed on `engine` inside the block.
+    """
+    counter = {"queries": 0}
+    
+    def before_cursor_execute(*args):
+        counter["queries"] += 1
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def measure(case: Case, ctx: Dict, repeat: int) -> Dict:
+    """
+    Run a case `repeat` times after one warm-up call.
+    Query count and peak memory are taken from the last run.
+    """
+    analytics_cache.clear()
+    analytics_cache.enabled = case.cached
+    case.run(ctx)
+    ctx["db"].expire_all()
+    
+    timings = []
+    queries = 0
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        with count_queries(ctx["engine"]) as counter:
+            started = time.perf_counter()
+            case.run(ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        queries = counter["queries"]
+        ctx["db"].expire_all()
+    
+    timings.sort()
+    return {
+        "kind": case.kind,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "queries": queries,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def make_engine(database_url: str) -> Engine:
+    if database_url in ("sqlite://", "sqlite:///:memory:"):
+        # One shared connection so the app's worker thread sees the same database
+        return create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    return create_engine(database_url)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _canned_text(prompt: str) -> str:
+    return "Benchmark run: AI text generation is not measured."
+
+
+def run(database_url: str = "sqlite://", users: int = 20, habits_per_user: int = 5,
+        years: int = 2, repeat: int = 5, seed: int = 42, reset: bool = False,
+        build_bitmaps: bool = False, only: Optional[str] = None) -> Dict:
+    engine = make_engine(database_url)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db: Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    
+    dataset = generate_dataset(db, users, habits_per_user, years, seed, build_bitmaps=build_bitmaps)
+    
+    # Every user gets the same number of habits, so the first one is representative
+    user_id = db.execute(select(User.id).order_by(User.id)).scalars().first()
+    habit_id = db.execute(
+        select(Habit.id).where(Habit.user_id == user_id).order_by(Habit.id)
+    ).scalars().first()
+    
+    # Measure our own code, not the model API
+    original_generate = logs_router.gemini.generate_text
+    cache_enabled = analytics_cache.enabled
+    logs_router.gemini.generate_text = _canned_text
+    app.dependency_overrides[get_db] = lambda: db
+    ctx = {
+        "db": db,
+        "engine": engine,
+        "client": TestClient(app),
+        "headers": {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"},
+        "user_id": user_id,
+        "habit_id": habit_id,
+        "today": date.today().isoformat(),
+    }
+    
+    results = {}
+    try:
+        for case in CASES:
+            if only and only not in case.name:
+                continue
+            results[case.name] = measure(case, ctx, repeat)
+    finally:
+        app.dependency_overrides.clear()
+        logs_router.gemini.generate_text = original_generate
+        analytics_cache.enabled = cache_enabled
+        analytics_cache.clear()
+        db.close()
+    
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "dialect": engine.dialect.name,
+            "repeat": repeat,
+            **dataset,
+        },
+        "results": results,
+    }
+
+
+def compare(before: Dict, after: Dict) -> Dict:
+    """
+    Per-case median latency ratio and query count change (after vs before).
+    """
+    changes = {}
+    for name, new in after["results"].items():
+        old = before.get("results", {}).get(name)
+        if not old:
+            continue
+        changes[name] = {
+            "median_ratio": round(new["median_ms"] / old["median_ms"], 2) if old["median_ms"] else None,
+            "queries_delta": new["queries"] - old["queries"],
+            "peak_memory_kb_delta": round(new["peak_memory_kb"] - old["peak_memory_kb"], 1),
+        }
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark streak utilities and analytics endpoints.")
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="SQLAlchemy URL (default: in-memory SQLite)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--habits", type=int, default=5, help="Habits per user")
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Drop all tables before generating")
+    parser.add_argument("--bitmaps", action="store_true", help="Build completion bitmaps after generating")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON output to diff against")
+    args = parser.parse_args(argv)
+    
+    report = run(
+        database_url=args.database_url,
+        users=args.users,
+        habits_per_user=args.habits,
+        years=args.years,
+        repeat=args.repeat,
+        seed=args.seed,
+        reset=args.reset,
+        build_bitmaps=args.bitmaps,
+        only=args.only,
+    )
+    if args.compare:
+        with open(args.compare) as f:
+            report["compare"] = compare(json.load(f), report)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Synthetic Dataset Generator
+===========================
+Fills a database with N users x M habits x Y years of logs for benchmarks.
+
+Completion histories follow a two-state model (on a run / lapsed), so
+they have realistic streaks and gaps rather than uniform noise. Habits
+mix every frequency, start at different points in the range, and some
+logs carry notes, moods and mood analysis.
+
+Logs are written with batched core INSERTs; streaks are then filled in
+with bulk_recompute_streaks. Completion bitmaps are left unbuilt unless
+`build_bitmaps` is set, matching rows that predate them.
+"""
+
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.user import User, UserType
+from app.models.habit import Habit, HabitFrequency, HabitCategory
+from app.models.log import Log
+from app.utils.completion_bitmap import rebuild_bitmaps
+from app.utils.streak_calculator import bulk_recompute_streaks
+
+
+FREQUENCIES = [
+    (HabitFrequency.DAILY, None),
+    (HabitFrequency.DAILY, None),
+    (HabitFrequency.DAILY, None),
+    (HabitFrequency.WEEKLY, None),
+    (HabitFrequency.MONTHLY, None),
+    (HabitFrequency.CUSTOM, "MO,WE,FR"),
+]
+
+TIMEZONES = [None, "UTC", "America/New_York", "America/Los_Angeles", "Europe/Berlin", "Asia/Karachi"]
+
+MOOD_LABELS = ["Happy", "Motivated", "Calm", "Tired", "Stressed", "Anxious"]
+
+BATCH_SIZE = 5000
+
+
+def _history(rng: random.Random, start: date, end: date):
+    """
+    Yield (day, completed) for days that have a log.
+    
+    Each habit gets its own discipline: how likely a run continues and
+    how likely a lapse ends. Lapsed days are mostly unlogged, with the
+    occasional explicit "not completed" log.
+    """
+    keep_going = rng.uniform(0.75, 0.97)
+    recover = rng.uniform(0.15, 0.5)
+    on_run = True
+    day = start
+    while day <= end:
+        on_run = rng.random() < (keep_going if on_run else recover)
+        if on_run:
+            yield day, True
+        elif rng.random() < 0.15:
+            yield day, False
+        day += timedelta(days=1)
+
+
+def generate_dataset(db: Session, users: int = 10, habits_per_user: int = 5,
+                     years: int = 1, seed: int = 42, end: Optional[date] = None,
+                     build_bitmaps: bool = False) -> Dict:
+    """
+    Generate the dataset and return counts plus generation time.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    end = end or date.today()
+    first_day = end - timedelta(days=365 * years - 1)
+    
+    user_rows = [
+        User(
+            email=f"bench{i}@example.com",
+            username=f"bench{i}",
+            hashed_password="not-a-real-hash",
+            user_type=UserType.REGULAR,
+            is_active=True,
+            timezone=rng.choice(TIMEZONES)
+        )
+        for i in range(users)
+    ]
+    db.add_all(user_rows)
+    db.flush()
+    
+    categories = list(HabitCategory)
+    habit_rows = []
+    for user in user_rows:
+        for j in range(habits_per_user):
+            frequency, target_days = rng.choice(FREQUENCIES)
+            habit_rows.append(Habit(
+                user_id=user.id,
+                title=f"Habit {j}",
+                frequency=frequency,
+                category=rng.choice(categories),
+                target_days=target_days,
+                is_active=rng.random() < 0.9,
+                current_streak=0,
+                longest_streak=0,
+                created_at=datetime.combine(first_day, datetime.min.time())
+            ))
+    db.add_all(habit_rows)
+    db.flush()
+    
+    log_count = 0
+    batch = []
+    for habit in habit_rows:
+        # Some habits were started part-way through the range
+        start = first_day + timedelta(days=rng.randrange(0, max(365 * years // 2, 1)))
+        for day, completed in _history(rng, start, end):
+            row = {
+                "habit_id": habit.id,
+                "user_id": habit.user_id,
+                "log_date": day,
+                "completed": completed,
+                "completion_time": datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(6 * 60, 23 * 60)) if completed else None,
+                "notes": "Synthetic note" if rng.random() < 0.1 else None,
+                "mood": rng.randint(1, 5) if rng.random() < 0.4 else None,
+                "mood_label": None,
+                "mood_intensity": None,
+                "created_at": datetime.combine(day, datetime.min.time()),
+            }
+            if row["notes"]:
+                row["mood_label"] = rng.choice(MOOD_LABELS)
+                row["mood_intensity"] = round(rng.random(), 2)
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                db.execute(insert(Log), batch)
+                log_count += len(batch)
+                batch = []
+    if batch:
+        db.execute(insert(Log), batch)
+        log_count += len(batch)
+    db.commit()
+    
+    if build_bitmaps:
+        rebuild_bitmaps(db)
+    bulk_recompute_streaks(db, as_of=end)
+    
+    return {
+        "users": users,
+        "habits": len(habit_rows),
+        "logs": log_count,
+        "years": years,
+        "seed": seed,
+        "generation_seconds": round(time.perf_counter() - started, 3),
+    }
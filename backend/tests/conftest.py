@@ -19,6 +19,9 @@ os.environ.setdefault("GOOGLE_CLIENT_SECRET", "test-client-secret")
 os.environ.setdefault("GOOGLE_REDIRECT_URI", "http://localhost:8000/api/calendar/oauth/callback")
 os.environ.setdefault("DEBUG", "True")
 os.environ.setdefault("CORS_ORIGINS", '["http://localhost:3000"]')
+os.environ.setdefault("STREAK_DECAY_SWEEP_ENABLED", "False")
+os.environ.setdefault("STREAK_REMINDER_ENABLED", "False")
+os.environ.setdefault("ANALYTICS_CACHE_ENABLED", "False")
 
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -0,0 +1,136 @@
+"""
+Admin Tests
+===========
+Tests for admin maintenance endpoints and bulk streak recompute.
+"""
+
+import random
+import pytest
+from fastapi import status
+from datetime import date, timedelta
+
+from app.models.user import User, UserType
+from app.models.habit import Habit, HabitFrequency, HabitCategory
+from app.models.log import Log
+from app.utils.security import hash_password, create_access_token
+from app.utils.streak_calculator import (
+    bulk_recompute_streaks,
+    calculate_current_streak,
+    calculate_longest_streak,
+)
+
+
+@pytest.fixture
+def admin_headers(db):
+    """Create an admin user and return auth headers."""
+    admin = User(
+        email="admin@example.com",
+        username="adminuser",
+        hashed_password=hash_password("adminpassword123"),
+        user_type=UserType.ADMIN,
+        is_active=True
+    )
+    db.add(admin)
+    db.commit()
+    db.refresh(admin)
+    token = create_access_token(data={"sub": str(admin.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_random_habits(db, user, count=12, days=120, seed=7):
+    """Create habits with random gaps in their completion history."""
+    rng = random.Random(seed)
+    today = date.today()
+    habits = []
+    for i in range(count):
+        frequency, target_days = rng.choice([
+            (HabitFrequency.DAILY, None),
+            (HabitFrequency.DAILY, None),
+            (HabitFrequency.WEEKLY, None),
+            (HabitFrequency.CUSTOM, "MO,WE,FR"),
+        ])
+        habit = Habit(
+            user_id=user.id,
+            title=f"Habit {i}",
+            frequency=frequency,
+            target_days=target_days,
+            category=HabitCategory.HEALTH,
+            current_streak=99,
+            longest_streak=99
+        )
+        db.add(habit)
+        db.flush()
+        density = rng.choice([0.0, 0.3, 0.7, 0.95])
+        for d in range(days):
+            if rng.random() < density:
+                db.add(Log(
+                    habit_id=habit.id,
+                    user_id=user.id,
+                    log_date=today - timedelta(days=d),
+                    completed=rng.random() > 0.1
+                ))
+        habits.append(habit)
+    db.commit()
+    return habits
+
+
+class TestBulkRecompute:
+    """Test set-based streak recompute."""
+    
+    def test_matches_streak_calculator(self, db, test_user):
+        """Test bulk results match the per-habit calculator."""
+        habits = make_random_habits(db, test_user)
+        
+        result = bulk_recompute_streaks(db)
+        assert result["habits_updated"] == len(habits)
+        
+        for habit in habits:
+            db.refresh(habit)
+            assert habit.current_streak == calculate_current_streak(habit.id, db)
+            assert habit.longest_streak == calculate_longest_streak(habit.id, db)
+    
+    def test_filter_by_habit_ids(self, db, test_user):
+        """Test only the requested habits are touched."""
+        habits = make_random_habits(db, test_user, count=3)
+        
+        result = bulk_recompute_streaks(db, habit_ids=[habits[0].id])
+        assert result["habits_updated"] == 1
+        
+        db.refresh(habits[1])
+        assert habits[1].current_streak == 99
+
+
+class TestAdminEndpoints:
+    """Test admin recompute endpoint."""
+    
+    def test_recompute_as_admin(self, client, admin_headers, test_habit_with_logs):
+        """Test admin can trigger a recompute."""
+        response = client.post("/api/admin/streaks/recompute", headers=admin_headers, json={})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["habits_updated"] == 1
+        assert "rows_per_second" in data
+    
+    def test_recompute_invalidates_analytics_cache(self, client, admin_headers, auth_headers, db, test_habit_with_logs):
+        """Test owners of recomputed habits don't keep seeing cached streaks."""
+        from app.utils.analytics_cache import analytics_cache
+        
+        test_habit_with_logs.current_streak = 99
+        db.commit()
+        analytics_cache.clear()
+        analytics_cache.enabled = True
+        try:
+            before = client.get("/api/analytics/streaks", headers=auth_headers).json()
+            client.post("/api/admin/streaks/recompute", headers=admin_headers, json={})
+            after = client.get("/api/analytics/streaks", headers=auth_headers).json()
+        finally:
+            analytics_cache.enabled = False
+            analytics_cache.clear()
+        
+        assert before["habits_with_streaks"][0]["current_streak"] == 99
+        assert after["habits_with_streaks"][0]["current_streak"] == 3
+    
+    def test_recompute_forbidden_for_regular_user(self, client, auth_headers):
+        """Test regular users cannot trigger a recompute."""
+        response = client.post("/api/admin/streaks/recompute", headers=auth_headers, json={})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
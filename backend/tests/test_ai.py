@@ -64,6 +64,26 @@ class TestPatterns:
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert "patterns" in data
+    
+    def test_patterns_use_time_of_day_aggregate(self, client, auth_headers, test_habit, monkeypatch):
+        """Test the AI gets per-habit aggregates rather than raw logs."""
+        from app.controllers import ai_controller
+        
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        
+        received = {}
+        async def fake_analyze(habit_stats, pairs=None):
+            received["habit_stats"] = habit_stats
+            return {"patterns": ["ok"]}
+        monkeypatch.setattr(ai_controller.gemini, "analyze_patterns", fake_analyze)
+        
+        response = client.get("/api/ai/patterns", headers=auth_headers)
+        assert response.json() == {"patterns": ["ok"]}
+        stats = received["habit_stats"]
+        assert len(stats) == 1
+        assert stats[0]["habit"] == test_habit.title
+        assert stats[0]["completions"] == 1
+        assert sum(stats[0]["share_by_part_of_day"].values()) == 1.0
 
 
 class TestHabitTips:
@@ -81,9 +81,9 @@ class TestHeatmap:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
     
     def test_get_heatmap_too_long_range(self, client, auth_headers):
-        """Test heatmap with range exceeding 365 days."""
+        """Test heatmap with range exceeding ten years."""
         today = date.today().isoformat()
-        long_ago = (date.today() - timedelta(days=400)).isoformat()
+        long_ago = (date.today() - timedelta(days=4000)).isoformat()
         
         response = client.get(
             "/api/analytics/heatmap",
@@ -91,6 +91,75 @@ class TestHeatmap:
             headers=auth_headers
         )
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_heatmap_compact(self, client, auth_headers, test_habit_with_logs):
+        """Test the compact form has one count per day from start_date."""
+        start = date.today() - timedelta(days=9)
+        response = client.get(
+            "/api/analytics/heatmap",
+            params={"start_date": start.isoformat(), "end_date": date.today().isoformat(), "format": "compact"},
+            headers=auth_headers
+        )
+        data = response.json()
+        assert data["start_date"] == start.isoformat()
+        assert data["counts"] == [0] * 7 + [1, 1, 1]
+    
+    def test_heatmap_multi_year(self, client, auth_headers, db, test_user, test_habit_with_logs):
+        """Test ranges spanning several years are stitched from yearly blocks."""
+        from app.models.log import Log
+        
+        old_day = date(date.today().year - 2, 12, 31)
+        db.add(Log(habit_id=test_habit_with_logs.id, user_id=test_user.id, log_date=old_day, completed=True))
+        db.commit()
+        
+        start = date(date.today().year - 3, 6, 1)
+        data = client.get(
+            "/api/analytics/heatmap",
+            params={"start_date": start.isoformat(), "end_date": date.today().isoformat(), "format": "compact"},
+            headers=auth_headers
+        ).json()
+        counts = data["counts"]
+        assert len(counts) == (date.today() - start).days + 1
+        assert counts[(old_day - start).days] == 1
+        assert sum(counts) == 4
+        
+        data = client.get(
+            "/api/analytics/heatmap",
+            params={"start_date": start.isoformat(), "end_date": date.today().isoformat()},
+            headers=auth_headers
+        ).json()
+        assert data["data"][old_day.isoformat()] == 1
+    
+    def test_heatmap_etag(self, client, auth_headers, db, test_habit_with_logs):
+        """Test unchanged heatmaps return 304 without reading logs, and writes change the ETag."""
+        from sqlalchemy import event
+        
+        params = {"start_date": (date.today() - timedelta(days=30)).isoformat(), "end_date": date.today().isoformat()}
+        first = client.get("/api/analytics/heatmap", params=params, headers=auth_headers)
+        etag = first.headers["ETag"]
+        
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            response = client.get("/api/analytics/heatmap", params=params, headers={**auth_headers, "If-None-Match": etag})
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", record)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not any("FROM logs" in statement for statement in statements)
+        assert not any("FROM user_daily_stats" in statement for statement in statements)
+        
+        client.post("/api/logs/", json={
+            "habit_id": test_habit_with_logs.id,
+            "log_date": (date.today() - timedelta(days=10)).isoformat(),
+            "completed": True
+        }, headers=auth_headers)
+        response = client.get("/api/analytics/heatmap", params=params, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        assert response.json()["data"][(date.today() - timedelta(days=10)).isoformat()] == 1
 
 
 class TestProgressChart:
@@ -125,6 +194,14 @@ class TestProgressChart:
         assert response.status_code == status.HTTP_200_OK
         assert response.json()["period"] == "year"
     
+    def test_get_progress_compact(self, client, auth_headers, test_habit_with_logs):
+        """Test compact progress counts end with today's completion."""
+        response = client.get("/api/analytics/progress?period=week&format=compact", headers=auth_headers)
+        data = response.json()
+        assert "ETag" in response.headers
+        assert len(data["counts"]) == 8
+        assert data["counts"][-3:] == [1, 1, 1]
+    
     def test_get_progress_invalid_period(self, client, auth_headers):
         """Test progress with invalid period."""
         response = client.get(
@@ -143,6 +220,95 @@ class TestCategories:
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert isinstance(data, dict)
+    
+    def test_category_stats(self, client, auth_headers, db, test_user, test_habit_with_logs):
+        """Test totals, due-adjusted rate and 30-day trend per category."""
+        from app.models.log import Log
+        
+        db.add(Log(
+            habit_id=test_habit_with_logs.id,
+            user_id=test_user.id,
+            log_date=date.today() - timedelta(days=40),
+            completed=True
+        ))
+        db.commit()
+        
+        data = client.get("/api/analytics/categories", headers=auth_headers).json()
+        learning = data["learning"]
+        assert learning["total_habits"] == 1
+        assert learning["total_completions"] == 4
+        assert learning["completion_rate"] == 4.0
+        # Created today, so only today was due
+        assert learning["due_completion_rate"] == 100.0
+        assert learning["trend_30d"] == {"current": 3, "previous": 1, "change": 2}
+        
+        week = client.get("/api/analytics/categories", params={"period": "week"}, headers=auth_headers).json()
+        assert week["learning"]["total_completions"] == 3
+        assert week["learning"]["trend_30d"]["previous"] == 1
+    
+    def test_category_due_rate_counts_units(self, client, auth_headers, db, test_user):
+        """Test several logs in one week of a weekly habit count as one done unit."""
+        from datetime import datetime
+        from app.models.habit import Habit, HabitFrequency, HabitCategory
+        from app.models.log import Log
+        
+        today = date.today()
+        created = today - timedelta(days=27)
+        habit = Habit(
+            user_id=test_user.id,
+            title="Long run",
+            frequency=HabitFrequency.WEEKLY,
+            category=HabitCategory.FITNESS,
+            is_active=True,
+            created_at=datetime.combine(created, datetime.min.time())
+        )
+        db.add(habit)
+        db.flush()
+        monday = today - timedelta(days=14 + (today - timedelta(days=14)).weekday())
+        for i in range(4):
+            db.add(Log(habit_id=habit.id, user_id=test_user.id, log_date=monday + timedelta(days=i), completed=True))
+        db.commit()
+        
+        weeks = len({(created + timedelta(days=i)).isocalendar()[:2] for i in range(28)})
+        fitness = client.get("/api/analytics/categories", headers=auth_headers).json()["fitness"]
+        assert fitness["total_completions"] == 4
+        assert fitness["due_completion_rate"] == round(100 / weeks, 1)
+    
+    def test_categories_invalid_period(self, client, auth_headers):
+        """Test an unknown period is rejected."""
+        response = client.get("/api/analytics/categories", params={"period": "decade"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_categories_single_query(self, client, auth_headers, db, test_habit, test_habit_with_logs):
+        """Test the breakdown is one grouped query regardless of habit count."""
+        from sqlalchemy import event
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            if "FROM users" not in statement:
+                statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", count)
+        try:
+            response = client.get("/api/analytics/categories", headers=auth_headers)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.json()) == {"fitness", "learning"}
+        assert len(statements) == 1
+    
+    def test_party_categories(self, client, auth_headers, auth_headers_user2, db, test_party, test_habit_with_logs):
+        """Test the party breakdown covers shared habits and requires membership."""
+        test_habit_with_logs.party_id = test_party.id
+        db.commit()
+        
+        response = client.get(f"/api/analytics/parties/{test_party.id}/categories", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["learning"]["total_completions"] == 3
+        
+        response = client.get(f"/api/analytics/parties/{test_party.id}/categories", headers=auth_headers_user2)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
 class TestTrends:
@@ -158,6 +324,244 @@ class TestTrends:
         assert "current" in data["weekly"]
         assert "previous" in data["weekly"]
         assert "change_percent" in data["weekly"]
+    
+    
+    @pytest.fixture
+    def slipping_habit(self, db, test_user):
+        """A habit done every day last week but only 3 days this week."""
+        from datetime import datetime
+        from app.models.habit import Habit, HabitFrequency, HabitCategory
+        from app.models.log import Log
+        
+        today = date.today()
+        habit = Habit(
+            user_id=test_user.id,
+            title="Meditate",
+            frequency=HabitFrequency.DAILY,
+            category=HabitCategory.HEALTH,
+            is_active=True,
+            created_at=datetime.combine(today - timedelta(days=20), datetime.min.time())
+        )
+        db.add(habit)
+        db.flush()
+        for i in list(range(3)) + list(range(7, 14)):
+            db.add(Log(habit_id=habit.id, user_id=test_user.id, log_date=today - timedelta(days=i), completed=True))
+        db.commit()
+        return habit
+    
+    def test_trend_deltas(self, client, auth_headers, slipping_habit):
+        """Test completions, rate, active days and movers are compared per period."""
+        data = client.get("/api/analytics/trends", headers=auth_headers).json()
+        assert data["period"] == "week"
+        assert data["completions"] == {"current": 3, "previous": 7, "change": -4, "change_percent": -57.1}
+        assert data["completion_rate"] == {"current": 42.9, "previous": 100.0, "change": -57.1}
+        assert data["active_days"] == {"current": 3, "previous": 7, "change": -4}
+        assert data["best_weekday"]["previous"]["completions"] == 1
+        assert data["movers"]["improving"] == []
+        assert data["movers"]["declining"][0]["habit_id"] == slipping_habit.id
+        assert "sparkline" not in data
+    
+    def test_legacy_weekly_window(self, client, auth_headers, slipping_habit):
+        """Test `weekly` keeps its 8-days-to-today against the 7 days before meaning."""
+        data = client.get("/api/analytics/trends", headers=auth_headers).json()
+        assert data["weekly"] == {"current": 4, "previous": 6, "change_percent": -33.3}
+    
+    def test_rate_counts_due_units(self, db, test_user):
+        """Test repeat logs in one week of a weekly habit count as one done unit."""
+        from datetime import datetime
+        from app.models.habit import Habit, HabitFrequency, HabitCategory
+        from app.models.log import Log
+        from app.utils.trends import compute_trends
+        
+        # Sunday; the month window covers the three weeks since the habit was created
+        today = date(2026, 10, 18)
+        habit = Habit(
+            user_id=test_user.id,
+            title="Long run",
+            frequency=HabitFrequency.WEEKLY,
+            category=HabitCategory.FITNESS,
+            is_active=True,
+            created_at=datetime(2026, 9, 28)
+        )
+        db.add(habit)
+        db.flush()
+        for day in (12, 13, 14):
+            db.add(Log(habit_id=habit.id, user_id=test_user.id, log_date=date(2026, 10, day), completed=True))
+        db.commit()
+        
+        trends = compute_trends(db, test_user, "month", today=today)
+        assert trends["completion_rate"]["current"] == 33.3
+    
+    def test_sparkline_downsampled(self, client, auth_headers, slipping_habit):
+        """Test sparklines are bucketed to at most the requested points."""
+        data = client.get(
+            "/api/analytics/trends",
+            params={"period": "week", "sparkline_points": 3},
+            headers=auth_headers
+        ).json()
+        sparkline = data["sparkline"]
+        assert sparkline["bucket_days"] == 3
+        assert sum(sparkline["current"]) == 3
+        assert sum(sparkline["previous"]) == 7
+        assert len(sparkline["current"]) == len(sparkline["previous"]) == 3
+        # Today is the last day of the last bucket
+        assert sparkline["current"][-1] == 1
+    
+    def test_payload_independent_of_history(self, client, auth_headers, db, test_user, slipping_habit):
+        """Test older history changes neither the payload nor the query count."""
+        from sqlalchemy import event
+        from app.models.log import Log
+        
+        before = client.get("/api/analytics/trends", headers=auth_headers).content
+        
+        for i in range(60, 400):
+            db.add(Log(habit_id=slipping_habit.id, user_id=test_user.id, log_date=date.today() - timedelta(days=i), completed=True))
+        db.commit()
+        # Rebuild the rollup from the new rows
+        test_user.daily_stats_built_at = None
+        db.commit()
+        client.get("/api/analytics/trends", headers=auth_headers)
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            if "FROM users" not in statement:
+                statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", count)
+        try:
+            after = client.get("/api/analytics/trends", headers=auth_headers).content
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+        
+        assert after == before
+        assert len(statements) == 3
+    
+    def test_invalid_period(self, client, auth_headers):
+        """Test an unknown period is rejected."""
+        response = client.get("/api/analytics/trends", params={"period": "decade"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestTimeOfDay:
+    """Test time-of-day histogram endpoint."""
+    
+    @pytest.fixture
+    def timed_logs(self, db, test_user, test_habit):
+        """Completions at known UTC times for a user in UTC+5."""
+        from datetime import datetime
+        from app.models.log import Log
+        
+        test_user.timezone = "Asia/Karachi"
+        for log_date, completion_time in [
+            # Monday 03:30 UTC -> Monday 08:30 local
+            (date(2024, 1, 1), datetime(2024, 1, 1, 3, 30)),
+            # Sunday 20:00 UTC -> Monday 01:00 local
+            (date(2024, 1, 8), datetime(2024, 1, 7, 20, 0)),
+            # Wednesday 03:10 UTC -> Wednesday 08:10 local
+            (date(2024, 1, 10), datetime(2024, 1, 10, 3, 10)),
+        ]:
+            db.add(Log(
+                habit_id=test_habit.id,
+                user_id=test_user.id,
+                log_date=log_date,
+                completed=True,
+                completion_time=completion_time
+            ))
+        # Not completed: ignored
+        db.add(Log(habit_id=test_habit.id, user_id=test_user.id, log_date=date(2024, 1, 2), completed=False))
+        db.commit()
+        return test_habit
+    
+    def test_histogram_in_local_time(self, client, auth_headers, timed_logs):
+        """Test completions are bucketed by the user's local hour and weekday."""
+        response = client.get("/api/analytics/time-of-day", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["timezone"] == "Asia/Karachi"
+        
+        overall = data["overall"]
+        assert overall["total"] == 3
+        assert overall["by_hour"][8] == 2
+        assert overall["by_hour"][1] == 1
+        assert overall["by_weekday"] == [2, 0, 1, 0, 0, 0, 0]
+        assert overall["peak_hour"] == 8
+        assert overall["peak_weekday"] == "Monday"
+        assert overall["weekday_hour"][0][1] == 1
+        
+        assert len(data["habits"]) == 1
+        assert data["habits"][0]["habit_id"] == timed_logs.id
+        assert data["habits"][0]["by_hour"] == overall["by_hour"]
+    
+    def test_histogram_filters(self, client, auth_headers, timed_logs, test_habit_with_logs):
+        """Test habit and date filters."""
+        data = client.get(
+            "/api/analytics/time-of-day",
+            params={"habit_id": timed_logs.id, "start_date": "2024-01-05"},
+            headers=auth_headers
+        ).json()
+        assert data["overall"]["total"] == 2
+        assert [habit["habit_id"] for habit in data["habits"]] == [timed_logs.id]
+    
+    def test_other_users_habit(self, client, auth_headers_user2, timed_logs):
+        """Test another user's habit is not found."""
+        response = client.get(
+            "/api/analytics/time-of-day",
+            params={"habit_id": timed_logs.id},
+            headers=auth_headers_user2
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestCorrelations:
+    """Test habit co-completion correlations."""
+    
+    def test_pairwise_stats_match_numpy(self):
+        """Test vectorized correlation matches np.corrcoef and lift is P(ab)/P(a)P(b)."""
+        import numpy as np
+        from app.utils.correlations import pairwise_stats
+        
+        rng = np.random.default_rng(1)
+        matrix = rng.random((4, 60)) < 0.5
+        stats = pairwise_stats(matrix)
+        assert np.allclose(stats["correlation"], np.corrcoef(matrix.astype(float)))
+        both = (matrix[0] & matrix[1]).mean()
+        assert np.isclose(stats["lift"][0, 1], both / (matrix[0].mean() * matrix[1].mean()))
+        
+        # Constant rows have no defined correlation
+        matrix[2] = True
+        assert pairwise_stats(matrix)["correlation"][2, 0] == 0.0
+    
+    def test_correlated_pair_ranked_first(self, client, auth_headers, db, test_user, test_habit, test_habit_with_logs):
+        """Test habits completed on the same days come out on top."""
+        from app.models.log import Log
+        
+        today = date.today()
+        # Same three days as test_habit_with_logs
+        for i in range(3):
+            db.add(Log(habit_id=test_habit.id, user_id=test_user.id, log_date=today - timedelta(days=i), completed=True))
+        db.commit()
+        
+        response = client.get(
+            "/api/analytics/correlations",
+            params={"days": 30, "include_matrix": True},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["days"] == 30
+        assert len(data["habits"]) == 2
+        pair = data["pairs"][0]
+        assert {pair["habit_a"], pair["habit_b"]} == {test_habit.id, test_habit_with_logs.id}
+        assert pair["correlation"] == 1.0
+        assert pair["lift"] == 10.0
+        assert pair["together_days"] == 3
+        assert data["correlation_matrix"][0][1] == 1.0
+    
+    def test_no_completions(self, client, auth_headers):
+        """Test a user without completions gets empty results."""
+        data = client.get("/api/analytics/correlations", headers=auth_headers).json()
+        assert data["habits"] == []
+        assert data["pairs"] == []
 
 
 class TestAchievements:
@@ -172,3 +576,126 @@ class TestAchievements:
         assert "earned_count" in data
         assert "achievements" in data
 
+
+
+class TestDailyStatsRollup:
+    """Test the user_daily_stats rollup behind the analytics endpoints."""
+    
+    def _rows(self, db, user):
+        from app.models.user_daily_stats import UserDailyStats
+        db.expire_all()
+        return {
+            row.date: (row.completed_count, row.logged_count, row.mood_sum, row.mood_count)
+            for row in db.query(UserDailyStats).filter(UserDailyStats.user_id == user.id)
+        }
+    
+    def test_backfilled_on_first_read(self, client, auth_headers, db, test_user, test_habit_with_logs):
+        """Test logs written before the rollup are picked up on first read."""
+        today = date.today()
+        response = client.get(
+            "/api/analytics/heatmap",
+            params={"start_date": (today - timedelta(days=10)).isoformat(), "end_date": today.isoformat()},
+            headers=auth_headers
+        )
+        data = response.json()["data"]
+        assert data == {(today - timedelta(days=i)).isoformat(): 1 for i in range(3)}
+        
+        db.refresh(test_user)
+        assert test_user.daily_stats_built_at is not None
+        assert self._rows(db, test_user)[today - timedelta(days=4)] == (0, 1, 0, 0)
+    
+    def test_log_writes_update_rollup(self, client, auth_headers, db, test_user, test_habit):
+        """Test create, update and delete keep the rollup equal to a full backfill."""
+        from app.utils.daily_stats import backfill_daily_stats
+        
+        client.get("/api/analytics/overview", headers=auth_headers)
+        day = (date.today() - timedelta(days=2)).isoformat()
+        
+        created = client.post("/api/logs/", json={
+            "habit_id": test_habit.id, "log_date": day, "completed": False, "mood": 4
+        }, headers=auth_headers).json()
+        client.put(f"/api/logs/{created['id']}", json={"completed": True, "mood": 2}, headers=auth_headers)
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        
+        incremental = self._rows(db, test_user)
+        assert incremental[date.fromisoformat(day)] == (1, 1, 2, 1)
+        assert incremental[date.today()] == (1, 1, 0, 0)
+        
+        backfill_daily_stats(db, [test_user.id])
+        assert self._rows(db, test_user) == incremental
+        
+        client.delete(f"/api/logs/{created['id']}", headers=auth_headers)
+        assert self._rows(db, test_user)[date.fromisoformat(day)] == (0, 0, 0, 0)
+    
+    def test_writes_bump_version(self, client, auth_headers, db, test_user, test_habit):
+        """Test every rollup write and backfill moves the user's data version on."""
+        from app.utils.daily_stats import backfill_daily_stats
+        from app.utils.heatmap_blocks import data_version
+        
+        versions = [data_version(db, test_user)]
+        created = client.post("/api/logs/", json={"habit_id": test_habit.id}, headers=auth_headers).json()
+        versions.append(data_version(db, test_user))
+        client.put(f"/api/logs/{created['id']}", json={"mood": 3}, headers=auth_headers)
+        versions.append(data_version(db, test_user))
+        client.post("/api/logs/batch", json={"logs": [{"habit_id": test_habit.id, "completed": False}]}, headers=auth_headers)
+        versions.append(data_version(db, test_user))
+        backfill_daily_stats(db, [test_user.id])
+        versions.append(data_version(db, test_user))
+        
+        assert len(set(versions)) == len(versions)
+    
+    def test_overview_and_trends_read_rollup(self, client, auth_headers, test_habit_with_logs):
+        overview = client.get("/api/analytics/overview", headers=auth_headers).json()
+        assert overview["total_completions"] == 3
+        assert overview["today_completion_rate"] == 1.0
+        
+        trends = client.get("/api/analytics/trends", headers=auth_headers).json()
+        assert trends["weekly"]["current"] == 3
+
+
+class TestOverviewQueries:
+    """Test the overview is served by aggregate queries."""
+    
+    def test_overview_query_count(self, client, auth_headers, db, test_habit, test_habit_with_logs):
+        """Test overview runs one habits aggregate and one rollup aggregate."""
+        from sqlalchemy import event
+        
+        # First read backfills the rollup
+        client.get("/api/analytics/overview", headers=auth_headers)
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            if "FROM users" not in statement:
+                statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", count)
+        try:
+            response = client.get("/api/analytics/overview", headers=auth_headers)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_habits"] == 2
+        assert data["total_active_habits"] == 2
+        assert data["total_completions"] == 3
+        assert data["current_active_streaks"] == 1
+        assert len(statements) == 2
+    
+    def test_overview_as_of(self, client, auth_headers, test_habit_with_logs):
+        """Test a historical snapshot only counts completions up to that day."""
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        response = client.get(
+            "/api/analytics/overview",
+            params={"as_of": yesterday},
+            headers=auth_headers
+        )
+        data = response.json()
+        assert data["as_of"] == yesterday
+        assert data["total_completions"] == 2
+        # The fixture habit was created today
+        assert data["total_habits"] == 0
+        
+        older = (date.today() - timedelta(days=30)).isoformat()
+        data = client.get("/api/analytics/overview", params={"as_of": older}, headers=auth_headers).json()
+        assert data["total_completions"] == 0
@@ -0,0 +1,147 @@
+"""
+Analytics Cache Tests
+=====================
+Tests for the per-user analytics result cache and its invalidation.
+"""
+
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import event
+
+from app.utils.analytics_cache import AnalyticsCache, MemoryBackend, SQLiteBackend, analytics_cache
+
+
+@pytest.fixture
+def cache_enabled():
+    """Turn the shared cache on for one test."""
+    analytics_cache.clear()
+    analytics_cache.enabled = True
+    yield analytics_cache
+    analytics_cache.enabled = False
+    analytics_cache.clear()
+
+
+def count_statements(db):
+    """Record statements other than the auth user lookup."""
+    statements = []
+    def record(conn, cursor, statement, *args):
+        if "FROM users" not in statement:
+            statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    return statements, lambda: event.remove(db.get_bind(), "before_cursor_execute", record)
+
+
+class TestBackends:
+    """Test the cache backends directly."""
+    
+    def test_memory_lru_eviction(self):
+        """Test the least recently read entry is evicted first."""
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        assert backend.get("a") == (True, 1)
+        backend.set("c", 3)
+        assert backend.get("b") == (False, None)
+        assert backend.get("a") == (True, 1)
+        assert len(backend) == 2
+    
+    def test_sqlite_shared_between_workers(self, tmp_path):
+        """Test two backends on one file share entries and generations."""
+        path = str(tmp_path / "cache.sqlite3")
+        first = SQLiteBackend(path)
+        second = SQLiteBackend(path)
+        
+        first.set("key", {"day": date(2024, 1, 1), "counts": [1, 2]})
+        assert second.get("key") == (True, {"day": date(2024, 1, 1), "counts": [1, 2]})
+        
+        first.bump(7)
+        first.bump(7)
+        assert second.generation(7) == 2
+        assert second.generation(8) == 0
+    
+    def test_sqlite_prune(self, tmp_path):
+        """Test the file store is pruned back to max_entries."""
+        backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=3, prune_every=5)
+        for i in range(5):
+            backend.set(f"key{i}", i)
+        assert len(backend) == 3
+        assert backend.get("key4") == (True, 4)
+        assert backend.get("key0") == (False, None)
+    
+    async def test_generation_bump_misses(self):
+        """Test invalidating a user makes the next lookup a miss."""
+        cache = AnalyticsCache(MemoryBackend())
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            return {"value": len(calls)}
+        
+        assert await cache.cached(1, "endpoint", {"a": 1}, compute) == {"value": 1}
+        assert await cache.cached(1, "endpoint", {"a": 1}, compute) == {"value": 1}
+        assert await cache.cached(2, "endpoint", {"a": 1}, compute) == {"value": 2}
+        cache.invalidate_user(1)
+        assert await cache.cached(1, "endpoint", {"a": 1}, compute) == {"value": 3}
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+        assert stats["invalidations"] == 1
+        assert stats["endpoints"]["endpoint"] == {"hits": 1, "misses": 3}
+
+
+class TestEndpointCaching:
+    """Test endpoints are served from the cache until the user writes."""
+    
+    def test_repeat_overview_runs_no_queries(self, client, auth_headers, db, cache_enabled, test_habit_with_logs):
+        """Test a repeated request is answered without touching the database."""
+        first = client.get("/api/analytics/overview", headers=auth_headers).json()
+        
+        statements, stop = count_statements(db)
+        try:
+            second = client.get("/api/analytics/overview", headers=auth_headers).json()
+        finally:
+            stop()
+        
+        assert second == first
+        assert statements == []
+        assert cache_enabled.stats()["endpoints"]["analytics.overview"] == {"hits": 1, "misses": 1}
+    
+    def test_params_are_part_of_key(self, client, auth_headers, cache_enabled, test_habit_with_logs):
+        """Test different params are cached separately."""
+        week = client.get("/api/analytics/trends", params={"period": "week"}, headers=auth_headers).json()
+        month = client.get("/api/analytics/trends", params={"period": "month"}, headers=auth_headers).json()
+        assert week["period"] == "week"
+        assert month["period"] == "month"
+    
+    def test_log_write_invalidates(self, client, auth_headers, cache_enabled, test_habit_with_logs):
+        """Test creating a log is reflected on the next read."""
+        before = client.get("/api/analytics/overview", headers=auth_headers).json()
+        
+        client.post("/api/logs/", json={
+            "habit_id": test_habit_with_logs.id,
+            "log_date": (date.today() - timedelta(days=5)).isoformat(),
+            "completed": True
+        }, headers=auth_headers)
+        
+        after = client.get("/api/analytics/overview", headers=auth_headers).json()
+        assert after["total_completions"] == before["total_completions"] + 1
+    
+    def test_habit_write_invalidates(self, client, auth_headers, cache_enabled, test_habit):
+        """Test completing a habit is reflected in cached summaries."""
+        today = date.today().isoformat()
+        before = client.get(f"/api/logs/daily/{today}", headers=auth_headers).json()
+        assert before["completed_habits"] == 0
+        
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        
+        after = client.get(f"/api/logs/daily/{today}", headers=auth_headers).json()
+        assert after["completed_habits"] == 1
+        assert len(after["logs"]) == 1
+    
+    def test_users_are_isolated(self, client, auth_headers, auth_headers_user2, cache_enabled, test_habit_with_logs):
+        """Test one user's cached result is never served to another."""
+        mine = client.get("/api/analytics/overview", headers=auth_headers).json()
+        theirs = client.get("/api/analytics/overview", headers=auth_headers_user2).json()
+        assert mine["total_habits"] == 1
+        assert theirs["total_habits"] == 0
@@ -0,0 +1,123 @@
+"""
+Completion Bitmap Tests
+=======================
+Tests for the per-habit completed-day bitmap.
+"""
+
+import base64
+import pytest
+from fastapi import status
+from datetime import date, timedelta
+
+from app.models.log import Log
+from app.utils import completion_bitmap
+from app.utils.completion_bitmap import set_completed, completed_on, completion_count, window
+
+
+class TestBitmapOperations:
+    """Test setting and reading bits."""
+    
+    def test_set_and_clear(self, db, test_habit):
+        day = date(2026, 3, 10)
+        set_completed(test_habit, day, True, db)
+        assert completed_on(test_habit, day, db)
+        assert not completed_on(test_habit, day + timedelta(days=1), db)
+        
+        set_completed(test_habit, day, False, db)
+        assert not completed_on(test_habit, day, db)
+    
+    def test_back_dating_shifts_start(self, db, test_habit):
+        day = date(2026, 3, 10)
+        set_completed(test_habit, day, True, db)
+        set_completed(test_habit, day - timedelta(days=20), True, db)
+        
+        assert test_habit.bitmap_start <= day - timedelta(days=20)
+        assert completed_on(test_habit, day, db)
+        assert completed_on(test_habit, day - timedelta(days=20), db)
+        assert completion_count(test_habit, day - timedelta(days=30), day) == 2
+    
+    def test_builds_from_existing_logs(self, db, test_habit_with_logs):
+        """Test unbuilt bitmaps fall back to logs, then build on first write."""
+        today = date.today()
+        assert not completion_bitmap.is_built(test_habit_with_logs)
+        assert completed_on(test_habit_with_logs, today, db)
+        
+        set_completed(test_habit_with_logs, today - timedelta(days=10), True, db)
+        assert completion_count(test_habit_with_logs, today - timedelta(days=10), today) == 4
+
+
+class TestBitmapEndpoint:
+    """Test the raw bitmap endpoint."""
+    
+    def test_get_bitmap(self, client, auth_headers, test_habit_with_logs):
+        today = date.today()
+        start = today - timedelta(days=7)
+        response = client.get(
+            f"/api/habits/{test_habit_with_logs.id}/bitmap",
+            params={"start_date": start.isoformat()},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["days"] == 8
+        bits = int.from_bytes(base64.b64decode(data["bitmap"]), "little")
+        # Fixture completes today and the two days before
+        assert bits == 0b11100000
+    
+    def test_get_bitmap_is_read_only(self, client, auth_headers, db, test_habit_with_logs):
+        """Test an unbuilt bitmap is answered from logs without building it."""
+        data = client.get(f"/api/habits/{test_habit_with_logs.id}/bitmap", headers=auth_headers).json()
+        assert data["start_date"] == (date.today() - timedelta(days=2)).isoformat()
+        assert base64.b64decode(data["bitmap"]) == bytes([0b111])
+        
+        db.refresh(test_habit_with_logs)
+        assert not completion_bitmap.is_built(test_habit_with_logs)
+    
+    def test_get_bitmap_too_long_range(self, client, auth_headers, test_habit):
+        response = client.get(
+            f"/api/habits/{test_habit.id}/bitmap",
+            params={"start_date": (date.today() - timedelta(days=4000)).isoformat()},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_get_bitmap_not_found(self, client, auth_headers):
+        response = client.get("/api/habits/99999/bitmap", headers=auth_headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_default_end_date_is_local_today(self, client, auth_headers, db, test_user, test_habit, monkeypatch):
+        """Test bitmap, strip and weekly data end on the owner's local date."""
+        from datetime import datetime, timezone
+        from app.utils import timezone_helper
+        from app.utils.streak_calculator import get_weekly_completion_data
+        
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                # 12:00 UTC on March 10 is 02:00 on March 11 in Kiritimati
+                return datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc).astimezone(tz)
+        monkeypatch.setattr(timezone_helper, "datetime", FrozenDatetime)
+        test_user.timezone = "Pacific/Kiritimati"
+        db.commit()
+        
+        bitmap = client.get(f"/api/habits/{test_habit.id}/bitmap", headers=auth_headers).json()
+        strip = client.get(f"/api/habits/{test_habit.id}/strip", headers=auth_headers).json()
+        assert bitmap["end_date"] == strip["end_date"] == "2026-03-11"
+        assert get_weekly_completion_data(test_habit.id, db)[-1]["date"] == date(2026, 3, 11)
+    
+    def test_bitmap_follows_log_writes(self, client, auth_headers, test_habit, db):
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        db.refresh(test_habit)
+        assert completed_on(test_habit, date.today(), db)
+        
+        response = client.get("/api/habits/", headers=auth_headers)
+        assert response.json()[0]["completed_today"] == True
+    
+    def test_raw_habit_responses_skip_bitmap(self, client, auth_headers, test_habit):
+        """Test endpoints that serialize Habit rows directly don't choke on bitmap bytes."""
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        
+        response = client.get("/api/analytics/streaks", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        habit = response.json()["habits_with_streaks"][0]
+        assert "completion_bitmap" not in habit
@@ -0,0 +1,96 @@
+"""
+Habit Schedule Tests
+====================
+Tests for schedule parsing and frequency-aware streak evaluation.
+"""
+
+import pytest
+from datetime import date, timedelta
+
+from app.models.habit import HabitFrequency
+from app.utils.habit_schedule import parse_schedule, evaluate_streaks, ALL_WEEKDAYS
+
+
+# A Wednesday
+TODAY = date(2026, 3, 11)
+
+
+def days_ago(*offsets):
+    return [TODAY - timedelta(days=n) for n in offsets]
+
+
+class TestParseSchedule:
+    """Test target_days parsing."""
+    
+    def test_daily_ignores_target_days(self):
+        schedule = parse_schedule(HabitFrequency.DAILY, "MO")
+        assert schedule.is_every_day
+    
+    def test_custom_weekdays(self):
+        schedule = parse_schedule("custom", "Mon, Wed, fri")
+        assert schedule.period == "day"
+        assert schedule.weekday_mask == 0b10101
+    
+    def test_custom_without_days_is_daily(self):
+        assert parse_schedule("custom", None).weekday_mask == ALL_WEEKDAYS
+    
+    def test_weekly_without_days_is_periodic(self):
+        assert parse_schedule(HabitFrequency.WEEKLY, "").period == "week"
+    
+    def test_monthly_days_of_month(self):
+        schedule = parse_schedule(HabitFrequency.MONTHLY, '["1", "15"]')
+        assert schedule.period == "day"
+        assert schedule.is_due_on(date(2026, 3, 15))
+        assert not schedule.is_due_on(date(2026, 3, 16))
+
+
+class TestEvaluateStreaks:
+    """Test streaks follow each schedule's due units."""
+    
+    def test_daily_matches_consecutive_days(self):
+        schedule = parse_schedule(HabitFrequency.DAILY, None)
+        current, longest, last = evaluate_streaks(schedule, days_ago(1, 2, 3, 5, 6, 7, 8), TODAY)
+        assert (current, longest, last) == (3, 4, TODAY - timedelta(days=1))
+    
+    def test_daily_broken_streak(self):
+        schedule = parse_schedule(HabitFrequency.DAILY, None)
+        assert evaluate_streaks(schedule, days_ago(2, 3), TODAY)[:2] == (0, 2)
+    
+    def test_weekly_counts_weeks(self):
+        schedule = parse_schedule(HabitFrequency.WEEKLY, None)
+        # One completion in each of the last three weeks, none yet this week
+        current, longest, _ = evaluate_streaks(schedule, days_ago(3, 10, 17), TODAY)
+        assert (current, longest) == (3, 3)
+    
+    def test_weekly_missed_week_breaks_streak(self):
+        schedule = parse_schedule(HabitFrequency.WEEKLY, None)
+        assert evaluate_streaks(schedule, days_ago(10, 17), TODAY)[0] == 0
+    
+    def test_custom_days_skip_unscheduled_days(self):
+        schedule = parse_schedule(HabitFrequency.CUSTOM, "MO,WE,FR")
+        # Today (Wed), Mon, last Fri, last Wed; the Tuesday completion is ignored
+        current, longest, _ = evaluate_streaks(schedule, days_ago(0, 1, 2, 5, 7), TODAY)
+        assert (current, longest) == (4, 4)
+    
+    def test_monthly_counts_months(self):
+        schedule = parse_schedule(HabitFrequency.MONTHLY, None)
+        dates = [date(2026, 1, 20), date(2026, 2, 3)]
+        assert evaluate_streaks(schedule, dates, TODAY)[:2] == (2, 2)
+
+
+class TestDueCounts:
+    """Test due-unit counting over ranges."""
+    
+    def test_count_due_custom(self):
+        schedule = parse_schedule(HabitFrequency.CUSTOM, "MO,WE,FR")
+        assert schedule.count_due(date(2026, 3, 2), date(2026, 3, 15)) == 6
+    
+    def test_count_due_weekly(self):
+        schedule = parse_schedule(HabitFrequency.WEEKLY, None)
+        assert schedule.count_due(date(2026, 3, 1), date(2026, 3, 31)) == 6
+    
+    def test_period_end(self):
+        assert parse_schedule(HabitFrequency.WEEKLY, None).period_end(TODAY) == date(2026, 3, 15)
+        assert parse_schedule(HabitFrequency.MONTHLY, None).period_end(date(2026, 2, 3)) == date(2026, 2, 28)
+        assert parse_schedule(HabitFrequency.MONTHLY, None).period_end(date(2026, 12, 31)) == date(2026, 12, 31)
+        assert parse_schedule(HabitFrequency.CUSTOM, "MO").period_end(TODAY) == TODAY
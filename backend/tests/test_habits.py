@@ -6,7 +6,7 @@ Tests for habit CRUD operations and statistics.
 
 import pytest
 from fastapi import status
-from datetime import date
+from datetime import date, timedelta
 
 
 class TestCreateHabit:
@@ -124,6 +124,29 @@ class TestUpdateHabit:
         })
         assert response.status_code == status.HTTP_200_OK
     
+    def test_frequency_change_recounts_streaks(self, client, auth_headers, db, test_user, test_habit):
+        """Test switching daily to weekly recounts stored streaks in weeks."""
+        from app.models.log import Log
+        from app.utils.streak_calculator import update_habit_streaks
+        today = date.today()
+        for offset in range(10):
+            db.add(Log(habit_id=test_habit.id, user_id=test_user.id,
+                       log_date=today - timedelta(days=offset), completed=True))
+        db.commit()
+        update_habit_streaks(test_habit.id, db)
+        assert test_habit.current_streak == 10
+        
+        response = client.put(f"/api/habits/{test_habit.id}", headers=auth_headers, json={
+            "frequency": "weekly"
+        })
+        assert response.status_code == status.HTTP_200_OK
+        # Ten consecutive days touch two or three ISO weeks
+        weeks = len({(today - timedelta(days=offset)).isocalendar()[:2] for offset in range(10)})
+        db.refresh(test_habit)
+        assert test_habit.current_streak == weeks
+        assert test_habit.longest_streak == weeks
+        assert response.json()["current_streak"] == weeks
+    
     def test_update_habit_not_found(self, client, auth_headers):
         """Test updating non-existent habit."""
         response = client.put("/api/habits/99999", headers=auth_headers, json={
@@ -180,6 +203,20 @@ class TestHabitCompletion:
         response = client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
         assert response.status_code == status.HTTP_200_OK
     
+    def test_complete_habit_extends_streak(self, client, auth_headers, test_habit):
+        """Test completing today after yesterday extends the streak."""
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        client.post("/api/logs/", headers=auth_headers, json={
+            "habit_id": test_habit.id,
+            "completed": True,
+            "log_date": yesterday
+        })
+        
+        response = client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["current_streak"] == 2
+        assert response.json()["longest_streak"] == 2
+    
     def test_complete_habit_not_found(self, client, auth_headers):
         """Test completing non-existent habit."""
         response = client.post("/api/habits/99999/complete", headers=auth_headers)
@@ -207,3 +244,60 @@ class TestHabitStats:
         response = client.get("/api/habits/99999/stats", headers=auth_headers)
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+
+
+class TestHabitStrip:
+    """Test N-day completion strips."""
+    
+    def test_get_habit_strip_bits(self, client, auth_headers, test_habit_with_logs):
+        """Test a single habit's strip as a bitstring, oldest day first."""
+        response = client.get(
+            f"/api/habits/{test_habit_with_logs.id}/strip",
+            params={"days": 7, "encoding": "bits"},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["days"] == 7
+        assert data["end_date"] == date.today().isoformat()
+        strip = data["habits"][0]
+        assert strip["completed"] == "0000111"
+        assert strip["scheduled"] == "1111111"
+    
+    def test_get_habit_strip_not_found(self, client, auth_headers_user2, test_habit):
+        response = client.get(f"/api/habits/{test_habit.id}/strip", headers=auth_headers_user2)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_get_habit_strip_invalid_days(self, client, auth_headers, test_habit):
+        response = client.get(
+            f"/api/habits/{test_habit.id}/strip",
+            params={"days": 0},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_multi_habit_strip_single_range_query(self, client, auth_headers, db, test_habit, test_habit_with_logs):
+        """Test many habits' strips cost one habits query plus one logs query."""
+        from sqlalchemy import event
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            if "FROM logs" in statement or "FROM habits" in statement:
+                statements.append(statement)
+        
+        db.expire_all()
+        event.listen(db.get_bind(), "before_cursor_execute", count)
+        try:
+            response = client.get(
+                "/api/habits/strip",
+                params={"days": 90, "encoding": "bits"},
+                headers=auth_headers
+            )
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+        
+        assert response.status_code == status.HTTP_200_OK
+        strips = {strip["habit_id"]: strip for strip in response.json()["habits"]}
+        assert strips[test_habit.id]["completed"] == "0" * 90
+        assert strips[test_habit_with_logs.id]["completed"].endswith("00111")
+        assert len(statements) == 2
@@ -0,0 +1,194 @@
+"""
+Job Tests
+=========
+Tests for scheduled background jobs.
+"""
+
+import pytest
+from datetime import date, datetime, timezone
+
+from app.utils import timezone_helper
+
+from app.models.user import User, UserType
+from app.models.habit import Habit, HabitFrequency, HabitCategory
+from app.models.log import Log
+from app.jobs.streak_decay import StreakDecaySweeper
+from app.jobs.streak_reminders import StreakReminderScheduler, ReminderOutbox
+from app.utils.streak_calculator import bulk_recompute_streaks, find_at_risk_habits
+
+
+def make_user(db, username, tz_name=None):
+    user = User(
+        email=f"{username}@example.com",
+        username=username,
+        hashed_password="not-a-real-hash",
+        user_type=UserType.REGULAR,
+        timezone=tz_name
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_habit(db, user, last_completed, streak=4, frequency=HabitFrequency.DAILY):
+    habit = Habit(
+        user_id=user.id,
+        title="Stretch",
+        frequency=frequency,
+        category=HabitCategory.HEALTH,
+        current_streak=streak,
+        longest_streak=streak,
+        last_completed_date=last_completed
+    )
+    db.add(habit)
+    db.commit()
+    return habit
+
+
+class TestStreakDecaySweeper:
+    """Test the per-timezone streak decay sweep."""
+    
+    # 02:00 UTC on March 10 is still March 9 in Los Angeles
+    NOW = datetime(2026, 3, 10, 2, 0)
+    
+    def test_resets_only_broken_streaks(self, db):
+        """Test streaks older than local yesterday are zeroed."""
+        user = make_user(db, "utcuser")
+        broken = make_habit(db, user, date(2026, 3, 8))
+        alive = make_habit(db, user, date(2026, 3, 9))
+        
+        swept = StreakDecaySweeper().run_due(db, now=self.NOW)
+        assert swept == {None: 1}
+        
+        db.refresh(broken)
+        db.refresh(alive)
+        assert broken.current_streak == 0
+        assert broken.longest_streak == 4
+        assert alive.current_streak == 4
+    
+    def test_uses_local_midnight_per_bucket(self, db):
+        """Test a bucket is not swept before its own midnight."""
+        utc_user = make_user(db, "utcuser", "UTC")
+        la_user = make_user(db, "lauser", "America/Los_Angeles")
+        utc_habit = make_habit(db, utc_user, date(2026, 3, 8))
+        la_habit = make_habit(db, la_user, date(2026, 3, 8))
+        
+        StreakDecaySweeper().run_due(db, now=self.NOW)
+        
+        db.refresh(utc_habit)
+        db.refresh(la_habit)
+        assert utc_habit.current_streak == 0
+        assert la_habit.current_streak == 4
+    
+    def test_sweeps_each_bucket_once_per_day(self, db):
+        """Test repeated runs on the same local day do no work."""
+        user = make_user(db, "utcuser", "UTC")
+        make_habit(db, user, date(2026, 3, 1))
+        sweeper = StreakDecaySweeper()
+        
+        assert sweeper.run_due(db, now=self.NOW) == {"UTC": 1}
+        assert sweeper.run_due(db, now=self.NOW) == {}
+    
+    def test_weekly_habits_use_their_schedule(self, db):
+        """Test weekly streaks survive until a whole week is missed."""
+        user = make_user(db, "utcuser")
+        last_week = make_habit(db, user, date(2026, 3, 4), frequency=HabitFrequency.WEEKLY)
+        two_weeks = make_habit(db, user, date(2026, 2, 25), frequency=HabitFrequency.WEEKLY)
+        
+        assert StreakDecaySweeper().run_due(db, now=self.NOW) == {None: 1}
+        db.refresh(last_week)
+        db.refresh(two_weeks)
+        assert last_week.current_streak == 4
+        assert two_weeks.current_streak == 0
+    
+    def test_agrees_with_write_path_on_local_today(self, client, auth_headers, db, test_user, monkeypatch):
+        """Test logging, streak evaluation and the sweep all use the user's local date."""
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                # 12:00 UTC on March 10 is 02:00 on March 11 in Kiritimati
+                return datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc).astimezone(tz)
+        monkeypatch.setattr(timezone_helper, "datetime", FrozenDatetime)
+        test_user.timezone = "Pacific/Kiritimati"
+        habit = make_habit(db, test_user, date(2026, 3, 10), streak=2)
+        for day in (date(2026, 3, 9), date(2026, 3, 10)):
+            db.add(Log(habit_id=habit.id, user_id=test_user.id, log_date=day, completed=True))
+        db.commit()
+        
+        response = client.post("/api/logs/", headers=auth_headers, json={"habit_id": habit.id})
+        assert response.json()["log_date"] == "2026-03-11"
+        db.refresh(habit)
+        assert habit.current_streak == 3
+        
+        StreakDecaySweeper().run_due(db, now=datetime(2026, 3, 10, 12, 0))
+        bulk_recompute_streaks(db, user_id=test_user.id)
+        db.refresh(habit)
+        assert habit.current_streak == 3
+        assert habit.last_completed_date == date(2026, 3, 11)
+    
+    def test_skips_habits_without_tracked_state(self, db):
+        """Test habits without last_completed_date are left alone."""
+        user = make_user(db, "utcuser")
+        habit = make_habit(db, user, None)
+        
+        StreakDecaySweeper().run_due(db, now=self.NOW)
+        db.refresh(habit)
+        assert habit.current_streak == 4
+
+
+class TestStreakReminderScheduler:
+    """Test at-risk detection and per-timezone reminder fan-out."""
+    
+    # 04:30 UTC on March 10 is 20:30 on March 9 in Los Angeles
+    NOW = datetime(2026, 3, 10, 4, 30)
+    
+    def test_queues_only_buckets_near_midnight(self, db):
+        """Test reminders go out in the last hours of the local day."""
+        utc_user = make_user(db, "utcuser", "UTC")
+        la_user = make_user(db, "lauser", "America/Los_Angeles")
+        make_habit(db, utc_user, date(2026, 3, 9))
+        la_habit = make_habit(db, la_user, date(2026, 3, 8))
+        outbox = ReminderOutbox()
+        
+        queued = StreakReminderScheduler(outbox, hours_before_midnight=4).run_due(db, now=self.NOW)
+        
+        assert queued == {"America/Los_Angeles": 1}
+        reminders = outbox.drain()
+        assert [r.habit_id for r in reminders] == [la_habit.id]
+        assert reminders[0].local_date == date(2026, 3, 9)
+        assert len(outbox) == 0
+    
+    def test_queues_each_bucket_once_per_day(self, db):
+        user = make_user(db, "lauser", "America/Los_Angeles")
+        make_habit(db, user, date(2026, 3, 8))
+        scheduler = StreakReminderScheduler(ReminderOutbox(), hours_before_midnight=4)
+        
+        assert scheduler.run_due(db, now=self.NOW) == {"America/Los_Angeles": 1}
+        assert scheduler.run_due(db, now=self.NOW) == {}
+    
+    def test_find_at_risk_habits(self, db):
+        """Test one query covers completed, weekly and legacy habits."""
+        user = make_user(db, "utcuser")
+        today = date(2026, 3, 11)  # Wednesday
+        done_today = make_habit(db, user, today)
+        missed = make_habit(db, user, date(2026, 3, 10))
+        weekly_done = make_habit(db, user, date(2026, 3, 9), frequency=HabitFrequency.WEEKLY)
+        weekly_open = make_habit(db, user, date(2026, 3, 6), frequency=HabitFrequency.WEEKLY)
+        no_streak = make_habit(db, user, date(2026, 3, 10), streak=0)
+        legacy = make_habit(db, user, None)
+        db.add(Log(habit_id=legacy.id, user_id=user.id, log_date=today, completed=True))
+        db.commit()
+        
+        at_risk = {row.id for row in find_at_risk_habits(db, today)}
+        # The weekly habit still has the rest of the week
+        assert at_risk == {missed.id}
+    
+    def test_weekly_habit_at_risk_on_last_day_of_week(self, db):
+        """Test an open week is only at risk on its Sunday."""
+        user = make_user(db, "utcuser")
+        weekly = make_habit(db, user, date(2026, 3, 6), frequency=HabitFrequency.WEEKLY)
+        monthly = make_habit(db, user, date(2026, 2, 20), frequency=HabitFrequency.MONTHLY)
+        
+        assert find_at_risk_habits(db, date(2026, 3, 9)) == []  # Monday
+        assert [row.id for row in find_at_risk_habits(db, date(2026, 3, 15))] == [weekly.id]
+        assert [row.id for row in find_at_risk_habits(db, date(2026, 3, 31))] == [monthly.id]
@@ -6,7 +6,9 @@ Tests for habit completion logging endpoints.
 
 import pytest
 from fastapi import status
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+
+from app.models.habit import HabitFrequency
 
 
 class TestCreateLog:
@@ -56,6 +58,16 @@ class TestCreateLog:
         assert response.status_code == status.HTTP_201_CREATED
         assert response.json()["log_date"] == yesterday
     
+    def test_create_log_date_out_of_range(self, client, auth_headers, test_habit):
+        """Test dates far from today are rejected before they widen the bitmap."""
+        for log_date in ("0001-01-01", "9999-12-31", (date.today() + timedelta(days=2)).isoformat()):
+            response = client.post("/api/logs/", headers=auth_headers, json={
+                "habit_id": test_habit.id,
+                "completed": True,
+                "log_date": log_date
+            })
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
     def test_create_log_duplicate_date(self, client, auth_headers, test_habit):
         """Test creating duplicate log for same date fails."""
         # First log
@@ -90,6 +102,70 @@ class TestCreateLog:
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+class TestLogStreaks:
+    """Test streak maintenance on the log write path."""
+    
+    def _log(self, client, auth_headers, habit_id, days_ago):
+        return client.post("/api/logs/", headers=auth_headers, json={
+            "habit_id": habit_id,
+            "completed": True,
+            "log_date": (date.today() - timedelta(days=days_ago)).isoformat()
+        })
+    
+    def test_consecutive_logs_increment_streak(self, client, auth_headers, test_habit, db):
+        """Test in-order completions extend the streak."""
+        for days_ago in (2, 1, 0):
+            self._log(client, auth_headers, test_habit.id, days_ago)
+        
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 3
+        assert test_habit.longest_streak == 3
+        assert test_habit.last_completed_date == date.today()
+    
+    def test_back_dated_log_fills_gap(self, client, auth_headers, test_habit, db):
+        """Test a back-dated completion that bridges a gap is recomputed."""
+        for days_ago in (3, 1, 0):
+            self._log(client, auth_headers, test_habit.id, days_ago)
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 2
+        
+        self._log(client, auth_headers, test_habit.id, 2)
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 4
+        assert test_habit.longest_streak == 4
+    
+    def test_delete_log_breaks_streak(self, client, auth_headers, test_habit, db):
+        """Test deleting a completed day recomputes the current streak."""
+        for days_ago in (2, 1):
+            self._log(client, auth_headers, test_habit.id, days_ago)
+        log_id = self._log(client, auth_headers, test_habit.id, 0).json()["id"]
+        
+        response = client.delete(f"/api/logs/{log_id}", headers=auth_headers)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 2
+        assert test_habit.last_completed_date == date.today() - timedelta(days=1)
+    
+    def test_uncomplete_log_breaks_streak(self, client, auth_headers, test_habit, db):
+        """Test un-completing a day recomputes the current streak."""
+        self._log(client, auth_headers, test_habit.id, 2)
+        log_id = self._log(client, auth_headers, test_habit.id, 1).json()["id"]
+        
+        client.put(f"/api/logs/{log_id}", headers=auth_headers, json={"completed": False})
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 0
+    
+    def test_weekly_habit_counts_weeks(self, client, auth_headers, test_habit, db):
+        """Test a weekly habit's streak counts consecutive weeks."""
+        test_habit.frequency = HabitFrequency.WEEKLY
+        db.commit()
+        
+        self._log(client, auth_headers, test_habit.id, 7)
+        self._log(client, auth_headers, test_habit.id, 0)
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 2
+
+
 class TestGetLogs:
     """Test log retrieval endpoints."""
     
@@ -115,6 +191,70 @@ class TestGetLogs:
         )
         assert response.status_code == status.HTTP_200_OK
     
+    def test_habit_logs_keyset_pages(self, client, auth_headers, db, test_user, test_habit):
+        """Test pages follow X-Next-Cursor newest first with no gaps or repeats."""
+        from sqlalchemy import insert
+        from app.models.log import Log
+        
+        start = date.today() - timedelta(days=249)
+        db.execute(insert(Log), [
+            {"habit_id": test_habit.id, "user_id": test_user.id, "log_date": start + timedelta(days=i), "completed": True}
+            for i in range(250)
+        ])
+        db.commit()
+        
+        dates, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+            response = client.get(f"/api/logs/habit/{test_habit.id}", params=params, headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            dates += [log["log_date"] for log in response.json()]
+            pages += 1
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        
+        assert pages == 3
+        assert len(dates) == 250
+        assert dates == sorted(dates, reverse=True)
+        assert len(set(dates)) == 250
+    
+    def test_habit_logs_default_limit(self, client, auth_headers, test_habit_with_logs):
+        """Test a short history fits one page with no cursor."""
+        response = client.get(f"/api/logs/habit/{test_habit_with_logs.id}", headers=auth_headers)
+        assert len(response.json()) == 5
+        assert "x-next-cursor" not in response.headers
+    
+    def test_habit_logs_fields_projection(self, client, auth_headers, db, test_habit_with_logs):
+        """Test fields= selects only the requested columns (plus the cursor key)."""
+        from sqlalchemy import event
+        
+        statements = []
+        def record(conn, cursor, statement, *args):
+            if "FROM logs" in statement:
+                statements.append(statement)
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            response = client.get(
+                f"/api/logs/habit/{test_habit_with_logs.id}",
+                params={"fields": "completed", "limit": 2},
+                headers=auth_headers
+            )
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", record)
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data[0] == {"id": data[0]["id"], "log_date": date.today().isoformat(), "completed": True}
+        assert response.headers["x-next-cursor"]
+        assert "notes" not in statements[0] and "mood" not in statements[0]
+    
+    def test_habit_logs_bad_params(self, client, auth_headers, test_habit_with_logs):
+        """Test unknown fields and garbled cursors are rejected."""
+        url = f"/api/logs/habit/{test_habit_with_logs.id}"
+        assert client.get(url, params={"fields": "password"}, headers=auth_headers).status_code == 400
+        assert client.get(url, params={"cursor": "not-a-cursor"}, headers=auth_headers).status_code == 400
+    
     def test_get_single_log(self, client, auth_headers, test_habit, db):
         """Test getting a single log."""
         from app.models.log import Log
@@ -178,6 +318,23 @@ class TestUpdateLog:
         assert response.status_code == status.HTTP_200_OK
         assert response.json()["notes"] == "Updated notes"
 
+    def test_update_rereads_log_under_habit_lock(self, client, auth_headers, test_habit, db):
+        """Test the completed state is read after locking, not from a stale copy."""
+        from sqlalchemy import update
+        from app.models.log import Log
+        
+        log = Log(habit_id=test_habit.id, user_id=test_habit.user_id, log_date=date.today(), completed=True)
+        db.add(log)
+        db.commit()
+        db.refresh(log)
+        # Another request un-completes the log after this session loaded it
+        db.connection().execute(update(Log.__table__).where(Log.__table__.c.id == log.id).values(completed=False))
+        
+        response = client.put(f"/api/logs/{log.id}", headers=auth_headers, json={"completed": True})
+        assert response.status_code == status.HTTP_200_OK
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 1
+
 
 class TestDeleteLog:
     """Test log deletion endpoint."""
@@ -241,4 +398,790 @@ class TestWeeklySummary:
             headers=auth_headers
         )
         assert response.status_code == status.HTTP_200_OK
+    
+    def test_weekly_summary_single_logs_query(self, client, auth_headers, db, test_habit_with_logs):
+        """Test the whole week's logs are read with one query and grouped by day."""
+        from sqlalchemy import event
+        
+        statements = []
+        def record(conn, cursor, statement, *args):
+            if "FROM logs" in statement:
+                statements.append(statement)
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            week_start = date.today() - timedelta(days=6)
+            data = client.get("/api/logs/weekly", params={"week_start": week_start.isoformat()},
+                              headers=auth_headers).json()
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", record)
+        
+        assert len(statements) == 1
+        assert [len(day["logs"]) for day in data["daily_summaries"]] == [0, 0, 1, 1, 1, 1, 1]
+        assert [day["completed_habits"] for day in data["daily_summaries"]] == [0, 0, 0, 0, 1, 1, 1]
+        assert data["total_completions"] == 3
+        assert data["best_day"] == data["daily_summaries"][4]["date"]
+        assert data["daily_summaries"][6]["logs"][0]["notes"] == "Day 0 notes"
+    
+    def test_weekly_summary_without_logs(self, client, auth_headers, test_habit_with_logs):
+        """Test include_logs=false returns the same counts with no embedded logs."""
+        week_start = (date.today() - timedelta(days=6)).isoformat()
+        with_logs = client.get("/api/logs/weekly", params={"week_start": week_start}, headers=auth_headers).json()
+        without = client.get("/api/logs/weekly", params={"week_start": week_start, "include_logs": False},
+                             headers=auth_headers).json()
+        assert "logs" not in without["daily_summaries"][0]
+        assert without["total_completions"] == with_logs["total_completions"] == 3
+        assert without["weekly_completion_rate"] == with_logs["weekly_completion_rate"]
+
+
+class TestRangeSummary:
+    """Test custom-range summaries."""
+    
+    def test_range_summary(self, client, auth_headers, test_habit_with_logs):
+        """Test a 30-day range with totals and rate."""
+        today = date.today()
+        response = client.get("/api/logs/summary", params={
+            "start_date": (today - timedelta(days=29)).isoformat(),
+            "end_date": today.isoformat()
+        }, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["days"] == 30
+        assert len(data["daily_summaries"]) == 30
+        assert data["total_completions"] == 3
+        assert data["completion_rate"] == 10.0
+        assert "logs" not in data["daily_summaries"][-1]
+    
+    def test_range_summary_with_logs(self, client, auth_headers, test_habit_with_logs):
+        """Test include_logs embeds each day's logs."""
+        today = date.today()
+        data = client.get("/api/logs/summary", params={
+            "start_date": (today - timedelta(days=1)).isoformat(),
+            "end_date": today.isoformat(),
+            "include_logs": True
+        }, headers=auth_headers).json()
+        assert [len(day["logs"]) for day in data["daily_summaries"]] == [1, 1]
+    
+    def test_range_summary_invalid(self, client, auth_headers):
+        """Test reversed and over-long ranges are rejected."""
+        today = date.today()
+        reversed_range = client.get("/api/logs/summary", params={
+            "start_date": today.isoformat(), "end_date": (today - timedelta(days=1)).isoformat()
+        }, headers=auth_headers)
+        assert reversed_range.status_code == status.HTTP_400_BAD_REQUEST
+        too_long = client.get("/api/logs/summary", params={
+            "start_date": (today - timedelta(days=400)).isoformat(), "end_date": today.isoformat()
+        }, headers=auth_headers)
+        assert too_long.status_code == status.HTTP_400_BAD_REQUEST
+
+
+
+class TestMonthlySummary:
+    """Test monthly summaries."""
+    
+    def test_monthly_per_day_and_habit(self, client, auth_headers, db, test_user, test_habit_with_logs, test_habit):
+        """Test per-day and per-habit counts for one month from one GROUP BY."""
+        from sqlalchemy import event
+        from app.models.log import Log
+        
+        first = date(2024, 2, 1)
+        db.add_all([
+            Log(habit_id=test_habit.id, user_id=test_user.id, log_date=first, completed=True),
+            Log(habit_id=test_habit.id, user_id=test_user.id, log_date=date(2024, 2, 29), completed=True),
+            Log(habit_id=test_habit_with_logs.id, user_id=test_user.id, log_date=first, completed=True),
+            Log(habit_id=test_habit_with_logs.id, user_id=test_user.id, log_date=date(2024, 2, 2), completed=False),
+        ])
+        db.commit()
+        
+        statements = []
+        def record(conn, cursor, statement, *args):
+            if "FROM users" not in statement:
+                statements.append(statement)
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            response = client.get("/api/logs/monthly", params={"year": 2024, "month": 2}, headers=auth_headers)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", record)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(statements) == 1
+        month = response.json()["months"][0]
+        assert (month["year"], month["month"], month["days_in_month"]) == (2024, 2, 29)
+        assert len(month["daily"]) == 29
+        assert month["daily"][0] == {"date": "2024-02-01", "completed": 2}
+        assert month["daily"][1]["completed"] == 0
+        assert month["daily"][28]["completed"] == 1
+        assert month["total_completions"] == 3
+        assert month["total_possible"] == 2 * 29
+        assert [(h["habit_id"], h["completions"]) for h in month["habits"]] == [
+            (test_habit.id, 2), (test_habit_with_logs.id, 1)
+        ]
+    
+    def test_several_months(self, client, auth_headers, test_habit_with_logs):
+        """Test months=N returns N months ending at the requested one, oldest first."""
+        today = date.today()
+        response = client.get("/api/logs/monthly", params={"months": 3}, headers=auth_headers)
+        months = response.json()["months"]
+        assert len(months) == 3
+        assert (months[-1]["year"], months[-1]["month"]) == (today.year, today.month)
+        assert sum(m["total_completions"] for m in months) == 3
+        
+        january = client.get("/api/logs/monthly", params={"year": 2025, "month": 1, "months": 2},
+                             headers=auth_headers).json()["months"]
+        assert [(m["year"], m["month"]) for m in january] == [(2024, 12), (2025, 1)]
+    
+    def test_months_limit(self, client, auth_headers):
+        """Test months is capped."""
+        response = client.get("/api/logs/monthly", params={"months": 13}, headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestExportLogs:
+    """Test streaming log export."""
+    
+    def test_export_csv(self, client, auth_headers, test_habit_with_logs):
+        """Test CSV export has a header and one row per log, oldest first."""
+        import csv
+        import io
+        
+        response = client.get("/api/logs/export", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="habit-logs.csv"' in response.headers["content-disposition"]
+        
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 5
+        assert rows[0]["log_date"] == (date.today() - timedelta(days=4)).isoformat()
+        assert rows[-1]["completed"] == "True"
+        assert "habit_title" not in rows[0]
+    
+    def test_export_ndjson_with_titles(self, client, auth_headers, test_habit_with_logs):
+        """Test NDJSON export with habit titles and a date filter."""
+        import json
+        
+        response = client.get(
+            "/api/logs/export",
+            params={"format": "ndjson", "include_habit": True, "start_date": (date.today() - timedelta(days=1)).isoformat()},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 2
+        assert rows[0]["habit_title"] == test_habit_with_logs.title
+        assert rows[1]["log_date"] == date.today().isoformat()
+    
+    def test_export_gzip(self, client, auth_headers, test_habit_with_logs):
+        """Test the gzip option produces a valid .gz file."""
+        import gzip
+        
+        response = client.get("/api/logs/export", params={"compress": True}, headers=auth_headers)
+        assert response.headers["content-type"] == "application/gzip"
+        assert 'filename="habit-logs.csv.gz"' in response.headers["content-disposition"]
+        text = gzip.decompress(response.content).decode()
+        assert len(text.strip().splitlines()) == 6
+    
+    def test_export_only_own_logs(self, client, auth_headers_user2, test_habit_with_logs):
+        """Test another user's export is empty."""
+        response = client.get("/api/logs/export", params={"format": "ndjson"}, headers=auth_headers_user2)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text == ""
+    
+    def test_export_streams_in_batches(self, db, test_user, test_habit):
+        """Test rows are written out in BATCH_SIZE chunks rather than all at once."""
+        from sqlalchemy import insert
+        from app.models.log import Log
+        from app.utils import log_export
+        
+        start = date.today() - timedelta(days=2499)
+        db.execute(insert(Log), [
+            {"habit_id": test_habit.id, "user_id": test_user.id, "log_date": start + timedelta(days=i), "completed": True}
+            for i in range(2500)
+        ])
+        db.commit()
+        
+        rows = log_export.export_rows(db, test_user.id)
+        chunks = list(log_export.iter_csv(rows, log_export.field_names()))
+        assert len(chunks) == 3
+        assert sum(chunk.count(b"\n") for chunk in chunks) == 2501
+
+
+class TestImportLogs:
+    """Test CSV log import."""
+    
+    def upload(self, client, auth_headers, text, **params):
+        return client.post(
+            "/api/logs/import",
+            params=params,
+            files={"file": ("history.csv", text.encode(), "text/csv")},
+            headers=auth_headers
+        )
+    
+    def test_import_creates_habits_and_streaks(self, client, auth_headers, db, test_user):
+        """Test unknown habits are created and streaks computed once at the end."""
+        from app.models.habit import Habit
+        
+        today = date.today()
+        lines = ["date,habit,completed,notes,mood"]
+        lines += [f"{today - timedelta(days=i)},Meditate,yes,,4" for i in range(4)]
+        lines += [f"{today - timedelta(days=10)},Journal,,first entry,"]
+        response = self.upload(client, auth_headers, "\n".join(lines))
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["rows_read"] == 5
+        assert data["logs_written"] == 5
+        assert sorted(data["habits_created"]) == ["Journal", "Meditate"]
+        assert data["error_count"] == 0
+        
+        meditate = db.query(Habit).filter(Habit.user_id == test_user.id, Habit.title == "Meditate").one()
+        db.refresh(meditate)
+        assert meditate.current_streak == 4
+        assert meditate.longest_streak == 4
+        assert meditate.logs[0].mood == 4
+    
+    def test_import_matches_existing_habit_and_upserts(self, client, auth_headers, db, test_habit_with_logs):
+        """Test titles match case-insensitively and existing logs are overwritten."""
+        from app.models.log import Log
+        
+        yesterday = date.today() - timedelta(days=1)
+        text = f"Date,Habit,Completed\n{yesterday},daily reading,false\n{yesterday},DAILY READING,no\n"
+        data = self.upload(client, auth_headers, text).json()
+        assert data["habits_created"] == []
+        assert data["logs_written"] == 1
+        
+        log = db.query(Log).filter(Log.habit_id == test_habit_with_logs.id, Log.log_date == yesterday).one()
+        db.refresh(log)
+        assert log.completed == False
+        assert log.notes == "Day 1 notes"
+        assert db.query(Log).filter(Log.habit_id == test_habit_with_logs.id).count() == 5
+        db.refresh(test_habit_with_logs)
+        assert test_habit_with_logs.current_streak == 1
+    
+    def test_import_skip_existing(self, client, auth_headers, db, test_habit_with_logs):
+        """Test on_conflict=skip keeps existing logs."""
+        from app.models.log import Log
+        
+        today = date.today()
+        text = f"date,habit,completed\n{today},Daily Reading,false\n{today - timedelta(days=30)},Daily Reading,true\n"
+        data = self.upload(client, auth_headers, text, on_conflict="skip").json()
+        assert data["logs_written"] == 1
+        
+        log = db.query(Log).filter(Log.habit_id == test_habit_with_logs.id, Log.log_date == today).one()
+        db.refresh(log)
+        assert log.completed == True
+    
+    def test_import_reports_bad_rows(self, client, auth_headers):
+        """Test unparseable rows are skipped with their line numbers."""
+        text = "date,habit,completed,mood\n2024-01-01,Run,true,3\nnot-a-date,Run,true,\n2024-01-02,,true,\n2024-01-03,Run,maybe,\n2024-01-04,Run,true,9\n"
+        data = self.upload(client, auth_headers, text).json()
+        assert data["logs_written"] == 1
+        assert [error["line"] for error in data["errors"]] == [3, 4, 5, 6]
+        assert "mood" in data["errors"][-1]["error"]
+    
+    def test_import_rejects_far_dates(self, client, auth_headers):
+        """Test rows dated far outside the accepted range are reported, not written."""
+        text = "date,habit\n0001-01-01,Run\n9999-12-31,Run\n%s,Run\n" % date.today().isoformat()
+        data = self.upload(client, auth_headers, text).json()
+        assert data["logs_written"] == 1
+        assert [error["line"] for error in data["errors"]] == [2, 3]
+    
+    def test_import_requires_columns(self, client, auth_headers):
+        """Test a file without date/habit columns is rejected."""
+        response = self.upload(client, auth_headers, "day,name\n2024-01-01,Run\n")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_import_is_per_user(self, client, auth_headers_user2, db, test_user, test_habit_with_logs):
+        """Test another user's import never touches the first user's habit of the same name."""
+        from app.models.log import Log
+        
+        text = f"date,habit\n{date.today() - timedelta(days=100)},Daily Reading\n"
+        data = self.upload(client, auth_headers_user2, text).json()
+        assert data["habits_created"] == ["Daily Reading"]
+        assert db.query(Log).filter(Log.habit_id == test_habit_with_logs.id).count() == 5
+    
+    def test_import_batches(self, db, test_user):
+        """Test rows are written in batch_size statements with derived data rebuilt once."""
+        import io
+        from sqlalchemy import event
+        from app.utils import log_import
+        
+        start = date.today() - timedelta(days=249)
+        text = "date,habit\n" + "".join(f"{start + timedelta(days=i)},Walk\n" for i in range(250))
+        inserts = []
+        def record(conn, cursor, statement, *args):
+            if statement.startswith("INSERT INTO logs"):
+                inserts.append(statement)
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            errors = []
+            result = log_import.import_logs(db, test_user, log_import.parse_csv(io.StringIO(text), errors),
+                                            batch_size=100, errors=errors)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", record)
+        
+        assert result["logs_written"] == 250
+        assert len(inserts) == 3
+    
+    def test_import_backdates_new_habits(self, db, test_user, test_habit_with_logs):
+        """Test created habits start at their earliest imported day, even from a later batch."""
+        import io
+        from app.models.habit import Habit
+        from app.utils import log_import
+        
+        today = date.today()
+        existing_created = test_habit_with_logs.created_at
+        text = (f"date,habit\n{today},Walk\n{today - timedelta(days=3)},Walk\n"
+                f"{today - timedelta(days=400)},walk\n{today - timedelta(days=400)},Daily Reading\n")
+        errors = []
+        log_import.import_logs(db, test_user, log_import.parse_csv(io.StringIO(text), errors),
+                               batch_size=2, errors=errors)
+        
+        walk = db.query(Habit).filter(Habit.user_id == test_user.id, Habit.title == "Walk").one()
+        db.refresh(walk)
+        assert walk.created_at.date() == today - timedelta(days=400)
+        db.refresh(test_habit_with_logs)
+        assert test_habit_with_logs.created_at == existing_created
+
+
+class TestBatchLogs:
+    """Test batch log submission."""
+    
+    def test_batch_creates_and_updates(self, client, auth_headers, db, test_habit_with_logs):
+        """Test new days are created, existing days updated, streak recomputed once."""
+        from app.models.log import Log
+        
+        today = date.today()
+        response = client.post("/api/logs/batch", headers=auth_headers, json={"logs": [
+            {"habit_id": test_habit_with_logs.id, "log_date": (today - timedelta(days=3)).isoformat(), "mood": 4},
+            {"habit_id": test_habit_with_logs.id, "log_date": (today - timedelta(days=4)).isoformat()},
+            {"habit_id": test_habit_with_logs.id, "log_date": (today - timedelta(days=5)).isoformat(), "notes": "late"},
+        ]})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["created"], data["updated"], data["failed"]) == (1, 2, 0)
+        assert [r["status"] for r in data["results"]] == ["updated", "updated", "created"]
+        assert data["results"][0]["log"]["mood"] == 4
+        assert data["results"][0]["log"]["notes"] == "Day 3 notes"
+        assert data["results"][2]["log"]["id"] is not None
+        
+        assert db.query(Log).filter(Log.habit_id == test_habit_with_logs.id).count() == 6
+        db.refresh(test_habit_with_logs)
+        assert test_habit_with_logs.current_streak == 6
+        assert test_habit_with_logs.longest_streak == 6
+    
+    def test_batch_duplicate_items_last_wins(self, client, auth_headers, test_habit):
+        """Test repeated habit/day items collapse into one log."""
+        day = date.today().isoformat()
+        data = client.post("/api/logs/batch", headers=auth_headers, json={"logs": [
+            {"habit_id": test_habit.id, "log_date": day, "completed": True},
+            {"habit_id": test_habit.id, "log_date": day, "completed": False},
+        ]}).json()
+        assert [r["status"] for r in data["results"]] == ["created", "updated"]
+        assert data["results"][0]["log"]["id"] == data["results"][1]["log"]["id"]
+        assert data["results"][1]["log"]["completed"] == False
+    
+    def test_batch_foreign_habit_fails_item_only(self, client, auth_headers, auth_headers_user2, test_habit):
+        """Test another user's habit is rejected per item without failing the batch."""
+        response = client.post("/api/habits/", headers=auth_headers_user2, json={
+            "title": "Theirs", "frequency": "daily", "category": "health"
+        })
+        theirs = response.json()["id"]
+        data = client.post("/api/logs/batch", headers=auth_headers, json={"logs": [
+            {"habit_id": theirs},
+            {"habit_id": test_habit.id},
+            {"habit_id": 999999},
+        ]}).json()
+        assert [r["status"] for r in data["results"]] == ["error", "created", "error"]
+        assert data["results"][0]["error"] == "Habit not found"
+        assert data["failed"] == 2
+    
+    def test_batch_size_limit(self, client, auth_headers, test_habit):
+        """Test empty and oversized batches are rejected."""
+        from app.schemas.log import MAX_BATCH_LOGS
+        
+        assert client.post("/api/logs/batch", headers=auth_headers, json={"logs": []}).status_code == 422
+        logs = [{"habit_id": test_habit.id} for _ in range(MAX_BATCH_LOGS + 1)]
+        assert client.post("/api/logs/batch", headers=auth_headers, json={"logs": logs}).status_code == 422
+    
+    def test_batch_query_count_is_constant(self, client, auth_headers, db, test_habit):
+        """Test statements don't grow with the number of items per habit."""
+        from sqlalchemy import event
+        
+        def run(days):
+            statements = []
+            def record(conn, cursor, statement, *args):
+                if "FROM users" not in statement:
+                    statements.append(statement)
+            event.listen(db.get_bind(), "before_cursor_execute", record)
+            try:
+                response = client.post("/api/logs/batch", headers=auth_headers, json={"logs": [
+                    {"habit_id": test_habit.id, "log_date": day.isoformat()} for day in days
+                ]})
+            finally:
+                event.remove(db.get_bind(), "before_cursor_execute", record)
+            assert response.status_code == status.HTTP_200_OK
+            return [s for s in statements if not s.startswith("INSERT INTO logs")]
+        
+        today = date.today()
+        small = run([today - timedelta(days=i) for i in range(2)])
+        large = run([today - timedelta(days=i) for i in range(10, 110)])
+        assert len(large) == len(small)
+
 
+class TestSingleStatementUpsert:
+    """Test the upsert write path behind POST /api/logs/, quick-complete and log_habit_completion."""
+    
+    def statements(self, db, call):
+        from sqlalchemy import event
+        
+        statements = []
+        def record(conn, cursor, statement, *args):
+            if "FROM users" not in statement:
+                statements.append(statement)
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            call()
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", record)
+        return statements
+    
+    def test_quick_complete_round_trips(self, client, auth_headers, db, test_habit):
+        """Test quick-complete is one habit read, one upsert and one habit update."""
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        db.expire_all()
+        
+        statements = self.statements(
+            db, lambda: client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        )
+        assert len(statements) <= 3
+        upserts = [s for s in statements if s.startswith("INSERT INTO logs")]
+        assert len(upserts) == 1
+        assert "ON CONFLICT" in upserts[0] and "RETURNING" in upserts[0]
+        assert not any("FROM logs" in s for s in statements)
+    
+    async def test_log_habit_completion_overwrites(self, db, test_user, test_habit):
+        """Test the controller upserts an existing day and keeps streaks in step."""
+        from app.controllers import log_controller
+        from app.models.log import Log
+        from app.schemas.log import LogCreate
+        
+        today = date.today()
+        first = await log_controller.log_habit_completion(
+            LogCreate(habit_id=test_habit.id, log_date=today, notes="first"), test_user, db
+        )
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 1
+        first_time = first.completion_time
+        
+        second = await log_controller.log_habit_completion(
+            LogCreate(habit_id=test_habit.id, log_date=today, completed=False, mood=2), test_user, db
+        )
+        assert second.id == first.id
+        assert second.completed == False
+        assert second.notes is None
+        assert second.mood == 2
+        assert second.completion_time == first_time
+        db.refresh(test_habit)
+        assert test_habit.current_streak == 0
+        assert db.query(Log).filter(Log.habit_id == test_habit.id).count() == 1
+    
+    def test_upsert_recounts_rollup(self, client, auth_headers, db, test_user, test_habit):
+        """Test the daily rollup row matches the logs after repeated upserts."""
+        from app.models.user_daily_stats import UserDailyStats
+        from app.utils.daily_stats import backfill_daily_stats
+        
+        backfill_daily_stats(db, [test_user.id])
+        for _ in range(3):
+            client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        
+        row = db.query(UserDailyStats).filter(UserDailyStats.user_id == test_user.id).one()
+        db.refresh(row)
+        assert (row.completed_count, row.logged_count) == (1, 1)
+    
+    def test_create_log_round_trips(self, client, auth_headers, db, test_habit):
+        """Test POST /api/logs/ is one habit read, one upsert and one habit update."""
+        habit_id = test_habit.id
+        yesterday = date.today() - timedelta(days=1)
+        client.post("/api/logs/", headers=auth_headers, json={
+            "habit_id": habit_id, "log_date": yesterday.isoformat()
+        })
+        db.expire_all()
+        
+        statements = self.statements(db, lambda: client.post("/api/logs/", headers=auth_headers, json={
+            "habit_id": habit_id, "notes": "again"
+        }))
+        assert len(statements) <= 3
+        upserts = [s for s in statements if s.startswith("INSERT INTO logs")]
+        assert len(upserts) == 1
+        assert "ON CONFLICT" in upserts[0] and "RETURNING" in upserts[0]
+        assert not any("FROM logs" in s for s in statements)
+    
+    def race(self, tmp_path, write):
+        """
+        Run `write(habit_id, user, session)` from two sessions at once against
+        a file database. Returns (results, errors, Session, engine, user_id, habit_id).
+        """
+        import threading
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        from app.models.habit import Habit, HabitCategory
+        from app.models.user import User, UserType
+        from app.utils.security import hash_password
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        
+        with Session() as setup:
+            user = User(email="race@example.com", username="race", hashed_password=hash_password("x"),
+                        user_type=UserType.REGULAR, daily_stats_built_at=datetime.utcnow())
+            setup.add(user)
+            setup.flush()
+            habit = Habit(user_id=user.id, title="Race", frequency=HabitFrequency.DAILY,
+                          category=HabitCategory.OTHER, current_streak=0, longest_streak=0)
+            setup.add(habit)
+            setup.commit()
+            user_id, habit_id = user.id, habit.id
+        
+        barrier = threading.Barrier(2)
+        results, errors = [], []
+        
+        def tap():
+            with Session() as session:
+                user = session.get(User, user_id)
+                barrier.wait()
+                try:
+                    results.append(write(habit_id, user, session))
+                except Exception as e:
+                    errors.append(e)
+        
+        threads = [threading.Thread(target=tap) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors, Session, engine, user_id, habit_id
+    
+    def assert_one_completed_log(self, Session, user_id, habit_id):
+        from app.models.habit import Habit
+        from app.models.log import Log
+        from app.models.user_daily_stats import UserDailyStats
+        
+        with Session() as check:
+            assert check.query(Log).filter(Log.habit_id == habit_id).count() == 1
+            assert check.get(Habit, habit_id).current_streak == 1
+            row = check.query(UserDailyStats).filter(UserDailyStats.user_id == user_id).one()
+            assert (row.completed_count, row.logged_count) == (1, 1)
+    
+    def test_concurrent_double_tap(self, tmp_path):
+        """Test two sessions completing the same habit at once both succeed with one log."""
+        import asyncio
+        from app.controllers import habit_controller
+        
+        results, errors, Session, engine, user_id, habit_id = self.race(
+            tmp_path, lambda habit_id, user, session: asyncio.run(
+                habit_controller.complete_habit_today(habit_id, user, session)
+            )
+        )
+        assert errors == []
+        assert [r["current_streak"] for r in results] == [1, 1]
+        self.assert_one_completed_log(Session, user_id, habit_id)
+        engine.dispose()
+    
+    def test_concurrent_create_log(self, tmp_path):
+        """Test two POST /api/logs/ for the same day give one log and a 400, never a 500."""
+        import asyncio
+        from fastapi import HTTPException
+        from app.routers import logs as logs_router
+        from app.schemas.log import LogCreate
+        
+        results, errors, Session, engine, user_id, habit_id = self.race(
+            tmp_path, lambda habit_id, user, session: asyncio.run(
+                logs_router.create_log(LogCreate(habit_id=habit_id), user, session)
+            )
+        )
+        assert len(results) == 1
+        assert results[0].completed == True
+        assert len(errors) == 1
+        assert isinstance(errors[0], HTTPException)
+        assert errors[0].status_code == status.HTTP_400_BAD_REQUEST
+        self.assert_one_completed_log(Session, user_id, habit_id)
+        engine.dispose()
+
+
+class TestHabitRowLock:
+    """Test every write path that rewrites a completion bitmap locks the habit row first."""
+    
+    @pytest.fixture
+    def habit_reads(self, db):
+        """Habit SELECTs issued through the session, compiled for PostgreSQL."""
+        from sqlalchemy import event
+        from sqlalchemy.dialects import postgresql
+        from app.models.habit import Habit
+        
+        reads = []
+        def record(state):
+            if state.is_select and Habit in [d["entity"] for d in state.statement.column_descriptions]:
+                reads.append(str(state.statement.compile(dialect=postgresql.dialect())))
+        event.listen(db, "do_orm_execute", record)
+        yield reads
+        event.remove(db, "do_orm_execute", record)
+    
+    def assert_locked(self, habit_reads):
+        assert habit_reads
+        assert all("FOR UPDATE" in statement for statement in habit_reads)
+    
+    def test_create_log(self, client, auth_headers, test_habit, habit_reads):
+        client.post("/api/logs/", headers=auth_headers, json={"habit_id": test_habit.id})
+        self.assert_locked(habit_reads)
+    
+    def test_quick_complete(self, client, auth_headers, test_habit, habit_reads):
+        client.post(f"/api/habits/{test_habit.id}/complete", headers=auth_headers)
+        self.assert_locked(habit_reads)
+    
+    def test_batch(self, client, auth_headers, test_habit, habit_reads):
+        client.post("/api/logs/batch", headers=auth_headers, json={"logs": [{"habit_id": test_habit.id}]})
+        self.assert_locked(habit_reads)
+    
+    def test_update_and_delete(self, client, auth_headers, db, test_habit_with_logs, habit_reads):
+        from app.models.log import Log
+        
+        log_id = db.query(Log.id).filter(
+            Log.habit_id == test_habit_with_logs.id, Log.completed == True
+        ).first()[0]
+        habit_reads.clear()
+        client.put(f"/api/logs/{log_id}", headers=auth_headers, json={"completed": False})
+        self.assert_locked(habit_reads)
+        
+        habit_reads.clear()
+        client.put(f"/api/logs/{log_id}", headers=auth_headers, json={"completed": True})
+        client.delete(f"/api/logs/{log_id}", headers=auth_headers)
+        self.assert_locked(habit_reads)
+
+
+class TestMoodInsights:
+    """Test mood insights aggregation, trend buckets and narrative caching."""
+    
+    @pytest.fixture
+    def mood_logs(self, db, test_user, test_habit):
+        from app.models.log import Log
+        today = date.today()
+        labels = ["Happy", "Calm", "Stressed"]
+        for offset in range(400):
+            db.add(Log(
+                habit_id=test_habit.id,
+                user_id=test_user.id,
+                log_date=today - timedelta(days=offset),
+                completed=True,
+                notes="A long enough note about the day",
+                mood_label=labels[offset % 3],
+                mood_intensity=round(0.2 + (offset % 7) / 10, 2),
+                mood_analyzed_at=datetime(2026, 1, 1)
+            ))
+        db.commit()
+    
+    @pytest.fixture
+    def narratives(self, monkeypatch):
+        from app.routers import logs as logs_router
+        calls = []
+        
+        async def generate_text(prompt):
+            calls.append(prompt)
+            return f"Insight {len(calls)}"
+        
+        monkeypatch.setattr(logs_router.gemini, "generate_text", generate_text)
+        logs_router.mood_insights_cache.clear()
+        yield calls
+        logs_router.mood_insights_cache.clear()
+    
+    def test_distribution_matches_weighting(self, client, auth_headers, db, test_user, mood_logs, narratives):
+        """Test the SQL distribution equals the recency/intensity weighting per log."""
+        from app.models.log import Log
+        today = date.today()
+        start = today - timedelta(days=30)
+        response = client.get(
+            f"/api/logs/mood-insights?start_date={start}&end_date={today}", headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        
+        expected = {}
+        for log in db.query(Log).filter(Log.user_id == test_user.id, Log.log_date >= start):
+            days_ago = (today - log.log_date).days
+            weight = 0.6 / (1 + days_ago / 14.0) + 0.4 * log.mood_intensity
+            expected[log.mood_label] = expected.get(log.mood_label, 0.0) + weight
+        assert data["mood_distribution"] == pytest.approx(
+            {label: round(weight, 3) for label, weight in expected.items()}, abs=1e-3
+        )
+        assert data["trend_period"] == "day"
+        assert len(data["mood_trend"]) == 31
+        point = data["mood_trend"][-1]
+        assert point["date"] == str(today)
+        assert point["entries"] == 1
+        assert point["mood_label"] == "Happy"
+    
+    def test_trend_downsampled_for_long_ranges(self, client, auth_headers, mood_logs, narratives):
+        """Test longer ranges return weekly or monthly buckets instead of one point per log."""
+        today = date.today()
+        start = today - timedelta(days=199)
+        data = client.get(
+            f"/api/logs/mood-insights?start_date={start}&end_date={today}", headers=auth_headers
+        ).json()
+        assert data["trend_period"] == "week"
+        assert len(data["mood_trend"]) <= 30
+        assert sum(point["entries"] for point in data["mood_trend"]) == 200
+        assert all(date.fromisoformat(point["date"]).weekday() == 0 for point in data["mood_trend"][1:])
+        
+        start = today - timedelta(days=3 * 365)
+        data = client.get(
+            f"/api/logs/mood-insights?start_date={start}&end_date={today}", headers=auth_headers
+        ).json()
+        assert data["trend_period"] == "month"
+        assert len(data["mood_trend"]) <= 15
+        assert sum(point["entries"] for point in data["mood_trend"]) == 400
+        assert all(point["date"].endswith("-01") for point in data["mood_trend"][1:])
+    
+    def test_single_logs_query(self, client, auth_headers, db, mood_logs, narratives):
+        """Test the insights read the logs table once, whatever the range."""
+        from sqlalchemy import event
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if "FROM logs" in statement and "FROM users" not in statement:
+                statements.append(statement)
+        
+        event.listen(db.get_bind(), "before_cursor_execute", count)
+        try:
+            start = date.today() - timedelta(days=365)
+            response = client.get(f"/api/logs/mood-insights?start_date={start}", headers=auth_headers)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(statements) == 1
+    
+    def test_narrative_cached_until_new_analysis(self, client, auth_headers, db, test_user, mood_logs, narratives):
+        """Test the AI text is reused, then regenerated when an analysis lands in the range."""
+        from app.models.log import Log
+        today = date.today()
+        url = f"/api/logs/mood-insights?start_date={today - timedelta(days=30)}&end_date={today}"
+        assert client.get(url, headers=auth_headers).json()["ai_insights"] == "Insight 1"
+        assert client.get(url, headers=auth_headers).json()["ai_insights"] == "Insight 1"
+        assert len(narratives) == 1
+        
+        # Analysis through the endpoint evicts cached ranges covering the log
+        log = db.query(Log).filter(Log.user_id == test_user.id, Log.log_date == today - timedelta(days=3)).one()
+        response = client.post(f"/api/logs/{log.id}/analyze-mood", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get(url, headers=auth_headers).json()["ai_insights"] == "Insight 2"
+        
+        # Analyses written by other paths are caught by the range fingerprint
+        log = db.query(Log).filter(Log.user_id == test_user.id, Log.log_date == today - timedelta(days=5)).one()
+        log.mood_label = "Excited"
+        log.mood_analyzed_at = datetime.utcnow()
+        db.commit()
+        assert client.get(url, headers=auth_headers).json()["ai_insights"] == "Insight 3"
+        assert client.get(url, headers=auth_headers).json()["ai_insights"] == "Insight 3"
+        
+        # Analyses outside the range leave it cached
+        log = db.query(Log).filter(Log.user_id == test_user.id, Log.log_date == today - timedelta(days=90)).one()
+        client.post(f"/api/logs/{log.id}/analyze-mood", headers=auth_headers)
+        assert client.get(url, headers=auth_headers).json()["ai_insights"] == "Insight 3"
@@ -0,0 +1,210 @@
+"""
+Query Plan Tests
+================
+Guards the indexes behind the hot log queries: each query is captured
+while running the real code path, then EXPLAINed, and the test fails if
+any plan falls back to a sequential scan of logs, habits or
+user_daily_stats. Also runs the Alembic migration that creates those
+indexes on existing databases.
+"""
+
+import re
+import pytest
+from datetime import date, timedelta
+from alembic import command
+from alembic.config import Config
+from pathlib import Path
+from sqlalchemy import create_engine, event, inspect
+
+from app.config import settings
+from app.database import Base
+from app.models.habit import Habit, HabitFrequency, HabitCategory
+from app.models.log import Log
+from app.utils import (
+    completion_bitmap, correlations, daily_stats, log_pages, log_summary,
+    mood_insights, streak_calculator, time_of_day
+)
+
+
+INDEXED_TABLES = ("logs", "habits", "user_daily_stats")
+MIGRATION_INDEXES = {
+    "ix_logs_habit_date_id", "ix_logs_user_date",
+    "ix_logs_habit_completed_date", "ix_logs_user_completion_time",
+}
+
+
+def sequential_scans(connection, statement, parameters):
+    """
+    EXPLAIN a captured statement and return the plan lines that read a
+    whole indexed table.
+    """
+    if connection.dialect.name == "postgresql":
+        # Tiny test tables always favour seq scans; only flag unavoidable ones
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in connection.exec_driver_sql("EXPLAIN " + statement, parameters)]
+        pattern = re.compile(r"Seq Scan on (%s)\b" % "|".join(INDEXED_TABLES))
+    else:
+        # SQLite reports "SCAN logs" for a table scan, "SEARCH logs USING INDEX ..." otherwise
+        plan = [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        pattern = re.compile(r"^SCAN (%s)$" % "|".join(INDEXED_TABLES))
+    return [line for line in plan if pattern.search(line.strip())]
+
+
+@pytest.fixture
+def captured(db):
+    """Collect every SELECT issued while the test body runs."""
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+    
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture
+def history(db, test_user):
+    """Two habits with a couple of months of logs."""
+    today = date.today()
+    habits = [
+        Habit(user_id=test_user.id, title=title, frequency=HabitFrequency.DAILY,
+              category=HabitCategory.HEALTH, is_active=True, current_streak=0, longest_streak=0)
+        for title in ("Run", "Read")
+    ]
+    db.add_all(habits)
+    db.flush()
+    for habit in habits:
+        for offset in range(60):
+            db.add(Log(
+                habit_id=habit.id,
+                user_id=test_user.id,
+                log_date=today - timedelta(days=offset),
+                completed=offset % 3 != 0,
+                mood=3
+            ))
+    db.commit()
+    return habits
+
+
+class TestHotQueryPlans:
+    """Each hot path must reach logs through an index."""
+    
+    def assert_indexed(self, db, statements):
+        assert statements
+        connection = db.connection()
+        for statement, parameters in statements:
+            scans = sequential_scans(connection, statement, parameters)
+            assert not scans, f"Sequential scan {scans} in: {statement}"
+    
+    def test_streaks_and_bitmaps(self, db, test_user, history, captured):
+        habit = history[0]
+        streak_calculator.calculate_current_streak(habit.id, db)
+        streak_calculator.bulk_recompute_streaks(db, habit_ids=[h.id for h in history])
+        completion_bitmap.rebuild_bitmaps(db, user_id=test_user.id)
+        self.assert_indexed(db, captured)
+    
+    def test_summaries(self, db, test_user, history, captured):
+        today = date.today()
+        log_summary.range_summary(db, test_user, today - timedelta(days=6), today)
+        log_summary.monthly_summaries(db, test_user, today.year, today.month, 2)
+        daily_stats.completions_by_day(db, test_user, today - timedelta(days=30), today)
+        self.assert_indexed(db, captured)
+    
+    def test_habit_log_pages(self, db, history, captured):
+        rows, cursor = log_pages.habit_log_page(db, history[0].id, limit=10)
+        log_pages.habit_log_page(db, history[0].id, limit=10, cursor=cursor)
+        self.assert_indexed(db, captured)
+    
+    def test_analytics_reads(self, db, test_user, history, captured):
+        today = date.today()
+        time_of_day.completion_histogram(db, test_user)
+        correlations.completion_matrix(db, test_user, today - timedelta(days=30), today)
+        mood_insights.mood_insights(db, test_user, today - timedelta(days=200), today)
+        self.assert_indexed(db, captured)
+    
+    def test_uses_dedicated_indexes(self, db, test_user, history, captured):
+        """Range reads and streaks get their own indexes, not a shared prefix."""
+        today = date.today()
+        log_summary.range_summary(db, test_user, today - timedelta(days=6), today)
+        streak_calculator.calculate_current_streak(history[0].id, db)
+        connection = db.connection()
+        if connection.dialect.name != "sqlite":
+            pytest.skip("index names are read from SQLite plans")
+        plans = " ".join(
+            row[-1]
+            for statement, parameters in captured
+            for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        )
+        assert "ix_logs_user_date" in plans
+        assert "ix_logs_habit_completed_date" in plans
+    
+    def test_detects_sequential_scan(self, db, history):
+        """The check itself must flag a query no index can serve."""
+        connection = db.connection()
+        assert sequential_scans(connection, "SELECT * FROM logs WHERE notes = ?", ("x",))
+
+
+class TestIndexMigration:
+    """The Alembic history builds new databases and brings existing ones up to the models."""
+    
+    @pytest.fixture
+    def alembic_config(self, tmp_path, monkeypatch):
+        url = f"sqlite:///{tmp_path / 'migrate.db'}"
+        # env.py always migrates settings.DATABASE_URL
+        monkeypatch.setattr(settings, "DATABASE_URL", url)
+        backend = Path(__file__).resolve().parent.parent
+        # No ini file, so env.py leaves logging configuration alone
+        config = Config()
+        config.set_main_option("script_location", str(backend / "alembic"))
+        return config, url
+    
+    def test_adds_indexes_to_existing_database(self, alembic_config):
+        config, url = alembic_config
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            for name in MIGRATION_INDEXES:
+                connection.exec_driver_sql(f"DROP INDEX {name}")
+        
+        command.upgrade(config, "head")
+        
+        indexes = {index["name"] for index in inspect(engine).get_indexes("logs")}
+        assert MIGRATION_INDEXES <= indexes
+        engine.dispose()
+    
+    def test_history_matches_models(self, alembic_config, tmp_path):
+        """Test an empty database migrated to head has the models' tables, columns and indexes."""
+        def schema(engine):
+            inspector = inspect(engine)
+            return {
+                table: (
+                    {column["name"] for column in inspector.get_columns(table)},
+                    {index["name"] for index in inspector.get_indexes(table)},
+                )
+                for table in inspector.get_table_names() if table != "alembic_version"
+            }
+        
+        config, url = alembic_config
+        command.upgrade(config, "head")
+        migrated = create_engine(url)
+        declared = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+        Base.metadata.create_all(declared)
+        
+        assert schema(migrated) == schema(declared)
+        migrated.dispose()
+        declared.dispose()
+    
+    def test_empty_database_and_rerun(self, alembic_config):
+        config, url = alembic_config
+        command.upgrade(config, "head")
+        command.downgrade(config, "base")
+        command.upgrade(config, "head")
+        
+        engine = create_engine(url)
+        indexes = {index["name"] for index in inspect(engine).get_indexes("logs")}
+        assert MIGRATION_INDEXES <= indexes
+        assert "user_daily_stats" in inspect(engine).get_table_names()
+        engine.dispose()